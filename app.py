@@ -4,16 +4,17 @@
 DBGR is a tool for testing and debugging HTTP APIs.
 '''
 
-import readline # pylint: disable=W0611
+import os
 import asyncio
 import colorama
-import argcomplete
 from dbgr.commands import argument_parser, version_command
 
 
 async def main():
     parser = argument_parser()
-    argcomplete.autocomplete(parser)
+    if '_ARGCOMPLETE' in os.environ:
+        import argcomplete
+        argcomplete.autocomplete(parser)
     args = parser.parse_args()
     colorama.init(autoreset=True)
     if hasattr(args, 'func'):
@@ -0,0 +1,168 @@
+import os
+import json
+from configparser import ConfigParser
+import dbgr.index
+from dbgr import requests as dbgr_requests
+from dbgr.reporting import Reporter
+from dbgr.types import DatetimeType
+from benchmarks.server import BenchmarkServer
+
+
+MODULES = 200
+REQUESTS_PER_MODULE = 20
+PACKAGES = 20
+
+CASES = {}
+
+
+def benchmark(name, iterations=10):
+    def decorator(func):
+        CASES[name] = (func, iterations)
+        return func
+    return decorator
+
+
+def write_module_tree(directory, modules=MODULES, requests=REQUESTS_PER_MODULE):
+    for module in range(modules):
+        with open(os.path.join(directory, f'module_{module}.py'), 'w') as module_file:
+            module_file.write('from dbgr import request\n')
+            for req in range(requests):
+                module_file.write(
+                    f'\n\n@request\n'
+                    f'async def request_{module}_{req}(env, session, item_id: int = {req}):\n'
+                    f'    return item_id\n'
+                )
+
+
+def write_package_tree(directory, packages=PACKAGES):
+    for package in range(packages):
+        package_directory = os.path.join(directory, f'package_{package}')
+        os.mkdir(package_directory)
+        with open(os.path.join(package_directory, '__init__.py'), 'w'):
+            pass
+        write_module_tree(package_directory, modules=MODULES // packages)
+
+
+def reset_requests():
+    dbgr_requests._REQUESTS.clear() # pylint: disable=W0212
+    dbgr_requests._NAMES.clear() # pylint: disable=W0212
+    dbgr_requests._LOADED_MODULES.clear() # pylint: disable=W0212
+    dbgr_requests._ALL_LOADED = False # pylint: disable=W0212
+    dbgr_requests._CACHE.clear() # pylint: disable=W0212
+    dbgr.index._INDEX = None # pylint: disable=W0212
+    dbgr_requests.unload_packages()
+
+
+def large_json(items=5000):
+    return json.dumps([
+        {'id': i, 'name': f'item {i}', 'active': i % 2 == 0, 'tags': ['a', 'b', 'c']}
+        for i in range(items)
+    ])
+
+
+def large_html(rows=5000):
+    rows = ''.join(f'<tr><td class="id">{i}</td><td>item {i}</td></tr>' for i in range(rows))
+    return f'<html><body><table>{rows}</table></body></html>'
+
+
+@benchmark('load_requests', iterations=5)
+def bench_load_requests(context):
+    write_module_tree(context.directory)
+
+    def run():
+        reset_requests()
+        dbgr_requests.load_requests()
+    return run
+
+
+@benchmark('find_request', iterations=10)
+def bench_find_request(context):
+    write_module_tree(context.directory)
+    reset_requests()
+    dbgr_requests.load_requests()
+    names = [
+        f'request_{module}_{req}' if module // 10 % 2 else f'module_{module}:request_{module}_{req}'
+        for module in range(0, MODULES, 10) for req in range(REQUESTS_PER_MODULE)
+    ]
+
+    def run():
+        for name in names:
+            dbgr_requests.find_request(name)
+    return run
+
+
+@benchmark('find_request_in_package', iterations=10)
+def bench_find_request_in_package(context):
+    write_package_tree(context.directory)
+    reset_requests()
+    dbgr.index.get_index()
+
+    def run():
+        reset_requests()
+        dbgr_requests.find_request('package_3.module_0:request_0_0')
+    return run
+
+
+@benchmark('resolve_arguments', iterations=20)
+def bench_resolve_arguments(context): # pylint: disable=W0613
+    async def func(env, session, item_id: int, name: str = 'name', active: bool = True,
+                   limit: int = 10, ratio: float = 0.5):
+        return item_id, name, active, limit, ratio
+    request = dbgr_requests.Request(func)
+    kwargs = {'item_id': '1', 'name': 'article', 'active': 'false'}
+
+    def run():
+        for _ in range(1000):
+            request.resolve_arguments({}, None, True, kwargs)
+    return run
+
+
+@benchmark('datetime_cast', iterations=5)
+def bench_datetime_cast(context): # pylint: disable=W0613
+    datetime_type = DatetimeType()
+    values = ['2019-09-21T10:20:30', '2019-09-21', '1568974800', 'yesterday', 'in 2 hours']
+
+    def run():
+        for _ in range(20):
+            for value in values:
+                datetime_type.cast(value)
+    return run
+
+
+@benchmark('highlight_json', iterations=5)
+def bench_highlight_json(context): # pylint: disable=W0613
+    reporter, data = Reporter(), large_json()
+
+    def run():
+        reporter.highlight_content('application/json', data)
+    return run
+
+
+@benchmark('highlight_html', iterations=5)
+def bench_highlight_html(context): # pylint: disable=W0613
+    reporter, data = Reporter(), large_html()
+
+    def run():
+        reporter.highlight_content('text/html', data)
+    return run
+
+
+@benchmark('execute_request', iterations=5)
+def bench_execute_request(context):
+    server = context.run(BenchmarkServer().start())
+    context.cleanup.append(server.stop)
+    env = ConfigParser()
+    env.read_dict({'bench': {'url': server.url}})
+
+    async def get_article(env, session):
+        response = await session.get(f'{env["bench"]["url"]}/json')
+        return await response.json()
+    reset_requests()
+    dbgr_requests.register_request(dbgr_requests.Request(get_article))
+
+    async def run():
+        for _ in range(200):
+            await dbgr_requests.execute_request(
+                'get_article', env=env, silent=True
+            )
+    return run
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+'''
+Benchmarks of DBGR hot paths. Results are stored in ``benchmarks/results`` so
+regressions are visible between releases.
+'''
+
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbgr.meta import __version__ # pylint: disable=C0413
+from benchmarks.cases import CASES # pylint: disable=C0413
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+REGRESSION_THRESHOLD = 0.1
+
+
+class Context:
+    def __init__(self, loop, directory):
+        self.loop = loop
+        self.directory = directory
+        self.cleanup = []
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def close(self):
+        from dbgr.session import close_session
+        for cleanup in reversed(self.cleanup):
+            self.run(cleanup())
+        self.run(close_session())
+
+
+def measure(context, func, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            context.run(result)
+        timings.append(time.perf_counter() - start)
+    return {
+        'iterations': iterations,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+    }
+
+
+def run_case(name, loop):
+    setup, iterations = CASES[name]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        context = Context(loop, directory)
+        try:
+            return measure(context, setup(context), iterations)
+        finally:
+            context.close()
+            os.chdir(cwd)
+
+
+def results_path(version):
+    return os.path.join(RESULTS_DIR, f'{version}.json')
+
+
+def latest_results(exclude=None):
+    paths = sorted(
+        (path for path in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if path != exclude),
+        key=os.path.getmtime
+    )
+    return paths[-1] if paths else None
+
+
+def compare(results, baseline):
+    regressions = []
+    print(f'\nCompared to {baseline["version"]} ({baseline["date"]}):')
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        before, after = baseline['results'][name]['min'], result['min']
+        change = (after - before) / before if before else 0.0
+        marker = ''
+        if change > REGRESSION_THRESHOLD:
+            marker = ' REGRESSION'
+            regressions.append(name)
+        print(f' - {name:<20} {before * 1000:>10.2f}ms -> {after * 1000:>10.2f}ms {change:+.1%}{marker}')
+    return regressions
+
+
+def argument_parser():
+    parser = argparse.ArgumentParser(description='Benchmarks of DBGR hot paths')
+    parser.add_argument('cases', nargs='*', help=f'Cases to run: {", ".join(CASES)}')
+    parser.add_argument(
+        '-s', '--save', action='store_true',
+        help=f'Store results in {os.path.relpath(RESULTS_DIR)}/<version>.json'
+    )
+    parser.add_argument('-c', '--compare', help='Results file to compare with')
+    return parser
+
+
+def main():
+    parser = argument_parser()
+    args = parser.parse_args()
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {
+        'version': __version__,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    for name in args.cases or CASES:
+        result = run_case(name, loop)
+        results['results'][name] = result
+        print(
+            f'{name:<20} median {result["median"] * 1000:>10.2f}ms '
+            f'min {result["min"] * 1000:>10.2f}ms ({result["iterations"]} iterations)'
+        )
+    loop.close()
+
+    path = results_path(__version__)
+    baseline_path = args.compare or latest_results(exclude=path if args.save else None)
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as baseline_file:
+            regressions = compare(results, json.load(baseline_file))
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(path, 'w') as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+        print(f'\nResults stored in {os.path.relpath(path)}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
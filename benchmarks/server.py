@@ -0,0 +1,43 @@
+import json
+from aiohttp import web
+
+
+JSON_BODY = json.dumps({
+    'id': 1,
+    'name': 'Article',
+    'tags': ['benchmark', 'dbgr'],
+    'author': {'id': 42, 'name': 'Author'},
+})
+
+
+async def get_json(request): # pylint: disable=W0613
+    return web.Response(text=JSON_BODY, content_type='application/json')
+
+
+async def post_echo(request):
+    return web.Response(body=await request.read(), content_type=request.content_type)
+
+
+class BenchmarkServer:
+    def __init__(self, host='127.0.0.1'):
+        self.host = host
+        self.port = None
+        self.runner = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/json', get_json)
+        app.router.add_post('/echo', post_echo)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
@@ -1,7 +1,11 @@
+import inspect
 import colorama
+from dbgr.types import Type
 
 
 class Argument:
+    __slots__ = ('name', 'annotation')
+
     def __init__(self, name, annotation):
         self.name = name
         self.annotation = annotation
@@ -29,6 +33,8 @@ class Argument:
 
 
 class NoDefaultValueArgument(Argument):
+    __slots__ = ()
+
     def get_value(self, kwargs, use_default=None): # pylint: disable=W0613
         if self.name in kwargs:
             return self.cast(kwargs[self.name])
@@ -36,6 +42,8 @@ class NoDefaultValueArgument(Argument):
 
 
 class DefaultValueArgument(Argument):
+    __slots__ = ('value',)
+
     def __init__(self, name, annotation, value):
         super().__init__(name, annotation)
         self.value = value
@@ -56,3 +64,49 @@ class DefaultValueArgument(Argument):
             if value is None:
                 value = self.value
         return value
+
+
+def positional_arguments(func):
+    code = getattr(func, '__code__', None)
+    if code is None:
+        args_spec = inspect.getfullargspec(func)
+        return args_spec.args, args_spec.defaults, args_spec.annotations
+    return list(code.co_varnames[:code.co_argcount]), func.__defaults__, func.__annotations__
+
+
+class Signature:
+    __slots__ = ('arguments', 'env_arg', 'session_arg')
+
+    def __init__(self, func, env_arg, session_arg, excluded=()):
+        names, defaults, annotations = positional_arguments(func)
+        leading = names[:2]
+        defaults = dict(zip(names[::-1], (defaults or ())[::-1]))
+        arguments = []
+        for name in names:
+            if name in (env_arg, session_arg) or name in excluded:
+                continue
+            annotation = Type.get_type(annotations.get(name))
+            if name in defaults:
+                arguments.append(DefaultValueArgument(name, annotation, defaults[name]))
+            else:
+                arguments.append(NoDefaultValueArgument(name, annotation))
+        set_attribute = super().__setattr__
+        set_attribute('arguments', tuple(arguments))
+        set_attribute('env_arg', env_arg if env_arg in leading else None)
+        set_attribute('session_arg', session_arg if session_arg in leading else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Signature is immutable, "{name}" cannot be changed')
+
+    def bind(self, env, session, use_defaults, kwargs, extra=None): # pylint: disable=R0913
+        arguments = {
+            argument.name: argument.get_value(kwargs, use_default=use_defaults)
+            for argument in self.arguments
+        }
+        if extra:
+            arguments.update(extra)
+        if self.env_arg is not None:
+            arguments[self.env_arg] = env
+        if self.session_arg is not None:
+            arguments[self.session_arg] = session
+        return arguments
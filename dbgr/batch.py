@@ -0,0 +1,104 @@
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dbgr import reporting
+from dbgr.arguments import NoDefaultValueArgument
+from dbgr.environment import Environment
+from dbgr.requests import find_request, execute
+
+
+class InvalidBatchRecordError(ValueError):
+    pass
+
+
+class BatchReader:
+    def __init__(self, stream):
+        self.stream = stream
+        self.line_number = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def read_line(self):
+        for line in self.stream:
+            self.line_number += 1
+            if line.strip():
+                return self.line_number, line
+        return None
+
+    async def next(self):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.read_line)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class Batch:
+    def __init__(self, env, concurrency=10, output=None):
+        self.env = env
+        self.concurrency = concurrency
+        self.output = output if output is not None else reporting.get_output()
+        self.environments = {getattr(env, 'name', None): env}
+        self.requests = {}
+
+    def get_environment(self, name):
+        if name not in self.environments:
+            self.environments[name] = Environment(name)
+        return self.environments[name]
+
+    def get_request(self, name):
+        if name not in self.requests:
+            self.requests[name] = find_request(name)
+        return self.requests[name]
+
+    def parse_record(self, line):
+        record = json.loads(line)
+        if not isinstance(record, dict) or not isinstance(record.get('request'), str):
+            raise InvalidBatchRecordError('Record must be an object with "request" name')
+        if not isinstance(record.get('args', {}), dict):
+            raise InvalidBatchRecordError('Arguments of the request must be an object')
+        return record
+
+    async def execute(self, record):
+        from dbgr.session import get_session
+        request = self.get_request(record['request'])
+        kwargs = record.get('args', {})
+        missing = [
+            argument.name for argument in request.extra_arguments
+            if argument.name not in kwargs and isinstance(argument, NoDefaultValueArgument)
+        ]
+        if missing:
+            raise InvalidBatchRecordError(f'Missing arguments: {", ".join(missing)}')
+        env = self.get_environment(record['env']) if 'env' in record else self.env
+        return await execute(request, env, get_session(env), use_defaults=True, kwargs=kwargs)
+
+    async def process(self, line_number, line):
+        started = time.perf_counter()
+        report = {'line': line_number}
+        try:
+            record = self.parse_record(line)
+            report['request'] = record['request']
+            result = await self.execute(record)
+            report.update(ok=True, result=result.value, cached=result.cached)
+        except Exception as ex: # pylint: disable=W0703
+            report.update(ok=False, error=f'{type(ex).__name__}: {ex}')
+        report['duration'] = time.perf_counter() - started
+        await self.output.write(json.dumps(report, default=str) + '\n')
+
+    async def run(self, stream):
+        reader = BatchReader(stream)
+
+        async def worker():
+            while True:
+                line = await reader.next()
+                if line is None:
+                    return
+                await self.process(*line)
+
+        orig_silent = reporting.SILENT
+        try:
+            reporting.SILENT = True
+            await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+        finally:
+            reporting.SILENT = orig_silent
+            reader.close()
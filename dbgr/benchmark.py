@@ -0,0 +1,162 @@
+import asyncio
+import math
+import time
+from colorama import Style, Fore
+from dbgr import reporting
+from dbgr.requests import dependency_scope, execute_dependencies
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class Histogram:
+    def __init__(self, precision=0.01):
+        self.base = math.log1p(precision)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def record(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.floor(math.log(value) / self.base)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def bucket_value(self, index):
+        return math.exp((index + 0.5) * self.base)
+
+    def percentile(self, percentile):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.buckets)) # pragma: no cover
+
+
+class BenchmarkStats:
+    def __init__(self):
+        self.histogram = Histogram()
+        self.errors = {}
+        self.requests = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def record(self, duration, error=None):
+        self.requests += 1
+        self.total += duration
+        self.histogram.record(duration)
+        self.minimum = duration if self.minimum is None else min(self.minimum, duration)
+        self.maximum = duration if self.maximum is None else max(self.maximum, duration)
+        if error is not None:
+            name = type(error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    @property
+    def error_rate(self):
+        return self.error_count / self.requests if self.requests else 0.0
+
+    @property
+    def duration(self):
+        return self.finished - self.started
+
+    @property
+    def throughput(self):
+        return self.requests / self.duration if self.duration else 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.requests if self.requests else None
+
+    def percentile(self, percentile):
+        value = self.histogram.percentile(percentile)
+        if value is None:
+            return None
+        return min(max(value, self.minimum), self.maximum)
+
+    def __str__(self):
+        buff = (
+            f'{Style.BRIGHT}Requests:{Style.RESET_ALL}   {self.requests} '
+            f'{Style.DIM}(errors: {self.error_count}, {self.error_rate:.2%}){Style.RESET_ALL}\n'
+            f'{Style.BRIGHT}Duration:{Style.RESET_ALL}   {self.duration:.3f}s\n'
+            f'{Style.BRIGHT}Throughput:{Style.RESET_ALL} {self.throughput:.1f} req/s\n'
+        )
+        if self.requests:
+            buff += (
+                f'{Style.BRIGHT}Latency:{Style.RESET_ALL}\n'
+                f' - min:   {format_duration(self.minimum)}\n'
+                f' - mean:  {format_duration(self.mean)}\n'
+            )
+            for percentile in PERCENTILES:
+                label = f'p{percentile}:'
+                buff += f' - {label:<6} {format_duration(self.percentile(percentile))}\n'
+            buff += f' - max:   {format_duration(self.maximum)}\n'
+        if self.errors:
+            buff += f'{Fore.RED}Errors:{Style.RESET_ALL}\n'
+            for name, count in sorted(self.errors.items()):
+                buff += f' - {name}: {count}\n'
+        return buff
+
+
+def format_duration(duration):
+    return f'{duration * 1000:.2f}ms'
+
+
+async def run_phase(call, count, concurrency, stats):
+    remaining = iter(range(count))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await call()
+            except Exception as ex: # pylint: disable=W0703
+                stats.record(time.perf_counter() - start, ex)
+            else:
+                stats.record(time.perf_counter() - start)
+
+    stats.start()
+    await asyncio.gather(*[worker() for _ in range(max(1, min(concurrency, count)))])
+    stats.stop()
+    return stats
+
+
+async def run_benchmark( # pylint: disable=R0913
+        request, env, session, count, concurrency=1, warmup=0, use_defaults=False,
+        kwargs=None):
+    kwargs = {} if kwargs is None else kwargs
+    with dependency_scope():
+        dependencies = await execute_dependencies(request, env, session, use_defaults)
+    arguments = request.resolve_arguments(env, session, use_defaults, kwargs, dependencies)
+
+    async def call():
+        await request.request(**arguments)
+
+    orig_silent = reporting.SILENT
+    try:
+        reporting.SILENT = True
+        if warmup:
+            await run_phase(call, warmup, concurrency, BenchmarkStats())
+        return await run_phase(call, count, concurrency, BenchmarkStats())
+    finally:
+        reporting.SILENT = orig_silent
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import pickle
+import zlib
+import hashlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from configparser import ConfigParser
+from datetime import datetime, date, time as time_type
+
+
+DATA_DIR = '.dbgr'
+DISK_CACHE_FILE = 'cache.sqlite'
+COMPRESS_THRESHOLD = 1024
+
+_DISK_CACHE = None
+_MISSING = object()
+
+
+class CacheError(ValueError):
+    pass
+
+
+def get_data_dir():
+    path = os.path.join(os.getcwd(), DATA_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def canonical(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, ConfigParser):
+        return ['config', canonical({
+            section: dict(value.items(section, raw=True))
+            for section in [value.default_section] + value.sections()
+        })]
+    if isinstance(value, Mapping):
+        items = [[canonical(key), canonical(item)] for key, item in value.items()]
+        return ['dict', sorted(items, key=_dumps)]
+    if isinstance(value, (set, frozenset)):
+        return ['set', sorted((canonical(item) for item in value), key=_dumps)]
+    if isinstance(value, (list, tuple)):
+        return ['list', [canonical(item) for item in value]]
+    if isinstance(value, (bytes, bytearray)):
+        return ['bytes', value.hex()]
+    if isinstance(value, (datetime, date, time_type)):
+        return [type(value).__name__, value.isoformat()]
+    return ['repr', type(value).__name__, repr(value)]
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def read_json(path):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    try:
+        with open(f'{path}.tmp', 'w') as json_file:
+            json.dump(data, json_file)
+        os.replace(f'{path}.tmp', path)
+    except OSError:
+        pass
+
+
+def digest(value):
+    return hashlib.sha256(_dumps(canonical(value)).encode()).hexdigest()
+
+
+def serialize(value):
+    try:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as ex:
+        raise CacheError(f'Value of type "{type(value).__name__}" cannot be cached: {ex}')
+    if len(data) > COMPRESS_THRESHOLD:
+        return True, zlib.compress(data)
+    return False, data
+
+
+def deserialize(compressed, data):
+    if compressed:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+def sizeof(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return sys.getsizeof(value)
+
+
+def expiration(ttl, now):
+    return None if ttl is None else now + ttl
+
+
+class SessionCache:
+    def __init__(self, max_entries=None, max_bytes=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value, _, expires = entry
+        if expires is not None and expires <= self.clock():
+            self.remove(key)
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.remove(key)
+        size = sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.entries[key] = (value, size, expiration(ttl, self.clock()))
+        self.size += size
+        self.evict()
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def evict(self):
+        while self.entries and (
+                (self.max_entries is not None and len(self.entries) > self.max_entries) or
+                (self.max_bytes is not None and self.size > self.max_bytes)):
+            _, (_, size, _) = self.entries.popitem(last=False)
+            self.size -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+class DiskCache:
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        import sqlite3
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, compressed INTEGER NOT NULL, value BLOB NOT NULL, '
+            'expires REAL'
+            ') WITHOUT ROWID'
+        )
+        self.connection.execute('DELETE FROM cache WHERE expires <= ?', (self.clock(),))
+        self.connection.commit()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def get(self, key, default=None):
+        cursor = self.connection.execute(
+            'SELECT compressed, value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, self.clock())
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return default
+        return deserialize(*row)
+
+    def set(self, key, value, ttl=None):
+        compressed, data = serialize(value)
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO cache (key, compressed, value, expires) '
+                'VALUES (?, ?, ?, ?)',
+                (key, compressed, data, expiration(ttl, self.clock()))
+            )
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM cache')
+
+    def close(self):
+        self.connection.close()
+
+
+def get_disk_cache():
+    global _DISK_CACHE # pylint: disable=W0603
+    if _DISK_CACHE is None:
+        _DISK_CACHE = DiskCache(os.path.join(get_data_dir(), DISK_CACHE_FILE))
+    return _DISK_CACHE
@@ -0,0 +1,134 @@
+import os
+import json
+import base64
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from multidict import CIMultiDict
+from dbgr.cache import read_json, write_json, digest
+from dbgr.http_cache import CacheEntry, CachedResponse
+
+
+RECORD = 'record'
+REPLAY = 'replay'
+CASSETTE_MODES = (RECORD, REPLAY)
+REPLAYED = 'replayed'
+CREDENTIAL_HEADERS = ('authorization', 'proxy-authorization', 'cookie')
+REDACTED = 'REDACTED'
+
+
+class CassetteError(ValueError):
+    pass
+
+
+def request_body(kwargs):
+    for name in ('json', 'data'):
+        value = kwargs.get(name)
+        if isinstance(value, (str, bytes, bytearray, dict, list, tuple)):
+            return [name, value]
+    return None
+
+
+def redact_headers(headers):
+    return [
+        [name, REDACTED if name.lower() in CREDENTIAL_HEADERS else value]
+        for name, value in headers.items()
+    ]
+
+
+class Cassette:
+    def __init__(self, path, mode=REPLAY):
+        if mode not in CASSETTE_MODES:
+            raise CassetteError(
+                f'"{mode}" is not valid cassette mode. '
+                f'Supported modes are: {", ".join(CASSETTE_MODES)}'
+            )
+        self.path = path
+        self.mode = mode
+        self.index = {}
+        self.entries = {}
+        self.replayed = {}
+        self.executor = None
+        if mode == REPLAY:
+            self.load_index()
+
+    @property
+    def index_path(self):
+        return f'{self.path}.idx'
+
+    @property
+    def signature(self):
+        stat = os.stat(self.path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def request_key(self, method, url, kwargs):
+        return digest([method.upper(), str(url), kwargs.get('params'), request_body(kwargs)])
+
+    def load_index(self):
+        try:
+            signature = self.signature
+        except OSError:
+            raise CassetteError(f'Cassette "{self.path}" does not exist')
+        stored = read_json(self.index_path)
+        if stored is not None and stored.get('signature') == signature:
+            self.index = stored['index']
+            return
+        self.index = {}
+        offset = 0
+        with open(self.path, 'rb') as cassette_file:
+            for line in cassette_file:
+                try:
+                    key = json.loads(line)['key']
+                except (ValueError, KeyError, TypeError):
+                    key = None # incomplete line of interrupted recording
+                if key is not None:
+                    self.index.setdefault(key, []).append(offset)
+                offset += len(line)
+        write_json(self.index_path, {'signature': signature, 'index': self.index})
+
+    def read_entry(self, offset):
+        if offset not in self.entries:
+            with open(self.path, 'rb') as cassette_file:
+                cassette_file.seek(offset)
+                record = json.loads(cassette_file.readline())
+            self.entries[offset] = CacheEntry(
+                record['method'], record['response_url'], record['status'],
+                record['reason'], record['headers'], base64.b64decode(record['body']),
+                CIMultiDict(record['request_headers'])
+            )
+        return self.entries[offset]
+
+    def replay(self, method, url, request_headers, kwargs):
+        key = self.request_key(method, url, kwargs)
+        offsets = self.index.get(key)
+        if not offsets:
+            raise CassetteError(
+                f'Request "{method.upper()} {url}" was not recorded in cassette "{self.path}"'
+            )
+        position = self.replayed.get(key, 0)
+        self.replayed[key] = position + 1
+        entry = self.read_entry(offsets[min(position, len(offsets) - 1)])
+        return CachedResponse(entry, request_headers, REPLAYED)
+
+    def append(self, line):
+        with open(self.path, 'ab') as cassette_file:
+            cassette_file.write(line)
+
+    async def record(self, method, url, request_headers, kwargs, response): # pylint: disable=R0913
+        timing = getattr(response, 'timing', None)
+        record = {
+            'key': self.request_key(method, url, kwargs),
+            'method': method.upper(),
+            'url': str(url),
+            'request_headers': redact_headers(request_headers),
+            'status': response.status,
+            'reason': response.reason,
+            'response_url': str(response.url),
+            'headers': list(response.headers.items()),
+            'body': base64.b64encode(await response.read()).decode(),
+            'timing': None if timing is None else timing.phases,
+        }
+        line = (json.dumps(record) + '\n').encode()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self.executor, self.append, line)
@@ -0,0 +1,49 @@
+import re
+import json
+import aiohttp
+
+try:
+    import orjson
+except ImportError: # pragma: no cover
+    orjson = None
+
+
+_MISSING = object()
+# orjson parses integers that don't fit 64 bits as floats
+LONG_INTEGER = re.compile('[0-9]{19}')
+LONG_INTEGER_BYTES = re.compile(b'[0-9]{19}')
+
+
+def json_loads(data):
+    if orjson is not None:
+        pattern = LONG_INTEGER if isinstance(data, str) else LONG_INTEGER_BYTES
+        if not pattern.search(data):
+            try:
+                return orjson.loads(data)
+            except ValueError:
+                pass
+    return json.loads(data)
+
+
+class Response(aiohttp.ClientResponse):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._decoded_text = {}
+        self._decoded_json = {}
+
+    async def text(self, encoding=None, errors='strict'):
+        key = (encoding, errors)
+        if key not in self._decoded_text:
+            self._decoded_text[key] = await super().text(encoding=encoding, errors=errors)
+        return self._decoded_text[key]
+
+    async def json(self, *, encoding=None, loads=None, content_type='application/json'):
+        if loads is not None:
+            return await super().json(encoding=encoding, loads=loads, content_type=content_type)
+        value = self._decoded_json.get(encoding, _MISSING)
+        if value is _MISSING:
+            value = await super().json(
+                encoding=encoding, loads=json_loads, content_type=content_type
+            )
+            self._decoded_json[encoding] = value
+        return value
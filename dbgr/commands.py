@@ -3,9 +3,17 @@ import sys
 import traceback
 import textwrap
 import colorama
-from dbgr.requests import get_requests, execute_request, parse_cmd_arguments, parse_module_name
-from dbgr.environment import init_environment, get_environments, DEFAULT_ENVIRONMENT, Environment
-from dbgr.session import close_session
+from dbgr import reporting
+from dbgr.requests import (
+    get_requests, get_requests_in, execute_request, parse_cmd_arguments, parse_module_name,
+    find_request
+)
+from dbgr.index import in_package
+from dbgr.environment import (
+    init_environment, get_environment, get_environments, DEFAULT_ENVIRONMENT, Environment
+)
+from dbgr.benchmark import run_benchmark
+from dbgr.batch import Batch
 from dbgr.completion import RequestsCompleter, ModulesCompleter, EnvironmentsCompleter
 
 
@@ -15,9 +23,23 @@ def version_command():
     print(__version__)
 
 
+def use_cassette(args):
+    from dbgr.session import set_cassette
+    from dbgr.cassette import RECORD, REPLAY
+    if args.record:
+        set_cassette(args.record, RECORD)
+    elif args.replay:
+        set_cassette(args.replay, REPLAY)
+    else:
+        set_cassette()
+
+
 async def prepare_and_execute_request(request, args):
     try:
         init_environment(args.env)
+        reporting.BODY_LIMIT = args.body_limit
+        reporting.set_output(args.output)
+        use_cassette(args)
         arguments = parse_cmd_arguments(args.arguments)
         await execute_request(request, use_defaults=args.use_defaults, **arguments)
     except AssertionError:
@@ -32,6 +54,8 @@ async def prepare_and_execute_request(request, args):
 
 async def interactive_command(args):
     ''' Run requests in interactive mode '''
+    import readline # pylint: disable=W0611
+    from dbgr.session import close_session
     print(f'{colorama.Style.DIM}Dbgr interactive mode; press ^C to exit.')
     try:
         while True:
@@ -43,36 +67,82 @@ async def interactive_command(args):
 
 async def request_command(args):
     ''' Execute request '''
+    from dbgr.session import close_session
     try:
         await prepare_and_execute_request(args.request, args)
     finally:
         await close_session()
 
 
+async def bench_command(args):
+    ''' Execute request repeatedly and measure throughput and latency '''
+    from dbgr.session import get_session, close_session
+    try:
+        init_environment(args.env)
+        use_cassette(args)
+        request = find_request(args.request)
+        print(
+            f'{colorama.Style.DIM}Benchmarking "{request.module}:{request.name}": '
+            f'{args.requests} requests, {args.concurrency} workers, {args.warmup} warm-up'
+        )
+        stats = await run_benchmark(
+            request, get_environment(), get_session(get_environment()), args.requests,
+            concurrency=args.concurrency, warmup=args.warmup,
+            use_defaults=args.use_defaults, kwargs=parse_cmd_arguments(args.arguments)
+        )
+        print(stats, end='')
+    except Exception as ex: # pylint: disable=W0703
+        print(f'{colorama.Fore.RED}{ex}')
+    finally:
+        await close_session()
+
+
+async def batch_command(args):
+    ''' Execute requests listed in JSON lines file, "-" reads standard input '''
+    from dbgr.session import close_session
+    try:
+        init_environment(args.env)
+        reporting.set_output(args.output)
+        use_cassette(args)
+        batch = Batch(get_environment(), concurrency=args.concurrency)
+        if args.file == '-':
+            await batch.run(sys.stdin)
+        else:
+            with open(args.file) as batch_file:
+                await batch.run(batch_file)
+    except Exception as ex: # pylint: disable=W0703
+        print(f'{colorama.Fore.RED}{ex}')
+    finally:
+        await close_session()
+
+
 async def list_command(args):
     ''' List all available requests and their arguments '''
     l_module, l_request = parse_module_name(args.module)
-    requests = get_requests()
+    requests = get_requests_in(l_module) if l_module else get_requests()
     if not requests:
         print(f'{colorama.Fore.RED}No requests found.')
         return
-    if l_module and l_module not in requests:
+    modules = [
+        module for module in requests
+        if not l_module or (module == l_module if l_request else in_package(module, l_module))
+    ]
+    if l_module and not modules:
         print(f'{colorama.Fore.RED}Module "{l_module}" does not exist.')
         return
     if l_module and l_request and l_request not in requests[l_module]:
         print(f'{colorama.Fore.RED}Request "{l_request}" does not exist in module "{l_module}".')
         return
     request_printed = False
-    for module, requests in requests.items():
+    for module in modules:
         module_printed = False
-        if not l_module or module == l_module:
-            for request in requests.values():
-                if not l_request or request.name == l_request:
-                    if not module_printed:
-                        print(f'{colorama.Style.BRIGHT}{module}:')
-                        module_printed = True
-                        request_printed = True
-                    print(textwrap.indent(str(request), ' '), end='')
+        for request in requests[module].values():
+            if not l_request or request.name == l_request:
+                if not module_printed:
+                    print(f'{colorama.Style.BRIGHT}{module}:')
+                    module_printed = True
+                    request_printed = True
+                print(textwrap.indent(str(request), ' '), end='')
         if not request_printed and l_request:
             print(f'{colorama.Fore.RED}Request "{l_request}" does not exist in any module.')
 
@@ -95,6 +165,30 @@ async def environments_command(args): # pylint: disable=W0613
                 print(f'- {env}')
 
 
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'"{value}" is not positive integer')
+    return number
+
+
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f'"{value}" is not non-negative integer')
+    return number
+
+
+def add_cassette_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--record', metavar='CASSETTE',
+        help='Record HTTP requests and responses to cassette file')
+    group.add_argument(
+        '--replay', metavar='CASSETTE',
+        help='Replay responses from cassette file instead of sending requests')
+
+
 def argument_parser():
     parser = argparse.ArgumentParser(
         prog='dbgr',
@@ -118,6 +212,16 @@ def argument_parser():
     int_parser.add_argument(
         '-d', '--use-defaults', action='store_true',
         help='Use default values when possible')
+    int_parser.add_argument(
+        '-l', '--body-limit', type=non_negative_int, default=reporting.BODY_LIMIT,
+        help=(
+            'Maximum number of bytes of response data printed, '
+            f'0 disables the limit (default: {reporting.BODY_LIMIT})'
+        ))
+    int_parser.add_argument(
+        '-o', '--output',
+        help='Append requests and results to file instead of printing them')
+    add_cassette_arguments(int_parser)
     int_parser.set_defaults(func=interactive_command, arguments=[])
 
     req_parser = subparsers.add_parser(
@@ -139,8 +243,69 @@ def argument_parser():
     req_parser.add_argument(
         '-a', '--arg', dest='arguments', action='append', default=[],
         help='Arguments for requests execution')
+    req_parser.add_argument(
+        '-l', '--body-limit', type=non_negative_int, default=reporting.BODY_LIMIT,
+        help=(
+            'Maximum number of bytes of response data printed, '
+            f'0 disables the limit (default: {reporting.BODY_LIMIT})'
+        ))
+    req_parser.add_argument(
+        '-o', '--output',
+        help='Append requests and results to file instead of printing them')
+    add_cassette_arguments(req_parser)
     req_parser.set_defaults(func=request_command)
 
+    bench_parser = subparsers.add_parser(
+        'bench',
+        aliases=['b'],
+        help=bench_command.__doc__
+    )
+    bench_parser.add_argument(
+        'request',
+        help='Name of the request to benchmark'
+    ).completer = RequestsCompleter()
+    bench_parser.add_argument(
+        '-e', '--env', default=DEFAULT_ENVIRONMENT,
+        help='Environment that will be used'
+    ).completer = EnvironmentsCompleter()
+    bench_parser.add_argument(
+        '-d', '--use-defaults', action='store_true',
+        help='Use default values when possible')
+    bench_parser.add_argument(
+        '-a', '--arg', dest='arguments', action='append', default=[],
+        help='Arguments for requests execution')
+    bench_parser.add_argument(
+        '-n', '--requests', type=positive_int, default=100,
+        help='Number of measured executions (default: 100)')
+    bench_parser.add_argument(
+        '-c', '--concurrency', type=positive_int, default=1,
+        help='Number of concurrent workers (default: 1)')
+    bench_parser.add_argument(
+        '-w', '--warmup', type=non_negative_int, default=0,
+        help='Number of executions before measurement starts (default: 0)')
+    add_cassette_arguments(bench_parser)
+    bench_parser.set_defaults(func=bench_command)
+
+    batch_parser = subparsers.add_parser(
+        'batch',
+        help=batch_command.__doc__
+    )
+    batch_parser.add_argument(
+        'file',
+        help='JSON lines file with one request per line, "-" for standard input')
+    batch_parser.add_argument(
+        '-e', '--env', default=DEFAULT_ENVIRONMENT,
+        help=f'Environment used for lines without "env" (default: "{DEFAULT_ENVIRONMENT}")'
+    ).completer = EnvironmentsCompleter()
+    batch_parser.add_argument(
+        '-c', '--concurrency', type=positive_int, default=10,
+        help='Number of requests executed concurrently (default: 10)')
+    batch_parser.add_argument(
+        '-o', '--output',
+        help='Append results to file instead of printing them')
+    add_cassette_arguments(batch_parser)
+    batch_parser.set_defaults(func=batch_command)
+
     list_parser = subparsers.add_parser(
         'list-requests',
         aliases=['list', 'l'],
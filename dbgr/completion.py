@@ -1,7 +1,15 @@
-from dbgr.requests import get_requests
+import os
+import glob
+from dbgr.cache import get_data_dir, read_json, write_json
+from dbgr.index import get_index, find_modules, module_signature
 from dbgr.environment import get_environments
 
 
+COMPLETION_FILE = 'completion.json'
+
+_COMPLETION_INDEX = None
+
+
 class Completer:
     def __init__(self):
         self.choices = None
@@ -17,24 +25,61 @@ class Completer:
 
 class EnvironmentsCompleter(Completer):
     def get_choices(self):
-        return tuple(get_environments())
+        return tuple(get_completion_index()['environments'])
 
 
 class RequestsCompleter(Completer):
     def get_choices(self):
-        uniques, duplicates, options = set(), set(), set()
-        for module, requests in get_requests().items():
-            for name in requests.keys():
-                options.add(f'{module}:{name}')
-                if name not in duplicates:
-                    if name in uniques:
-                        duplicates.add(name)
-                        uniques.remove(name)
-                    else:
-                        uniques.add(name)
-        return tuple(options.union(uniques))
+        return tuple(get_completion_index()['requests'])
 
 
 class ModulesCompleter(Completer):
     def get_choices(self):
-        return tuple(get_requests().keys())
+        return tuple(get_completion_index()['modules'])
+
+
+def request_choices(requests):
+    uniques, duplicates, options = set(), set(), set()
+    for module, names in requests.items():
+        for name in names:
+            options.add(f'{module}:{name}')
+            if name not in duplicates:
+                if name in uniques:
+                    duplicates.add(name)
+                    uniques.remove(name)
+                else:
+                    uniques.add(name)
+    return sorted(options.union(uniques))
+
+
+def directory_signature():
+    directory = os.getcwd()
+    paths = list(find_modules(directory)) + glob.glob(f'{directory}/*.ini')
+    return {path: module_signature(path) for path in paths}
+
+
+def build_completion_index(signature):
+    requests = {}
+    for entry in get_index().modules.values():
+        if entry['requests'] or entry['dynamic']:
+            names = requests.setdefault(entry['module'], [])
+            names.extend(request['name'] for request in entry['requests'])
+    return {
+        'signature': signature,
+        'requests': request_choices(requests),
+        'modules': list(requests.keys()),
+        'environments': get_environments(),
+    }
+
+
+def get_completion_index():
+    global _COMPLETION_INDEX # pylint: disable=W0603
+    if _COMPLETION_INDEX is None:
+        path = os.path.join(get_data_dir(), COMPLETION_FILE)
+        signature = directory_signature()
+        completion_index = read_json(path)
+        if not completion_index or completion_index.get('signature') != signature:
+            completion_index = build_completion_index(signature)
+            write_json(path, completion_index)
+        _COMPLETION_INDEX = completion_index
+    return _COMPLETION_INDEX
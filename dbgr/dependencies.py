@@ -0,0 +1,70 @@
+import ast
+import inspect
+import textwrap
+
+
+VISITING = 'visiting'
+VISITED = 'visited'
+
+
+class DependencyCycleError(ValueError):
+    pass
+
+
+def call_target(node, namespace):
+    if isinstance(node, ast.Name):
+        return namespace.get(node.id)
+    if isinstance(node, ast.Attribute):
+        return getattr(call_target(node.value, namespace), node.attr, None)
+    return None
+
+
+def is_dependency_call(node, namespace, target):
+    return (
+        isinstance(node, ast.Call)
+        and len(node.args) == 1
+        and not node.keywords
+        and isinstance(node.args[0], ast.Constant)
+        and isinstance(node.args[0].value, str)
+        and call_target(node.func, namespace) is target
+    )
+
+
+def discover_dependencies(func, target):
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError):
+        return []
+    calls = sorted(
+        (node for node in ast.walk(tree) if is_dependency_call(node, func.__globals__, target)),
+        key=lambda node: (node.lineno, node.col_offset)
+    )
+    names = []
+    for node in calls:
+        if node.args[0].value not in names:
+            names.append(node.args[0].value)
+    return names
+
+
+def topological_order(root, get_dependencies):
+    order, state, path = [], {}, []
+
+    def visit(node):
+        if state.get(node) == VISITED:
+            return
+        if state.get(node) == VISITING:
+            cycle = path[path.index(node):] + [node]
+            raise DependencyCycleError(
+                'Requests depend on each other: '
+                + ' -> '.join(f'{item.module}:{item.name}' for item in cycle)
+            )
+        state[node] = VISITING
+        path.append(node)
+        for dependency in get_dependencies(node):
+            visit(dependency)
+        path.pop()
+        state[node] = VISITED
+        order.append(node)
+
+    visit(root)
+    return order
@@ -1,6 +1,7 @@
 import os
 import glob
 from configparser import ConfigParser, ExtendedInterpolation
+from dbgr.cache import digest
 
 _ENVIRONMENT = None
 DEFAULT_ENVIRONMENT = 'default'
@@ -15,8 +16,19 @@ def get_environments():
 class Environment(ConfigParser):
     def __init__(self, env_name):
         super().__init__(interpolation=ExtendedInterpolation())
+        self.name = env_name
         self.read(f'{env_name}.ini')
 
+    @property
+    def fingerprint(self):
+        return digest([self.name, self])
+
+
+def environment_fingerprint(env):
+    if isinstance(env, Environment):
+        return env.fingerprint
+    return digest(env)
+
 
 def init_environment(path=DEFAULT_ENVIRONMENT):
     global _ENVIRONMENT # pylint: disable=W0603
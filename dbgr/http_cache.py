@@ -0,0 +1,337 @@
+import re
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+import aiohttp
+from dbgr.cache import SessionCache, get_disk_cache, digest
+from dbgr.client_response import json_loads
+
+
+HTTP_CACHE_SECTION = 'dbgr.http_cache'
+HTTP_CACHE_STORAGES = ('memory', 'disk')
+CACHEABLE_STATUSES = (200, 203, 300, 301, 308, 410)
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since', 'If-Match', 'If-Unmodified-Since')
+UPDATED_HEADERS = ('Cache-Control', 'Date', 'ETag', 'Expires', 'Last-Modified', 'Vary')
+CACHE_CONTROL_DIRECTIVE = re.compile(r'([\w-]+)(?:\s*=\s*(?:"([^"]*)"|([^,\s]*)))?')
+
+HIT = 'hit'
+REVALIDATED = 'revalidated'
+MISS = 'miss'
+
+
+class InvalidHttpCacheOptionError(ValueError):
+    pass
+
+
+def parse_cache_control(value):
+    directives = {}
+    for match in CACHE_CONTROL_DIRECTIVE.finditer(value or ''):
+        name, quoted, token = match.groups()
+        directives[name.lower()] = quoted if quoted is not None else token
+    return directives
+
+
+def parse_seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CacheEntry:
+    def __init__( # pylint: disable=R0913
+            self, method, url, status, reason, headers, body, request_headers,
+            stored=None):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.vary = {
+            name: request_headers.get(name)
+            for name in self.vary_headers
+        }
+        self.stored = time.time() if stored is None else stored
+
+    @property
+    def vary_headers(self):
+        value = CIMultiDict(self.headers).get('Vary', '')
+        return [name.strip().lower() for name in value.split(',') if name.strip()]
+
+    @property
+    def cache_control(self):
+        return parse_cache_control(CIMultiDict(self.headers).get('Cache-Control'))
+
+    @property
+    def freshness_lifetime(self):
+        headers = CIMultiDict(self.headers)
+        cache_control = self.cache_control
+        if 'no-cache' in cache_control:
+            return 0
+        max_age = parse_seconds(cache_control.get('max-age'))
+        if max_age is not None:
+            return max_age
+        expires = parse_http_date(headers.get('Expires'))
+        if expires is not None:
+            date = parse_http_date(headers.get('Date'))
+            return max(0, expires - (self.stored if date is None else date))
+        return 0
+
+    def age(self, now):
+        header_age = parse_seconds(CIMultiDict(self.headers).get('Age')) or 0
+        return header_age + max(0, now - self.stored)
+
+    def is_fresh(self, now):
+        return self.age(now) < self.freshness_lifetime
+
+    def matches(self, request_headers):
+        return all(request_headers.get(name) == value for name, value in self.vary.items())
+
+    def validators(self):
+        headers = CIMultiDict(self.headers)
+        validators = {}
+        if 'ETag' in headers:
+            validators['If-None-Match'] = headers['ETag']
+        if 'Last-Modified' in headers:
+            validators['If-Modified-Since'] = headers['Last-Modified']
+        return validators
+
+    def update(self, headers, now):
+        updated = CIMultiDict(self.headers)
+        for name in UPDATED_HEADERS:
+            if name in headers:
+                updated[name] = headers[name]
+        updated.popall('Age', None)
+        self.headers = list(updated.items())
+        self.stored = now
+
+
+def is_storable(status, headers, request_headers):
+    cache_control = parse_cache_control(headers.get('Cache-Control'))
+    request_cache_control = parse_cache_control(request_headers.get('Cache-Control'))
+    return (
+        status in CACHEABLE_STATUSES
+        and 'no-store' not in cache_control
+        and 'no-store' not in request_cache_control
+        and headers.get('Vary', '').strip() != '*'
+        and bool(
+            'max-age' in cache_control or 'Expires' in headers
+            or 'ETag' in headers or 'Last-Modified' in headers
+        )
+    )
+
+
+class CachedResponse:
+    def __init__(self, entry, request_headers, cache_status):
+        self.method = entry.method
+        self.url = URL(entry.url)
+        self.real_url = self.url
+        self.status = entry.status
+        self.reason = entry.reason
+        self.headers = CIMultiDictProxy(CIMultiDict(entry.headers))
+        self.request_info = SimpleNamespace(
+            url=self.url, real_url=self.url, method=self.method,
+            headers=CIMultiDictProxy(CIMultiDict(request_headers))
+        )
+        self.history = ()
+        self.cache_status = cache_status
+        self.timing = None
+        self._body = entry.body
+
+    @property
+    def ok(self): # pylint: disable=C0103
+        return self.status < 400
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type', 'application/octet-stream').split(';')[0].strip()
+
+    @property
+    def charset(self):
+        _, _, params = self.headers.get('Content-Type', '').partition(';')
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'charset':
+                return value.strip('"')
+        return None
+
+    async def read(self):
+        return self._body
+
+    async def text(self, encoding=None, errors='strict'):
+        return self._body.decode(encoding or self.charset or 'utf-8', errors)
+
+    async def json(self, *, encoding=None, loads=None, content_type='application/json'):
+        if content_type and content_type not in self.content_type:
+            raise aiohttp.ContentTypeError(
+                self.request_info, self.history,
+                message=f'Attempt to decode JSON with unexpected mimetype: {self.content_type}',
+                headers=self.headers
+            )
+        stripped = self._body.strip()
+        if not stripped:
+            return None
+        loads = json_loads if loads is None else loads
+        return loads(stripped.decode(encoding or self.charset or 'utf-8'))
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise aiohttp.ClientResponseError(
+                self.request_info, self.history, status=self.status,
+                message=self.reason, headers=self.headers
+            )
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_for_close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class HttpCacheStats:
+    def __init__(self):
+        self.counts = {HIT: 0, REVALIDATED: 0, MISS: 0}
+
+    def record(self, status):
+        self.counts[status] += 1
+
+
+class HttpCache:
+    def __init__(self, storage='memory', max_entries=None, clock=time.time):
+        if storage not in HTTP_CACHE_STORAGES:
+            raise InvalidHttpCacheOptionError(
+                f'"{storage}" is not valid storage in section [{HTTP_CACHE_SECTION}]. '
+                f'Supported storages are: {", ".join(HTTP_CACHE_STORAGES)}'
+            )
+        self.storage = storage
+        self.memory = SessionCache(max_entries) if storage == 'memory' else None
+        self.clock = clock
+        self.stats = HttpCacheStats()
+        self.in_flight = {}
+
+    @property
+    def store(self):
+        return self.memory if self.memory is not None else get_disk_cache()
+
+    def is_cacheable(self, method, kwargs):
+        if method.upper() != 'GET':
+            return False
+        if any(kwargs.get(name) is not None for name in ('data', 'json')):
+            return False
+        headers = CIMultiDict(kwargs.get('headers') or {})
+        return not any(name in headers for name in CONDITIONAL_HEADERS)
+
+    def cache_key(self, method, url, kwargs):
+        return digest(['http', method.upper(), str(url), kwargs.get('params')])
+
+    def in_flight_key(self, key, request_headers):
+        headers = sorted((name.lower(), value) for name, value in request_headers.items())
+        return digest([key, headers])
+
+    async def request(self, send, method, url, request_headers, kwargs): # pylint: disable=R0913
+        key = self.cache_key(method, url, kwargs)
+        in_flight_key = self.in_flight_key(key, request_headers)
+        if in_flight_key in self.in_flight:
+            entry = await asyncio.shield(self.in_flight[in_flight_key])
+            if entry is not None:
+                self.stats.record(HIT)
+                return CachedResponse(entry, request_headers, HIT)
+            response = await self.fetch(send, key, method, url, request_headers, kwargs)
+            return response.response
+        future = asyncio.get_event_loop().create_future()
+        self.in_flight[in_flight_key] = future
+        try:
+            response = await self.fetch(send, key, method, url, request_headers, kwargs)
+            future.set_result(response.entry if response.stored else None)
+            return response.response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as ex:
+            future.set_exception(ex)
+            future.exception() # concurrent callers may not exist, mark as retrieved
+            raise
+        finally:
+            del self.in_flight[in_flight_key]
+
+    async def fetch(self, send, key, method, url, request_headers, kwargs): # pylint: disable=R0913
+        now = self.clock()
+        entry = self.store.get(key)
+        request_cache_control = parse_cache_control(request_headers.get('Cache-Control'))
+        if entry is not None and not entry.matches(request_headers):
+            entry = None
+        if entry is not None:
+            revalidate = 'no-cache' in request_cache_control or (
+                parse_seconds(request_cache_control.get('max-age')) == 0
+            )
+            if not revalidate and entry.is_fresh(now):
+                self.stats.record(HIT)
+                return SimpleNamespace(
+                    entry=entry, response=CachedResponse(entry, request_headers, HIT), stored=True
+                )
+            validators = entry.validators()
+            if validators:
+                headers = CIMultiDict(kwargs.get('headers') or {})
+                headers.update(validators)
+                kwargs = dict(kwargs, headers=headers)
+        response = await send(method, url, **kwargs)
+        if entry is not None and response.status == 304:
+            response.release()
+            entry.update(response.headers, self.clock())
+            self.store.set(key, entry)
+            self.stats.record(REVALIDATED)
+            return SimpleNamespace(
+                entry=entry, response=CachedResponse(entry, request_headers, REVALIDATED),
+                stored=True
+            )
+        self.stats.record(MISS)
+        body = await response.read()
+        entry = CacheEntry(
+            method.upper(), str(response.url), response.status, response.reason,
+            list(response.headers.items()), body, request_headers, self.clock()
+        )
+        stored = is_storable(response.status, response.headers, request_headers)
+        if stored:
+            self.store.set(key, entry)
+        return SimpleNamespace(entry=entry, response=response, stored=stored)
+
+
+def http_cache_options(env):
+    if not hasattr(env, 'has_section') or not env.has_section(HTTP_CACHE_SECTION):
+        return None
+    section = env[HTTP_CACHE_SECTION]
+    try:
+        return {
+            'storage': section.get('storage', 'memory'),
+            'max_entries': section.getint('max_entries'),
+        }
+    except ValueError:
+        raise InvalidHttpCacheOptionError(
+            f'Invalid value "{section["max_entries"]}" of option "max_entries" '
+            f'in section [{HTTP_CACHE_SECTION}]'
+        )
+
+
+def create_http_cache(env):
+    options = http_cache_options(env)
+    return None if options is None else HttpCache(**options)
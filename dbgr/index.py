@@ -0,0 +1,204 @@
+import ast
+import os
+from dbgr.cache import get_data_dir, read_json, write_json
+
+
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 2
+PACKAGE_INIT = '__init__'
+DECORATOR_MODULES = ('dbgr', 'dbgr.requests')
+DECORATOR_NAMES = ('request', 'request_decorator')
+
+_INDEX = None
+
+
+def extract_module_name(module_path, directory=None):
+    if directory is None:
+        return os.path.splitext(os.path.basename(module_path))[0]
+    parts = os.path.splitext(os.path.relpath(module_path, directory))[0].split(os.sep)
+    if len(parts) > 1 and parts[-1] == PACKAGE_INIT:
+        parts.pop()
+    return '.'.join(parts)
+
+
+def is_package(directory):
+    return os.path.isfile(os.path.join(directory, f'{PACKAGE_INIT}.py'))
+
+
+def find_modules(directory):
+    for root, directories, files in os.walk(directory):
+        directories[:] = sorted(
+            name for name in directories if is_package(os.path.join(root, name))
+        )
+        for name in sorted(files):
+            if name.endswith('.py'):
+                yield os.path.join(root, name)
+
+
+def in_package(module, package):
+    return module == package or module.startswith(f'{package}.')
+
+
+def constant_value(node):
+    try:
+        return True, ast.literal_eval(node)
+    except ValueError:
+        return False, None
+
+
+def dotted_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = dotted_name(node.value)
+        return f'{parent}.{node.attr}' if parent else None
+    return None
+
+
+class ModuleVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.aliases = {'request'}
+        self.references = 0
+        self.resolved = 0
+        self.requests = []
+
+    def visit_Import(self, node): # pylint: disable=C0103
+        for alias in node.names:
+            if alias.name in DECORATOR_MODULES:
+                module = alias.asname or alias.name
+                self.aliases.update(f'{module}.{name}' for name in DECORATOR_NAMES)
+
+    def visit_ImportFrom(self, node): # pylint: disable=C0103
+        if node.module in DECORATOR_MODULES:
+            for alias in node.names:
+                if alias.name in DECORATOR_NAMES:
+                    self.aliases.add(alias.asname or alias.name)
+
+    def visit_Name(self, node): # pylint: disable=C0103
+        if node.id in self.aliases:
+            self.references += 1
+
+    def visit_Attribute(self, node): # pylint: disable=C0103
+        if dotted_name(node) in self.aliases:
+            self.references += 1
+        else:
+            self.generic_visit(node)
+
+    def is_decorator(self, node):
+        return dotted_name(node) in self.aliases
+
+    def parse_decorator(self, decorator, function):
+        options = {'name': function.name, 'cache': None}
+        if isinstance(decorator, ast.Call):
+            keywords = {keyword.arg: keyword.value for keyword in decorator.keywords}
+            for position, option in enumerate(('name', 'cache')):
+                if len(decorator.args) > position:
+                    keywords[option] = decorator.args[position]
+            for option in ('name', 'cache'):
+                if option in keywords:
+                    is_constant, value = constant_value(keywords[option])
+                    if not is_constant:
+                        return None
+                    options[option] = value if value is not None else options[option]
+        return options
+
+    def visit_function(self, node):
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            if not self.is_decorator(target):
+                continue
+            options = self.parse_decorator(decorator, node)
+            if options is not None:
+                self.resolved += 1
+                options['arguments'] = [argument.arg for argument in node.args.args]
+                self.requests.append(options)
+        self.generic_visit(node)
+
+    visit_FunctionDef = visit_function # pylint: disable=C0103
+    visit_AsyncFunctionDef = visit_function # pylint: disable=C0103
+
+    @property
+    def dynamic(self):
+        return self.references != self.resolved
+
+
+def parse_module(module_path):
+    try:
+        with open(module_path, 'rb') as module_file:
+            tree = ast.parse(module_file.read(), module_path)
+    except (SyntaxError, ValueError):
+        return {'requests': [], 'dynamic': True}
+    visitor = ModuleVisitor()
+    visitor.visit(tree)
+    return {'requests': visitor.requests, 'dynamic': visitor.dynamic}
+
+
+def module_signature(module_path):
+    stat = os.stat(module_path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class RequestIndex:
+    def __init__(self, directory, path=None):
+        self.directory = directory
+        self.path = path
+        self.modules = {}
+
+    def load(self):
+        data = read_json(self.path) or {}
+        if data.get('version') == INDEX_VERSION and data.get('directory') == self.directory:
+            self.modules = data['modules']
+
+    def save(self):
+        write_json(self.path, {
+            'version': INDEX_VERSION, 'directory': self.directory, 'modules': self.modules
+        })
+
+    def module_paths(self):
+        return find_modules(self.directory)
+
+    def refresh(self):
+        if self.path:
+            self.load()
+        changed = False
+        modules = {}
+        for module_path in self.module_paths():
+            signature = module_signature(module_path)
+            entry = self.modules.get(module_path)
+            if entry is None or entry['signature'] != signature:
+                entry = parse_module(module_path)
+                entry['signature'] = signature
+                entry['module'] = extract_module_name(module_path, self.directory)
+                changed = True
+            modules[module_path] = entry
+        changed = changed or modules.keys() != self.modules.keys()
+        self.modules = modules
+        if changed and self.path:
+            self.save()
+        return self
+
+    def find(self, module=None, request=None):
+        if module:
+            paths = [path for path, entry in self.modules.items() if entry['module'] == module]
+            return paths or None
+        paths, found = [], False
+        for module_path, entry in self.modules.items():
+            defined = any(req['name'] == request for req in entry['requests'])
+            if defined or entry['dynamic']:
+                paths.append(module_path)
+            found = found or defined
+        return paths if found else None
+
+    def find_package(self, package):
+        paths = [
+            path for path, entry in self.modules.items() if in_package(entry['module'], package)
+        ]
+        return paths or None
+
+
+def get_index():
+    global _INDEX # pylint: disable=W0603
+    if _INDEX is None:
+        path = os.path.join(get_data_dir(), INDEX_FILE)
+        _INDEX = RequestIndex(os.getcwd(), path).refresh()
+    return _INDEX
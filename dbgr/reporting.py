@@ -1,70 +1,208 @@
+import re
+import sys
 import asyncio
 import json
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import time
+from datetime import timedelta
 from itertools import cycle
 import cgi
-import aiohttp
-from pygments import highlight, lexers
-from pygments.util import ClassNotFound as LexerNotFound
-from pygments.formatters import TerminalFormatter # pylint: disable=E0611
 from colorama import Style, Fore
 
 SILENT = False
+BODY_LIMIT = 64 * 1024
+HEX_PREVIEW = 256
+BINARY_TYPES = ('application/octet-stream', 'image/', 'audio/', 'video/', 'font/')
+HIGHLIGHT_LIMIT = 16 * 1024
+TEXT_CONTROL_CHARS = set(range(32)) - set(b'\t\n\r\f\b\x1b')
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+_LEXERS = {}
+_FORMATTER = None
+_OUTPUT = None
+
+
+class Output:
+    def __init__(self, path=None):
+        self.path = path
+        self.executor = None
+
+    def append_to_file(self, text):
+        with open(self.path, 'a') as output_file:
+            output_file.write(ANSI_ESCAPE.sub('', text))
+
+    async def write(self, text):
+        if not text:
+            return
+        if self.path is None:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self.executor, self.append_to_file, text)
+
+
+def get_output():
+    global _OUTPUT # pylint: disable=W0603
+    if _OUTPUT is None:
+        _OUTPUT = Output()
+    return _OUTPUT
+
+
+def set_output(path=None):
+    global _OUTPUT # pylint: disable=W0603
+    if _OUTPUT is None or _OUTPUT.path != path:
+        _OUTPUT = Output(path)
+    return _OUTPUT
+
+
+def get_lexer(mime):
+    if mime not in _LEXERS:
+        from pygments import lexers
+        from pygments.util import ClassNotFound as LexerNotFound
+        try:
+            _LEXERS[mime] = lexers.get_lexer_for_mimetype(mime)
+        except LexerNotFound:
+            _LEXERS[mime] = None
+    return _LEXERS[mime]
+
+
+def get_formatter():
+    global _FORMATTER # pylint: disable=W0603
+    if _FORMATTER is None:
+        from pygments.formatters import TerminalFormatter # pylint: disable=E0611
+        _FORMATTER = TerminalFormatter()
+    return _FORMATTER
+
+
+def colorize_json(value):
+    buff = []
+    write_colorized_json(buff, value, 0)
+    return ''.join(buff)
+
+
+def write_colorized_json(buff, value, indent):
+    if isinstance(value, (dict, list)) and value:
+        is_dict = isinstance(value, dict)
+        opening, closing = ('{', '}') if is_dict else ('[', ']')
+        padding = ' ' * (indent + 2)
+        buff.append(f'{opening}\n')
+        for position, key in enumerate(sorted(value) if is_dict else range(len(value))):
+            if position:
+                buff.append(',\n')
+            buff.append(padding)
+            if is_dict:
+                buff.append(f'{Fore.BLUE}{json.dumps(key)}{Style.RESET_ALL}: ')
+            write_colorized_json(buff, value[key], indent + 2)
+        buff.append(f'\n{" " * indent}{closing}')
+    elif isinstance(value, str):
+        buff.append(f'{Fore.GREEN}{json.dumps(value)}{Style.RESET_ALL}')
+    elif isinstance(value, (bool, type(None))):
+        buff.append(f'{Fore.MAGENTA}{json.dumps(value)}{Style.RESET_ALL}')
+    elif isinstance(value, (int, float)):
+        buff.append(f'{Fore.CYAN}{json.dumps(value)}{Style.RESET_ALL}')
+    else:
+        buff.append(json.dumps(value))
 
 class ProgressBar():
-    def __init__(self):
-        self.message = ''
-        self.running = False
+    def __init__(self, interval=0.1, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self.in_flight = {}
+        self.received = 0
+        self.task = None
         self.message_length = 0
 
+    @property
+    def running(self):
+        return self.task is not None
+
     def start(self):
-        self.running = True
-        asyncio.ensure_future(self.render())
+        self.received = 0
+        self.task = asyncio.ensure_future(self.render())
 
     def stop(self):
-        self.running = False
+        self.task.cancel()
+        self.task = None
+        print(f'\r{" "*self.message_length}', end='\r')
+
+    def message(self, symbol):
+        if len(self.in_flight) == 1:
+            _, redirected = next(iter(self.in_flight.values()))
+            label = 'redirecting' if redirected else 'request send'
+        else:
+            label = f'{len(self.in_flight)} requests'
+        started = min(started for started, _ in self.in_flight.values())
+        elapsed = timedelta(seconds=self.clock() - started)
+        message = f'\r{label} {symbol} [{elapsed}]'
+        if self.received:
+            message += f' {self.received}B received'
+        return message
 
     async def render(self):
-        start = datetime.now()
-        for symbol in cycle(['\\', '-', '/', '|']):# pragma: no cover
-            if not self.running:
-                return
-            elapsed = datetime.now() - start
-            message = f'\r{self.message} {symbol} [{elapsed}]'
+        for symbol in cycle(['\\', '-', '/', '|']):
+            message = self.message(symbol)
+            print(f'{message}{" " * (self.message_length - len(message))}', end='')
             self.message_length = len(message)
-            print(message, end='')
-            await asyncio.sleep(0.1)
+            await asyncio.sleep(self.interval)
 
     async def on_request_start(self, session, trace_ctx, params): # pylint: disable=W0613
-        self.message = 'request send'
-        self.start()
+        if not SILENT:
+            self.in_flight[id(trace_ctx)] = (self.clock(), False)
+            if not self.running:
+                self.start()
 
     async def on_request_redirect(self, session, trace_ctx, params): # pylint: disable=W0613
-        self.message = 'redirecting'
+        if id(trace_ctx) in self.in_flight:
+            started, _ = self.in_flight[id(trace_ctx)]
+            self.in_flight[id(trace_ctx)] = (started, True)
+
+    async def on_response_chunk_received(self, session, trace_ctx, params): # pylint: disable=W0613
+        if self.running:
+            self.received += len(params.chunk)
 
     async def on_request_end(self, session, trace_ctx, params): # pylint: disable=W0613
-        self.stop()
-        print(f'\r{" "*self.message_length}', end='\r')
+        self.in_flight.pop(id(trace_ctx), None)
+        if self.running and not self.in_flight:
+            self.stop()
 
     def get_tracer(self):
+        import aiohttp
         tracer = aiohttp.TraceConfig()
         tracer.on_request_start.append(self.on_request_start)
         tracer.on_request_end.append(self.on_request_end)
+        tracer.on_request_exception.append(self.on_request_end)
         tracer.on_request_redirect.append(self.on_request_redirect)
+        tracer.on_response_chunk_received.append(self.on_response_chunk_received)
         return tracer
 
 
 class Reporter():
+    def __init__(self, output=None):
+        self.output = output
+        self.buffer = []
+
     def get_tracer(self):
+        import aiohttp
         tracer = aiohttp.TraceConfig()
         tracer.on_request_end.append(self.on_request_end)
         return tracer
 
+    def write(self, text=''):
+        self.buffer.append(f'{text}{Style.RESET_ALL}\n')
+
+    async def flush(self):
+        text, self.buffer = ''.join(self.buffer), []
+        await (self.output or get_output()).write(text)
+
     def p_out(self, text='', indent=0):
-        print(f'{Style.DIM}>{Style.RESET_ALL}{" "*(indent+1)}{text}'.strip())
+        self.write(f'{Style.DIM}>{Style.RESET_ALL}{" "*(indent+1)}{text}'.strip())
 
     def p_in(self, text='', indent=0):
-        print(f'{Style.DIM}<{Style.RESET_ALL}{" "*(indent+1)}{text}'.strip())
+        self.write(f'{Style.DIM}<{Style.RESET_ALL}{" "*(indent+1)}{text}'.strip())
 
     def p_in_h1(self, text, sup=None, indent=0):
         self.p_in()
@@ -104,17 +242,26 @@ class Reporter():
         for name, value in response.headers.items():
             self.p_in(f'{name}: {value}', indent=1)
 
+    def highlight(self, mime, data):
+        lexer = get_lexer(mime)
+        if lexer is not None:
+            from pygments import highlight
+            rest = ''
+            if len(data) > HIGHLIGHT_LIMIT:
+                split = data.rfind('\n', 0, HIGHLIGHT_LIMIT) + 1 or HIGHLIGHT_LIMIT
+                data, rest = data[:split], data[split:]
+            data = highlight(data, lexer, get_formatter()) + rest
+        return data.strip()
+
     def highlight_content(self, mime, data):
         if mime.startswith('application/json'):
-            data = json.dumps(json.loads(data), sort_keys=True, indent=2)
+            try:
+                return colorize_json(json.loads(data))
+            except ValueError:
+                pass
         elif mime.startswith('application/octet-stream'):
             data = '<binary data>'
-        try:
-            lexer = lexers.get_lexer_for_mimetype(mime)
-            data = highlight(data, lexer, TerminalFormatter())
-        except LexerNotFound:
-            pass
-        return data.strip()
+        return self.highlight(mime, data)
 
     def parse_content_type(self, content_type):
         value, _ = cgi.parse_header(content_type)
@@ -123,14 +270,58 @@ class Reporter():
     def get_response_content_type(self, response):
         return self.parse_content_type(response.headers.get('content-type', ''))
 
+    def get_response_encoding(self, response):
+        _, params = cgi.parse_header(response.headers.get('content-type', ''))
+        return params.get('charset', 'utf-8')
+
+    def is_binary(self, mime, body):
+        if mime.startswith(BINARY_TYPES):
+            return True
+        sample = body[:1024]
+        return any(byte in TEXT_CONTROL_CHARS for byte in sample)
+
+    def format_hex(self, body):
+        lines = []
+        for offset in range(0, min(len(body), HEX_PREVIEW), 16):
+            row = body[offset:offset + 16]
+            hex_values = ' '.join(f'{byte:02x}' for byte in row)
+            text = ''.join(chr(byte) if 32 <= byte < 127 else '.' for byte in row)
+            lines.append(f'{offset:08x}  {hex_values:<47}  {text}')
+        return '\n'.join(lines)
+
+    def print_binary_response(self, body):
+        self.write(f'{Style.DIM}<binary data, {len(body)}B>{Style.RESET_ALL}')
+        self.write(self.format_hex(body))
+        if len(body) > HEX_PREVIEW:
+            self.write(f'{Style.DIM}[... {len(body) - HEX_PREVIEW}B omitted ...]{Style.RESET_ALL}')
+
     async def print_response(self, response):
         content_type = self.get_response_content_type(response)
         self.p_in_h1(f'Response data', sup=content_type)
-        if content_type.startswith('application/json'):
-            data = json.dumps(await response.json(), sort_keys=True, indent=2)
-        else:
-            data = await response.text()
-        print(self.highlight_content(content_type, data))
+        body = await response.read()
+        if self.is_binary(content_type, body):
+            self.print_binary_response(body)
+            return
+        encoding = self.get_response_encoding(response)
+        if not BODY_LIMIT or len(body) <= BODY_LIMIT:
+            if content_type.startswith('application/json'):
+                try:
+                    self.write(colorize_json(await response.json()))
+                    return
+                except ValueError:
+                    pass
+            try:
+                data = await response.text()
+            except UnicodeDecodeError:
+                data = body.decode(encoding, errors='replace')
+            self.write(self.highlight(content_type, data))
+            return
+        half = BODY_LIMIT // 2
+        head = body[:half].decode(encoding, errors='replace')
+        tail = body[-half:].decode(encoding, errors='replace')
+        self.write(self.highlight(content_type, head))
+        self.write(f'{Style.DIM}[... {len(body) - 2 * half}B omitted ...]{Style.RESET_ALL}')
+        self.write(self.highlight(content_type, tail))
 
     async def print_request_headers(self, response):
         self.p_out_h1('Request headers')
@@ -139,11 +330,46 @@ class Reporter():
                 value = value[0:100] + ' [...]'
             self.p_out(f'{name}: {value}', indent=1)
 
+    def format_duration(self, duration):
+        return f'{duration * 1000:.2f}ms'
+
+    def print_timing(self, timing):
+        connection = 'connection reused' if timing.connection_reused else 'new connection'
+        self.p_in_h1('Timing', sup=connection)
+        for phase, duration in timing.phases.items():
+            if duration is not None:
+                line = f'{phase.capitalize()}: {self.format_duration(duration)}'
+                if phase == 'wait' and timing.server is not None:
+                    line += (
+                        f' {Style.DIM}(server: {self.format_duration(timing.server)}, '
+                        f'network: {self.format_duration(timing.network)}){Style.RESET_ALL}'
+                    )
+                self.p_in(line, indent=1)
+        if timing.server_timing:
+            self.p_in_h1('Server timing')
+            for metric in timing.server_timing:
+                line = metric.name
+                if metric.duration is not None:
+                    line += f': {self.format_duration(metric.duration)}'
+                if metric.description:
+                    line += f' {Style.DIM}({metric.description}){Style.RESET_ALL}'
+                self.p_in(line, indent=1)
+
+    def print_http_cache(self, response, http_cache):
+        status = getattr(response, 'cache_status', 'miss')
+        counts = http_cache.stats.counts
+        self.p_in_h1('HTTP cache', sup=status)
+        self.p_in(
+            f'Hits: {counts["hit"]}, revalidated: {counts["revalidated"]}, '
+            f'misses: {counts["miss"]}', indent=1
+        )
+
     def get_part_name(self, part):
         _, params = cgi.parse_header(part.headers['content-disposition'])
         return params.get('name', '# Part')
 
     def print_multipart_request_data(self, data):
+        from aiohttp.payload import BufferedReaderPayload
         for part, *_ in data:
             self.p_out_h2(self.get_part_name(part), sup=part.content_type)
             if part.filename:
@@ -155,10 +381,10 @@ class Reporter():
             for key, value in part.headers.items():
                 self.p_out(f'{key}: {value}', indent=4)
             self.p_out(f'- Content:', indent=1)
-            if isinstance(part, aiohttp.payload.BufferedReaderPayload):
-                print(f'{Style.DIM}Contents of "{part._value.name}"')
+            if isinstance(part, BufferedReaderPayload):
+                self.write(f'{Style.DIM}Contents of "{part._value.name}"')
             else:
-                print(self.highlight_content(part.content_type, part._value))
+                self.write(self.highlight_content(part.content_type, part._value))
 
     def get_request_data(self, request_context):
         data = None
@@ -173,27 +399,39 @@ class Reporter():
         return self.parse_content_type(header)
 
     async def print_request_data(self, response, request_context):
+        from aiohttp.multipart import MultipartWriter
         data = self.get_request_data(request_context)
         if data:
             content_type = self.get_request_content_type(response)
             self.p_out_h1('Request data', sup=content_type)
-            if isinstance(data, aiohttp.multipart.MultipartWriter):
+            if isinstance(data, MultipartWriter):
                 self.print_multipart_request_data(data)
             else:
-                print(self.highlight_content(content_type, data))
+                self.write(self.highlight_content(content_type, data))
+
+    async def print_report(self, response, request_context):
+        await self.print_request(response)
+        await self.print_info(response)
+        await self.print_request_headers(response)
+        await self.print_request_data(response, request_context)
+        await self.print_response_headers(response)
+        await self.print_response(response)
+        timing = getattr(request_context, 'timing', None)
+        if timing is not None:
+            self.print_timing(timing)
+        http_cache = getattr(request_context, 'http_cache', None)
+        if http_cache is not None:
+            self.print_http_cache(response, http_cache)
+        await self.flush()
 
     async def on_request_end(self, session, trace_ctx, params): # pylint: disable=W0613
-        if not SILENT:
-            response = params.response
-            await self.print_request(response)
-            await self.print_info(response)
-            await self.print_request_headers(response)
-            await self.print_request_data(response, trace_ctx.trace_request_ctx)
-            await self.print_response_headers(response)
-            await self.print_response(response)
+        # responses of HTTP cache are reported by the session once the cache handles them
+        if not SILENT and getattr(trace_ctx.trace_request_ctx, 'http_cache', None) is None:
+            report = Reporter(self.output)
+            await report.print_report(params.response, trace_ctx.trace_request_ctx)
 
 
-def report_result(result):
+async def report_result(result):
     if not SILENT:
         from_cache = ''
         if result.cached:
@@ -204,4 +442,4 @@ def report_result(result):
         )
         if result.value is not None:
             buffer += f'{Style.RESET_ALL}:\n{str(result)}'
-        print(buffer)
+        await get_output().write(f'{buffer}{Style.RESET_ALL}\n')
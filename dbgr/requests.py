@@ -1,19 +1,37 @@
-import inspect
+import asyncio
+import contextlib
+import contextvars
 import os
+import sys
+import types
 import functools
+import importlib
 import importlib.util
-import glob
+from collections.abc import Mapping
 import colorama
-from dbgr.environment import get_environment
-from dbgr.session import get_session
+from dbgr.environment import get_environment, environment_fingerprint
 from dbgr.types import Type
-from dbgr.arguments import DefaultValueArgument, NoDefaultValueArgument
+from dbgr.arguments import Signature
 from dbgr.results import Result
+from dbgr.cache import get_disk_cache, SessionCache, digest
+from dbgr.index import get_index, extract_module_name, find_modules
+from dbgr.dependencies import discover_dependencies, topological_order
 from dbgr import reporting
 
 
-_REQUESTS = None
+PACKAGES_ROOT = '__dbgr__'
+
+_REQUESTS = {}
+_NAMES = {}
+_LOADED_MODULES = set()
+_ALL_LOADED = False
 _CACHE = {}
+_IN_FLIGHT = {}
+_MISSING = object()
+_SCHEDULED = contextvars.ContextVar('scheduled', default=None)
+_DECLARED = contextvars.ContextVar('declared', default=frozenset())
+_ACTIVE = contextvars.ContextVar('active', default=(None, None))
+CACHE_TYPES = ('session', 'disk')
 
 
 class RequestNotFoundError(ValueError):
@@ -36,20 +54,43 @@ class DuplicateRequestNameError(ValueError):
     pass
 
 
+class InvalidCacheTypeError(ValueError):
+    pass
+
+
+class InvalidDependencyError(ValueError):
+    pass
+
+
 class Request:
     env_arg = 'env'
     session_arg = 'session'
 
-    def __init__(self, request, name=None, cache=None):
+    def __init__( # pylint: disable=R0913
+            self, request, name=None, cache=None, ttl=None, max_entries=None,
+            max_bytes=None, depends=None):
         self.name = name if name is not None else request.__name__
         self.request = request
         self.cache = cache
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.depends = depends
+        self._dependencies = None
         self.validate_name()
+        self.validate_cache()
+        self.validate_depends()
         self.annotation = Type.get_type(self.request.__annotations__.get('return'))
+        self.signature = Signature(
+            request, self.env_arg, self.session_arg, self.dependency_arguments
+        )
 
     @property
     def module(self):
-        return self.request.__module__
+        module = self.request.__module__
+        if module.startswith(f'{PACKAGES_ROOT}.'):
+            return module[len(PACKAGES_ROOT) + 1:]
+        return module
 
     @property
     def doc(self):
@@ -59,84 +100,133 @@ class Request:
 
     @property
     def extra_arguments(self):
-        extras = []
-        args_spec = inspect.getfullargspec(self.request)
-        args = args_spec.args
-        if self.env_arg in args:
-            args.remove(self.env_arg)
-        if self.session_arg in args:
-            args.remove(self.session_arg)
-        defaults = list(args_spec.defaults or [])
-        for argument in args[::-1]:
-            annotation = Type.get_type(args_spec.annotations.get(argument))
-            if defaults:
-                arg = DefaultValueArgument(argument, annotation, defaults.pop())
+        return list(self.signature.arguments)
+
+    @property
+    def dependency_arguments(self):
+        return list(self.depends) if isinstance(self.depends, Mapping) else []
+
+    @property
+    def dependencies(self):
+        if self._dependencies is None:
+            if self.depends is None:
+                self._dependencies = []
+            elif self.depends is True:
+                names = discover_dependencies(self.request, execute_request)
+                self._dependencies = [(None, name) for name in names]
+            elif isinstance(self.depends, Mapping):
+                self._dependencies = list(self.depends.items())
             else:
-                arg = NoDefaultValueArgument(argument, annotation)
-            extras.append(arg)
-        return extras[::-1]
+                self._dependencies = [(None, name) for name in self.depends]
+        return self._dependencies
 
     @property
     def requires_env(self):
-        args_spec = inspect.getfullargspec(self.request)
-        return self.env_arg in args_spec.args[:2]
+        return self.signature.env_arg is not None
 
     @property
     def requires_session(self):
-        args_spec = inspect.getfullargspec(self.request)
-        return self.session_arg in args_spec.args[:2]
-
-    def resolve_arguments(self, env, session, use_defaults, kwargs):
-        arguments = {}
-        for argument in self.extra_arguments:
-            arguments[argument.name] = argument.get_value(
-                kwargs, use_default=use_defaults
-            )
-        if self.requires_env:
-            arguments[self.env_arg] = env
-        if self.requires_session:
-            arguments[self.session_arg] = session
-        return arguments
-
-    def cache_key(self, arguments):
-        key = set((self.name, self.module))
-        for name, value in arguments.items():
-            if name not in (self.env_arg, self.session_arg):
-                key.add((name, value))
-        return frozenset(key)
+        return self.signature.session_arg is not None
+
+    def resolve_arguments(self, env, session, use_defaults, kwargs, dependencies=None):
+        return self.signature.bind(env, session, use_defaults, kwargs, dependencies)
+
+    def cache_key(self, env, arguments):
+        return digest([
+            self.module,
+            self.name,
+            environment_fingerprint(env),
+            {
+                name: value for name, value in arguments.items()
+                if name not in (self.env_arg, self.session_arg)
+            }
+        ])
 
     async def __call__( # pylint: disable=R0913
             self, env, session, use_defaults=False, cache=True, silent=False,
-            kwargs=None):
+            kwargs=None, dependencies=None):
         kwargs = {} if kwargs is None else kwargs
-        arguments = self.resolve_arguments(env, session, use_defaults, kwargs)
+        arguments = self.resolve_arguments(env, session, use_defaults, kwargs, dependencies)
         if self.cache:
-            cached = True
-            key = self.cache_key(arguments)
-            if key not in _CACHE or not cache:
-                cached = False
-                _CACHE[key] = await self.request(**arguments)
-            return Result(_CACHE[key], self.annotation, cached)
+            storage = self.get_cache()
+            key = self.cache_key(env, arguments)
+            value = storage.get(key, _MISSING) if cache else _MISSING
+            if value is not _MISSING:
+                return Result(value, self.annotation, True)
+            if key not in _IN_FLIGHT:
+                value = await self.execute_once(storage, key, arguments)
+            elif cache:
+                value = await asyncio.shield(_IN_FLIGHT[key])
+                return Result(value, self.annotation, True)
+            else:
+                value = await self.request(**arguments)
+                storage.set(key, value, self.ttl)
+            return Result(value, self.annotation, False)
         value = await self.request(**arguments)
         return Result(value, self.annotation)
 
+    async def execute_once(self, storage, key, arguments):
+        future = asyncio.get_event_loop().create_future()
+        _IN_FLIGHT[key] = future
+        try:
+            value = await self.request(**arguments)
+            storage.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as ex:
+            future.set_exception(ex)
+            future.exception() # concurrent callers may not exist, mark as retrieved
+            raise
+        finally:
+            del _IN_FLIGHT[key]
+
+    def get_cache(self):
+        if self.cache == 'disk':
+            return get_disk_cache()
+        key = (self.module, self.name)
+        if key not in _CACHE:
+            _CACHE[key] = SessionCache(self.max_entries, self.max_bytes)
+        return _CACHE[key]
+
     def validate_name(self):
         if not self.name.isidentifier():
             raise InvalidRequestNameError(
                 f'"{self.module}:{self.name}" is not valid request identifier. '
                 f'Name can containt only letters, numbers and/or underscore'
             )
-        if self.name in get_requests().get(self.module, set()):
+        if self.name in _REQUESTS.get(self.module, {}):
             raise DuplicateRequestNameError(
                 f'"{self.name}" is already defined in module {self.module}'
             )
 
+    def validate_cache(self):
+        if self.cache and self.cache not in CACHE_TYPES:
+            raise InvalidCacheTypeError(
+                f'"{self.cache}" is not valid cache type for request "{self.module}:{self.name}". '
+                f'Supported types are: {", ".join(CACHE_TYPES)}'
+            )
+
+    def validate_depends(self):
+        if self.depends is None or self.depends is True:
+            return
+        names = list(self.depends.values() if isinstance(self.depends, Mapping) else self.depends)
+        if isinstance(self.depends, str) or not all(isinstance(name, str) for name in names):
+            raise InvalidDependencyError(
+                f'Dependencies of request "{self.module}:{self.name}" must be True, list of '
+                f'request names or dictionary mapping arguments to request names'
+            )
+
     def __str__(self):
         buff = f'- {self.name}\n'
         if self.annotation or self.cache:
             buff_1, buff_2 = '', ''
             if self.cache:
                 buff_1 = f'cache: {self.cache}'
+                if self.ttl is not None:
+                    buff_1 += f', ttl: {self.ttl}s'
             if self.annotation:
                 buff_2 = f'return: {self.annotation}'
             buff += f'  {colorama.Style.DIM}[{buff_1}{", " if buff_1 and buff_2 else ""}{buff_2}]\n'
@@ -150,11 +240,31 @@ class Request:
 
 
 def get_requests():
-    if _REQUESTS is None:
+    if not _ALL_LOADED:
         load_requests()
     return _REQUESTS
 
 
+def get_requests_for(module, request):
+    if not _ALL_LOADED:
+        module_paths = get_index().find(module, request)
+        if module_paths is None:
+            return get_requests()
+        for module_path in module_paths:
+            load_module(module_path)
+    return _REQUESTS
+
+
+def get_requests_in(package):
+    if not _ALL_LOADED:
+        module_paths = get_index().find_package(package)
+        if module_paths is None:
+            return get_requests()
+        for module_path in module_paths:
+            load_module(module_path)
+    return _REQUESTS
+
+
 def parse_cmd_arguments(args):
     result = {}
     for arg in args:
@@ -166,6 +276,87 @@ def parse_cmd_arguments(args):
     return result
 
 
+def find_dependencies(request):
+    return [find_request(name) for _, name in request.dependencies]
+
+
+def dependency_values(request, scheduled):
+    return {
+        argument: scheduled[find_request(name)].result().value
+        for argument, name in request.dependencies if argument is not None
+    }
+
+
+@contextlib.contextmanager
+def declared_dependencies(request):
+    token = _DECLARED.set(frozenset(find_dependencies(request)))
+    try:
+        yield
+    finally:
+        _DECLARED.reset(token)
+
+
+@contextlib.contextmanager
+def active_environment(env, session):
+    token = _ACTIVE.set((env, session))
+    try:
+        yield
+    finally:
+        _ACTIVE.reset(token)
+
+
+@contextlib.contextmanager
+def dependency_scope():
+    token = _SCHEDULED.set({}) if _SCHEDULED.get() is None else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _SCHEDULED.reset(token)
+
+
+async def execute_dependencies(request, env, session, use_defaults=False):
+    scheduled = _SCHEDULED.get()
+    order = topological_order(
+        request, lambda node: [] if node in scheduled else find_dependencies(node)
+    )
+
+    async def execute_dependency(node):
+        dependencies = find_dependencies(node)
+        await asyncio.gather(*[scheduled[dependency] for dependency in dependencies])
+        with declared_dependencies(node):
+            result = await node(
+                env, session, use_defaults=use_defaults,
+                dependencies=dependency_values(node, scheduled)
+            )
+        await reporting.report_result(result)
+        return result
+
+    created = []
+    for node in order[:-1]:
+        if node not in scheduled:
+            scheduled[node] = asyncio.ensure_future(execute_dependency(node))
+            created.append(scheduled[node])
+    try:
+        await asyncio.gather(*[scheduled[node] for node in order[:-1]])
+    except BaseException:
+        for task in created:
+            task.cancel()
+        raise
+    return dependency_values(request, scheduled)
+
+
+async def execute( # pylint: disable=R0913
+        request, env, session, use_defaults=False, cache=True, kwargs=None):
+    with dependency_scope(), active_environment(env, session):
+        dependencies = await execute_dependencies(request, env, session, use_defaults)
+        with declared_dependencies(request):
+            return await request(
+                env, session, use_defaults=use_defaults, cache=cache,
+                kwargs=kwargs, dependencies=dependencies
+            )
+
+
 async def execute_request( # pylint: disable=R0913
         request, env=None, session=None, use_defaults=False, cache=True,
         silent=False, **kwargs):
@@ -173,65 +364,88 @@ async def execute_request( # pylint: disable=R0913
         orig_silent = reporting.SILENT
         if silent:
             reporting.SILENT = True
+        from dbgr.session import get_session
+        if env is None:
+            env, active_session = _ACTIVE.get()
+            session = session if session is not None else active_session
         env = env if env is not None else get_environment()
-        session = session if session is not None else get_session()
+        session = session if session is not None else get_session(env)
         request = find_request(request)
-        result = await request(
-            env, session, use_defaults=use_defaults, cache=cache,
-            kwargs=kwargs
+        if request in _DECLARED.get() and cache and not kwargs:
+            return (await _SCHEDULED.get()[request]).value
+        result = await execute(
+            request, env, session, use_defaults=use_defaults, cache=cache, kwargs=kwargs
         )
-        reporting.report_result(result)
+        await reporting.report_result(result)
         return result.value
     finally:
         reporting.SILENT = orig_silent
 
 
-def extract_module_name(module_path):
-    return os.path.splitext(os.path.basename(module_path))[0]
+def unload_packages():
+    for name in list(sys.modules):
+        if name == PACKAGES_ROOT or name.startswith(f'{PACKAGES_ROOT}.'):
+            del sys.modules[name]
+
+
+def packages_root():
+    root = sys.modules.get(PACKAGES_ROOT)
+    if root is None or root.__path__ != [os.getcwd()]:
+        unload_packages()
+        importlib.invalidate_caches()
+        root = types.ModuleType(PACKAGES_ROOT)
+        root.__path__ = [os.getcwd()]
+        sys.modules[PACKAGES_ROOT] = root
+    return root
 
 
 def load_module(module_path):
-    module_name = extract_module_name(module_path)
+    if module_path in _LOADED_MODULES:
+        return
+    _LOADED_MODULES.add(module_path)
+    module_name = extract_module_name(module_path, os.getcwd())
+    if os.path.dirname(os.path.relpath(module_path, os.getcwd())):
+        # modules in packages are imported with their parent packages, so that relative
+        # imports work, under a root that doesn't shadow installed packages
+        packages_root()
+        importlib.import_module(f'{PACKAGES_ROOT}.{module_name}')
+        return
     spec = importlib.util.spec_from_file_location(module_name, module_path)
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
 
 
 def load_requests():
-    global _REQUESTS # pylint: disable=W0603
-    _REQUESTS = {}
-    for module_path in glob.glob(f'{os.getcwd()}/*.py'):
+    global _ALL_LOADED # pylint: disable=W0603
+    for module_path in find_modules(os.getcwd()):
         load_module(module_path)
+    _ALL_LOADED = True
 
 
 def register_request(request):
     if request.module not in _REQUESTS:
         _REQUESTS[request.module] = {}
     _REQUESTS[request.module][request.name] = request
+    _NAMES.setdefault(request.name, {})[request.module] = request
 
 
 def find_request(request_name):
     module, request = parse_request_name(request_name)
-    requests = get_requests()
+    requests = get_requests_for(module, request)
+    adepts = _NAMES.get(request, {})
     if module:
         if module not in requests:
             raise RequestNotImplementsError(f'Module "{module}" does not exist.')
-        if request not in requests[module]:
+        if module not in adepts:
             raise RequestNotImplementsError(f'Request "{request_name}" does not exist.')
-        return requests[module][request]
+        return adepts[module]
 
-    adepts = set()
-    for _, requests in requests.items():
-        for _, adept in requests.items():
-            if adept.name == request:
-                adepts.add(adept)
     if len(adepts) == 1:
-        return adepts.pop()
+        return next(iter(adepts.values()))
     if not adepts:
         raise RequestNotImplementsError(f'Request "{request_name}" does not exist')
     raise AmbiguousRequestNameError(
-        f'Request "{request_name}" found in multiple modules: '
-        f'{", ".join([r.module for r in adepts])}'
+        f'Request "{request_name}" found in multiple modules: {", ".join(adepts)}'
     )
 
 
@@ -249,7 +463,8 @@ def parse_request_name(request):
     return None if module == '' else module, None if request == '' else request
 
 
-def request_decorator(name=None, cache=None):
+def request_decorator( # pylint: disable=R0913
+        name=None, cache=None, ttl=None, max_entries=None, max_bytes=None, depends=None):
     func = name
     if callable(func):
         request = Request(func)
@@ -257,7 +472,7 @@ def request_decorator(name=None, cache=None):
         return request
     @functools.wraps(func)
     def decorator(func):
-        request = Request(func, name, cache)
+        request = Request(func, name, cache, ttl, max_entries, max_bytes, depends)
         register_request(request)
         return request
     return decorator
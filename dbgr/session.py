@@ -1,32 +1,173 @@
+import socket
+import inspect
 from types import SimpleNamespace
+from configparser import ConfigParser
 import aiohttp
+from multidict import CIMultiDict
+from dbgr import reporting
 from dbgr.reporting import ProgressBar, Reporter
+from dbgr.http_cache import CachedResponse, create_http_cache
+from dbgr.cassette import Cassette, REPLAY
+from dbgr.timing import TimingTracer
+from dbgr.client_response import Response
+from dbgr.environment import environment_fingerprint
 
 
-_SESSION = None
+_SESSIONS = {}
+_TRACE_CONFIGS = None
+_CASSETTE = None
+CONNECTOR_SECTION = 'dbgr.connector'
+CONNECTOR_OPTIONS = {
+    'limit': 'getint',
+    'limit_per_host': 'getint',
+    'keepalive_timeout': 'getfloat',
+    'ttl_dns_cache': 'getint',
+    'use_dns_cache': 'getboolean',
+    'force_close': 'getboolean',
+    'enable_cleanup_closed': 'getboolean',
+}
+NULLABLE_OPTIONS = ('keepalive_timeout', 'ttl_dns_cache')
+SOCKET_OPTIONS = {
+    'tcp_nodelay': (socket.IPPROTO_TCP, socket.TCP_NODELAY, 'getboolean'),
+    'so_keepalive': (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 'getboolean'),
+    'so_rcvbuf': (socket.SOL_SOCKET, socket.SO_RCVBUF, 'getint'),
+    'so_sndbuf': (socket.SOL_SOCKET, socket.SO_SNDBUF, 'getint'),
+}
+
+
+class InvalidConnectorOptionError(ValueError):
+    pass
 
 
 class Session(aiohttp.ClientSession):
+    ATTRS = aiohttp.ClientSession.ATTRS | frozenset(['http_cache', 'cassette'])
+
+    def __init__(self, *args, http_cache=None, cassette=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_cache = http_cache
+        self.cassette = cassette
+
     async def _request(self, method, url, **kwargs): #pylint: disable=W0221
-        kwargs['trace_request_ctx'] = SimpleNamespace(method=method, url=url, **kwargs)
-        return await super()._request(method, url, **kwargs)
-
-
-def get_session():
-    global _SESSION # pylint: disable=W0603
-    if not _SESSION:
-        progress_bar = ProgressBar()
-        reporter = Reporter()
-        _SESSION = Session(
-            trace_configs=[
-                progress_bar.get_tracer(),
-                reporter.get_tracer()
-            ]
+        trace_request_ctx = SimpleNamespace(method=method, url=url, **kwargs)
+        kwargs['trace_request_ctx'] = trace_request_ctx
+        if self.cassette is not None and self.cassette.mode == REPLAY:
+            response = self.cassette.replay(method, url, self.request_headers(kwargs), kwargs)
+            if not reporting.SILENT:
+                await Reporter().print_report(response, trace_request_ctx)
+            return response
+        response = await self.send_request(method, url, trace_request_ctx, kwargs)
+        if self.cassette is not None:
+            await self.cassette.record(method, url, self.request_headers(kwargs), kwargs, response)
+        return response
+
+    async def send_request(self, method, url, trace_request_ctx, kwargs):
+        if self.http_cache is not None and self.http_cache.is_cacheable(method, kwargs):
+            trace_request_ctx.http_cache = self.http_cache
+            response = await self.http_cache.request(
+                super()._request, method, url, self.request_headers(kwargs), kwargs
+            )
+            if not isinstance(response, CachedResponse):
+                self.attach_timing(response, trace_request_ctx)
+            if not reporting.SILENT:
+                await Reporter().print_report(response, trace_request_ctx)
+            return response
+        response = await super()._request(method, url, **kwargs)
+        self.attach_timing(response, trace_request_ctx)
+        return response
+
+    def attach_timing(self, response, trace_request_ctx):
+        timing = getattr(trace_request_ctx, 'timing', None)
+        if timing is not None:
+            response.timing = timing
+
+    def request_headers(self, kwargs):
+        headers = CIMultiDict(self.headers)
+        headers.update(kwargs.get('headers') or {})
+        return headers
+
+
+def socket_factory(socket_options):
+    def create_socket(addr_info):
+        family, type_, proto, _, _ = addr_info
+        sock = socket.socket(family=family, type=type_, proto=proto)
+        for level, option, value in socket_options:
+            sock.setsockopt(level, option, value)
+        return sock
+    return create_socket
+
+
+def connector_option(section, name):
+    if name in NULLABLE_OPTIONS and section[name].lower() == 'none':
+        return None
+    getter = CONNECTOR_OPTIONS[name] if name in CONNECTOR_OPTIONS else SOCKET_OPTIONS[name][2]
+    try:
+        return getattr(section, getter)(name)
+    except ValueError:
+        raise InvalidConnectorOptionError(
+            f'Invalid value "{section[name]}" of option "{name}" in section [{CONNECTOR_SECTION}]'
+        )
+
+
+def connector_options(env):
+    options, socket_options = {}, []
+    if not isinstance(env, ConfigParser) or not env.has_section(CONNECTOR_SECTION):
+        return options
+    section = env[CONNECTOR_SECTION]
+    for name in section:
+        if name in CONNECTOR_OPTIONS:
+            options[name] = connector_option(section, name)
+        elif name in SOCKET_OPTIONS:
+            level, option, _ = SOCKET_OPTIONS[name]
+            socket_options.append((level, option, int(connector_option(section, name))))
+        elif name not in env.defaults():
+            raise InvalidConnectorOptionError(
+                f'Unknown option "{name}" in section [{CONNECTOR_SECTION}]. Supported '
+                f'options are: {", ".join(list(CONNECTOR_OPTIONS) + list(SOCKET_OPTIONS))}'
+            )
+    if socket_options:
+        if 'socket_factory' not in inspect.signature(aiohttp.TCPConnector).parameters:
+            raise InvalidConnectorOptionError('Socket options require aiohttp 3.12 or newer')
+        options['socket_factory'] = socket_factory(socket_options)
+    return options
+
+
+def get_trace_configs():
+    global _TRACE_CONFIGS # pylint: disable=W0603
+    if _TRACE_CONFIGS is None:
+        _TRACE_CONFIGS = [
+            TimingTracer().get_tracer(),
+            ProgressBar().get_tracer(),
+            Reporter().get_tracer()
+        ]
+    return _TRACE_CONFIGS
+
+
+def get_session(env=None, base_url=None):
+    key = (environment_fingerprint(env), base_url)
+    if key not in _SESSIONS or _SESSIONS[key].closed:
+        options = {} if base_url is None else {'base_url': base_url}
+        _SESSIONS[key] = Session(
+            connector=aiohttp.TCPConnector(**connector_options(env)),
+            http_cache=create_http_cache(env),
+            cassette=_CASSETTE,
+            response_class=Response,
+            trace_configs=get_trace_configs(),
+            **options
         )
-    return _SESSION
+    return _SESSIONS[key]
+
+
+def set_cassette(path=None, mode=None):
+    global _CASSETTE # pylint: disable=W0603
+    if path is None:
+        _CASSETTE = None
+    elif _CASSETTE is None or (_CASSETTE.path, _CASSETTE.mode) != (path, mode):
+        _CASSETTE = Cassette(path, mode)
+    return _CASSETTE
 
 
 async def close_session():
-    global _SESSION # pylint: disable=W0603
-    if _SESSION:
-        await _SESSION.close()
+    sessions = list(_SESSIONS.values())
+    _SESSIONS.clear()
+    for session in sessions:
+        await session.close()
@@ -0,0 +1,200 @@
+import re
+import time
+from collections import namedtuple
+
+
+ServerTimingMetric = namedtuple('ServerTimingMetric', 'name duration description')
+
+
+def split_unquoted(value, separator):
+    return re.split(f'{separator}(?=(?:[^"]*"[^"]*")*[^"]*$)', value)
+
+
+def parse_server_timing_metric(metric):
+    name, *params = [param.strip() for param in split_unquoted(metric, ';')]
+    duration, description = None, None
+    for param in params:
+        key, _, value = param.partition('=')
+        key, value = key.strip().lower(), value.strip()
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1].replace('\\"', '"')
+        if key == 'dur':
+            try:
+                duration = float(value) / 1000
+            except ValueError:
+                pass
+        elif key == 'desc':
+            description = value
+    return ServerTimingMetric(name, duration, description)
+
+
+def parse_server_timing(headers):
+    metrics = []
+    for header in headers:
+        for metric in split_unquoted(header, ','):
+            if metric.strip():
+                metrics.append(parse_server_timing_metric(metric))
+    return metrics
+
+
+class RequestTiming: # pylint: disable=R0902
+    def __init__(self, started):
+        self.started = started
+        self.queue_started = None
+        self.queue_finished = None
+        self.dns_started = None
+        self.dns_finished = None
+        self.connection_started = None
+        self.connection_finished = None
+        self.connection_reused = False
+        self.request_sent = None
+        self.response_started = None
+        self.response_finished = None
+        self.redirects = 0
+        self.server_timing = []
+
+    def duration(self, start, end):
+        if start is None or end is None:
+            return None
+        return end - start
+
+    @property
+    def queue(self):
+        return self.duration(self.queue_started, self.queue_finished)
+
+    @property
+    def dns(self):
+        return self.duration(self.dns_started, self.dns_finished)
+
+    @property
+    def connect(self):
+        duration = self.duration(self.connection_started, self.connection_finished)
+        if duration is not None and self.dns is not None:
+            duration -= self.dns
+        return duration
+
+    @property
+    def connection_ready(self):
+        return self.connection_finished or self.queue_finished or self.started
+
+    @property
+    def send(self):
+        return self.duration(self.connection_ready, self.request_sent)
+
+    @property
+    def wait(self):
+        return self.duration(self.request_sent or self.connection_ready, self.response_started)
+
+    @property
+    def download(self):
+        return self.duration(self.response_started, self.response_finished)
+
+    @property
+    def total(self):
+        return self.duration(self.started, self.response_finished or self.response_started)
+
+    @property
+    def server(self):
+        durations = {
+            metric.name: metric.duration for metric in self.server_timing
+            if metric.duration is not None
+        }
+        if not durations:
+            return None
+        return durations.get('total', sum(durations.values()))
+
+    @property
+    def network(self):
+        if self.wait is None or self.server is None:
+            return None
+        return max(0.0, self.wait - self.server)
+
+    @property
+    def phases(self):
+        return {
+            'queue': self.queue,
+            'dns': self.dns,
+            'connect': self.connect,
+            'send': self.send,
+            'wait': self.wait,
+            'download': self.download,
+            'total': self.total,
+        }
+
+
+class TimingTracer:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+
+    def get_timing(self, trace_ctx):
+        return trace_ctx.timing
+
+    async def on_request_start(self, session, trace_ctx, params): # pylint: disable=W0613
+        trace_ctx.timing = RequestTiming(self.clock())
+        if trace_ctx.trace_request_ctx is not None:
+            trace_ctx.trace_request_ctx.timing = trace_ctx.timing
+
+    async def on_request_redirect(self, session, trace_ctx, params): # pylint: disable=W0613
+        timing = self.get_timing(trace_ctx)
+        timing.redirects += 1
+        timing.connection_reused = False
+        for attribute in (
+                'queue_started', 'queue_finished', 'dns_started', 'dns_finished',
+                'connection_started', 'connection_finished', 'request_sent',
+                'response_started'):
+            setattr(timing, attribute, None)
+
+    async def on_connection_queued_start(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).queue_started = self.clock()
+
+    async def on_connection_queued_end(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).queue_finished = self.clock()
+
+    async def on_connection_create_start(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).connection_started = self.clock()
+
+    async def on_connection_create_end(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).connection_finished = self.clock()
+
+    async def on_connection_reuseconn(self, session, trace_ctx, params): # pylint: disable=W0613
+        timing = self.get_timing(trace_ctx)
+        timing.connection_reused = True
+        timing.connection_started = timing.connection_finished = self.clock()
+
+    async def on_dns_resolvehost_start(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).dns_started = self.clock()
+
+    async def on_dns_resolvehost_end(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).dns_finished = self.clock()
+
+    async def on_request_sent(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).request_sent = self.clock()
+
+    async def on_request_end(self, session, trace_ctx, params): # pylint: disable=W0613
+        timing = self.get_timing(trace_ctx)
+        timing.response_started = self.clock()
+        timing.server_timing = parse_server_timing(
+            params.response.headers.getall('Server-Timing', [])
+        )
+
+    async def on_response_chunk_received(self, session, trace_ctx, params): # pylint: disable=W0613
+        self.get_timing(trace_ctx).response_finished = self.clock()
+
+    def get_tracer(self):
+        import aiohttp
+        tracer = aiohttp.TraceConfig()
+        tracer.on_request_start.append(self.on_request_start)
+        tracer.on_request_redirect.append(self.on_request_redirect)
+        tracer.on_connection_queued_start.append(self.on_connection_queued_start)
+        tracer.on_connection_queued_end.append(self.on_connection_queued_end)
+        tracer.on_connection_create_start.append(self.on_connection_create_start)
+        tracer.on_connection_create_end.append(self.on_connection_create_end)
+        tracer.on_connection_reuseconn.append(self.on_connection_reuseconn)
+        tracer.on_dns_resolvehost_start.append(self.on_dns_resolvehost_start)
+        tracer.on_dns_resolvehost_end.append(self.on_dns_resolvehost_end)
+        if hasattr(tracer, 'on_request_headers_sent'):
+            tracer.on_request_headers_sent.append(self.on_request_sent)
+        tracer.on_request_chunk_sent.append(self.on_request_sent)
+        tracer.on_request_end.append(self.on_request_end)
+        tracer.on_response_chunk_received.append(self.on_response_chunk_received)
+        return tracer
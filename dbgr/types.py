@@ -1,6 +1,20 @@
+import re
 import getpass
-from datetime import datetime, time, date
-import dateparser
+from datetime import datetime, time, date, timedelta, timezone
+from dbgr.cache import SessionCache
+from dbgr.environment import get_environment
+
+
+DATES_SECTION = 'dbgr.dates'
+ISO_DATETIME = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?'
+    r'(Z|[+-]\d{2}:?\d{2})?'
+)
+EPOCH_TIMESTAMP = re.compile(r'(\d{10})(\d{3})?(\d{3})?(\d{3})?')
+NATURAL_DATE_TTL = 1
+_PARSED_DATES = SessionCache(max_entries=1024)
+_MISSING = object()
 
 
 class Type:
@@ -14,6 +28,7 @@ class Type:
         return False
 
     def value_input(self, prompt):
+        import readline # pylint: disable=W0611
         return input(f'{prompt}: ')
 
     def repr_value(self, value):
@@ -95,6 +110,57 @@ class SecretType(PrimitiveType):
         return True
 
 
+def parse_timezone(zone):
+    if zone is None:
+        return None
+    if zone == 'Z':
+        return timezone.utc
+    offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[-2:]))
+    return timezone(-offset if zone[0] == '-' else offset)
+
+
+def parse_iso_datetime(value):
+    match = ISO_DATETIME.fullmatch(value)
+    if match:
+        year, month, day, hour, minute, second, fraction, zone = match.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                int(second or 0), int((fraction or '0').ljust(6, '0')), parse_timezone(zone)
+            )
+        except ValueError:
+            return None
+    match = EPOCH_TIMESTAMP.fullmatch(value)
+    if match:
+        seconds, milliseconds, microseconds, _ = match.groups()
+        return datetime.fromtimestamp(int(seconds)) + timedelta(
+            milliseconds=int(milliseconds or 0), microseconds=int(microseconds or 0)
+        )
+    return None
+
+
+def date_languages():
+    env = get_environment()
+    if not env.has_section(DATES_SECTION) or not env[DATES_SECTION].get('languages'):
+        return None
+    languages = env[DATES_SECTION]['languages'].split(',')
+    return tuple(language.strip() for language in languages if language.strip())
+
+
+def parse_datetime(value):
+    parsed = parse_iso_datetime(value)
+    if parsed is not None:
+        return parsed
+    languages = date_languages()
+    key = (value, languages)
+    parsed = _PARSED_DATES.get(key, _MISSING)
+    if parsed is _MISSING:
+        import dateparser
+        parsed = dateparser.parse(value, languages=list(languages) if languages else None)
+        _PARSED_DATES.set(key, parsed, NATURAL_DATE_TTL)
+    return parsed
+
+
 class DatetimeType(Type):
     def cast(self, value):
         if value is not None and not isinstance(value, datetime):
@@ -103,7 +169,7 @@ class DatetimeType(Type):
             if isinstance(value, date):
                 value = datetime.combine(value, datetime.now().time())
             if isinstance(value, str):
-                value = dateparser.parse(value)
+                value = parse_datetime(value.strip())
             if not value:
                 raise ValueError(f'{type(value)} "{value}" cannot be converted to {self}')
         return value
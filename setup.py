@@ -32,6 +32,6 @@ setup(
     py_modules = ['app'],
     include_package_data=True,
     install_requires=install_requires,
-    extras_require={'test': extras_require},
+    extras_require={'test': extras_require, 'fast': ['orjson']},
     entry_points={'console_scripts': ['dbgr = app:dbgr']}
 )
@@ -1,4 +1,6 @@
-from dbgr.requests import DefaultValueArgument, NoDefaultValueArgument
+import pytest
+from dbgr.requests import Request
+from dbgr.arguments import DefaultValueArgument, NoDefaultValueArgument, Signature
 from dbgr.types import PrimitiveType, Type, SecretType
 from tests.conftest import escape_ansi
 
@@ -95,3 +97,67 @@ def test_no_default_value_argument_prompts_for_value_until_given(monkeypatch):
     monkeypatch.setattr('builtins.input', lambda _: inputs.pop(0))
     a = NoDefaultValueArgument('name', PrimitiveType(int))
     assert a.get_value({}) == 2
+
+
+def test_signature():
+    async def func(env, session, arg_1, arg_2: int, token, arg_3='def3'):
+        pass
+
+    signature = Signature(func, 'env', 'session', excluded=('token',))
+    assert [arg.name for arg in signature.arguments] == ['arg_1', 'arg_2', 'arg_3']
+    assert isinstance(signature.arguments[1].annotation, PrimitiveType)
+    assert isinstance(signature.arguments[2], DefaultValueArgument)
+    assert signature.env_arg == 'env'
+    assert signature.session_arg == 'session'
+
+
+def test_signature_env_and_session_only_in_leading_arguments():
+    async def func(arg_1, arg_2, env):
+        pass
+
+    signature = Signature(func, 'env', 'session')
+    assert [arg.name for arg in signature.arguments] == ['arg_1', 'arg_2']
+    assert signature.env_arg is None
+    assert signature.session_arg is None
+
+
+def test_signature_bind():
+    async def func(session, arg_1: int, arg_2='default'):
+        pass
+
+    signature = Signature(func, 'env', 'session')
+    assert signature.bind('env', 'session', True, {'arg_1': '1'}, {'token': 'jwt'}) == {
+        'arg_1': 1, 'arg_2': 'default', 'token': 'jwt', 'session': 'session'
+    }
+
+
+def test_signature_is_immutable():
+    async def func(arg_1):
+        pass
+
+    signature = Signature(func, 'env', 'session')
+    with pytest.raises(AttributeError):
+        signature.arguments = ()
+    with pytest.raises(AttributeError):
+        signature.arguments[0].default = 'value'
+
+
+def test_request_introspected_once(monkeypatch):
+    calls = []
+    original = Type.get_type
+
+    def counting_get_type(annotation):
+        calls.append(annotation)
+        return original(annotation)
+
+    async def func(env, arg_1: int, arg_2='default') -> str:
+        pass
+
+    monkeypatch.setattr(Type, 'get_type', counting_get_type)
+    request = Request(func)
+    for _ in range(3):
+        request.resolve_arguments({}, None, True, {'arg_1': '1'})
+        str(request)
+        assert request.requires_env and not request.requires_session
+    assert calls == [str, int, None]
+
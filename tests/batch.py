@@ -0,0 +1,184 @@
+import io
+import json
+import asyncio
+import pytest
+import dbgr.requests
+import dbgr.session
+from dbgr import batch, commands, reporting
+from dbgr.batch import Batch, BatchReader
+from dbgr.requests import Request, execute_request
+from tests.conftest import attrdict
+
+
+class MockedOutput:
+    def __init__(self):
+        self.lines = []
+
+    async def write(self, text):
+        self.lines.append(json.loads(text))
+
+
+class MockedRequests(dict):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def find_request(self, name):
+        self.calls.append(name)
+        return self[name]
+
+
+def create_request(func):
+    func.__module__ = 'module'
+    return Request(func)
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    requests = MockedRequests()
+    monkeypatch.setattr(batch, 'find_request', requests.find_request)
+    monkeypatch.setattr(dbgr.session, 'get_session', lambda env=None: None)
+    return requests
+
+
+async def run_batch(lines, concurrency=2, env=None):
+    output = MockedOutput()
+    await Batch(env, concurrency=concurrency, output=output).run(
+        io.StringIO(''.join(f'{line}\n' for line in lines))
+    )
+    return output.lines
+
+
+@pytest.mark.asyncio
+async def test_reader_skips_blank_lines():
+    reader = BatchReader(io.StringIO('a\n\n  \nb\n'))
+    assert await reader.next() == (1, 'a\n')
+    assert await reader.next() == (4, 'b\n')
+    assert await reader.next() is None
+    reader.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_executes_records(registered):
+    async def add(env, session, a: int, b: int = 2):
+        return a + b
+    registered['add'] = create_request(add)
+    lines = await run_batch([
+        json.dumps({'request': 'add', 'args': {'a': 1}}),
+        json.dumps({'request': 'add', 'args': {'a': '5', 'b': 5}}),
+    ])
+    assert sorted((line['line'], line['result']) for line in lines) == [(1, 3), (2, 10)]
+    assert all(line['ok'] and line['request'] == 'add' for line in lines)
+    assert all(line['duration'] >= 0 for line in lines)
+    assert registered.calls == ['add']
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_errors(registered):
+    async def fail(env, session):
+        raise RuntimeError('It is broken')
+    async def needs_argument(env, session, value):
+        return value
+    registered['fail'] = create_request(fail)
+    registered['needs_argument'] = create_request(needs_argument)
+    lines = await run_batch([
+        'not json',
+        json.dumps(['request']),
+        json.dumps({'request': 'fail'}),
+        json.dumps({'request': 'needs_argument'}),
+        json.dumps({'request': 'needs_argument', 'args': 'value'}),
+    ], concurrency=1)
+    assert [line['ok'] for line in lines] == [False] * 5
+    assert lines[0]['error'].startswith('JSONDecodeError: ')
+    assert lines[1]['error'] == (
+        'InvalidBatchRecordError: Record must be an object with "request" name'
+    )
+    assert lines[2]['error'] == 'RuntimeError: It is broken'
+    assert lines[3]['error'] == 'InvalidBatchRecordError: Missing arguments: value'
+    assert lines[4]['error'] == (
+        'InvalidBatchRecordError: Arguments of the request must be an object'
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_is_bounded_by_concurrency(registered):
+    state = {'running': 0, 'peak': 0}
+    async def wait(env, session):
+        state['running'] += 1
+        state['peak'] = max(state['peak'], state['running'])
+        await asyncio.sleep(0.01)
+        state['running'] -= 1
+        return True
+    registered['wait'] = create_request(wait)
+    lines = await run_batch([json.dumps({'request': 'wait'})] * 10, concurrency=3)
+    assert sorted(line['line'] for line in lines) == list(range(1, 11))
+    assert state['peak'] == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_environments(registered, monkeypatch):
+    async def env_name(env):
+        return env
+    registered['env_name'] = create_request(env_name)
+    monkeypatch.setattr(batch, 'Environment', lambda name: f'env:{name}')
+    default = attrdict({'name': 'default'})
+    output = MockedOutput()
+    instance = Batch(default, concurrency=1, output=output)
+    await instance.run(io.StringIO(
+        '{"request": "env_name", "env": "staging"}\n'
+        '{"request": "env_name", "env": "default"}\n'
+        '{"request": "env_name"}\n'
+    ))
+    assert [line['result'] for line in output.lines] == [
+        'env:staging', str(default), str(default)
+    ]
+    assert instance.get_environment('staging') == 'env:staging'
+
+
+@pytest.mark.asyncio
+async def test_batch_environment_used_by_nested_requests(registered, monkeypatch):
+    async def inner(env, session, item: int):
+        return env, session, item
+    async def outer(env):
+        return await execute_request('inner', item='1')
+    registered['inner'] = create_request(inner)
+    registered['outer'] = create_request(outer)
+    monkeypatch.setattr(dbgr.requests, 'find_request', registered.find_request)
+    monkeypatch.setattr(dbgr.requests, 'get_environment', lambda: pytest.fail('Default env'))
+    monkeypatch.setattr(batch, 'Environment', lambda name: f'env:{name}')
+    monkeypatch.setattr(dbgr.session, 'get_session', lambda env=None: f'session:{env}')
+    lines = await run_batch([json.dumps({'request': 'outer', 'env': 'staging'})])
+    assert lines[0]['result'] == ['env:staging', 'session:env:staging', 1]
+
+
+@pytest.mark.asyncio
+async def test_batch_is_silent(registered):
+    async def silent(env, session):
+        return reporting.SILENT
+    registered['silent'] = create_request(silent)
+    lines = await run_batch([json.dumps({'request': 'silent'})])
+    assert lines[0]['result'] is True
+    assert reporting.SILENT is False
+
+
+@pytest.mark.asyncio
+async def test_batch_command(monkeypatch, tmp_path, capsys):
+    async def mocked_run(self, stream):
+        assert stream.read() == '{"request": "r"}\n'
+        assert self.concurrency == 4
+
+    async def mocked_close_session():
+        mocked_close_session.called = True
+
+    monkeypatch.setattr(Batch, 'run', mocked_run)
+    monkeypatch.setattr(commands, 'init_environment', lambda _: None)
+    monkeypatch.setattr(commands, 'get_environment', lambda: None)
+    monkeypatch.setattr(dbgr.session, 'close_session', mocked_close_session)
+    path = tmp_path / 'batch.jsonl'
+    path.write_text('{"request": "r"}\n')
+    await commands.batch_command(attrdict({
+        'file': str(path), 'env': 'default', 'concurrency': 4, 'output': None,
+        'record': None, 'replay': None
+    }))
+    assert capsys.readouterr().out == ''
+    assert mocked_close_session.called
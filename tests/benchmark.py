@@ -0,0 +1,170 @@
+import asyncio
+import pytest
+from dbgr import reporting
+from dbgr.benchmark import Histogram, BenchmarkStats, run_phase, run_benchmark
+from dbgr.requests import Request
+from tests.conftest import escape_ansi
+
+
+def test_histogram_empty():
+    assert Histogram().percentile(50) is None
+
+
+@pytest.mark.parametrize('percentile, expected', [
+    (50, 0.050),
+    (90, 0.090),
+    (99, 0.099),
+    (100, 0.100),
+])
+def test_histogram_percentile(percentile, expected):
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.record(value / 1000)
+    assert histogram.percentile(percentile) == pytest.approx(expected, rel=0.01)
+
+
+def test_histogram_zero_values():
+    histogram = Histogram()
+    histogram.record(0)
+    histogram.record(0)
+    histogram.record(1)
+    assert histogram.percentile(50) == 0.0
+    assert histogram.percentile(100) == pytest.approx(1, rel=0.01)
+
+
+def test_histogram_memory_is_bounded():
+    histogram = Histogram()
+    for value in range(100000):
+        histogram.record(0.01 + (value % 1000) / 10000)
+    assert histogram.count == 100000
+    assert len(histogram.buckets) < 300
+
+
+def test_stats_record():
+    stats = BenchmarkStats()
+    stats.record(0.1)
+    stats.record(0.3, RuntimeError())
+    stats.record(0.2, RuntimeError())
+    assert stats.requests == 3
+    assert stats.minimum == 0.1
+    assert stats.maximum == 0.3
+    assert stats.mean == pytest.approx(0.2)
+    assert stats.errors == {'RuntimeError': 2}
+    assert stats.error_count == 2
+    assert stats.error_rate == pytest.approx(2 / 3)
+
+
+def test_stats_percentile_within_bounds():
+    stats = BenchmarkStats()
+    stats.record(0.1)
+    assert stats.percentile(50) == 0.1
+    assert BenchmarkStats().percentile(50) is None
+
+
+def test_stats_throughput():
+    stats = BenchmarkStats()
+    stats.started, stats.finished = 10.0, 12.0
+    for _ in range(10):
+        stats.record(0.1)
+    assert stats.duration == 2.0
+    assert stats.throughput == 5.0
+
+
+def test_stats_format():
+    stats = BenchmarkStats()
+    stats.started, stats.finished = 10.0, 11.0
+    stats.record(0.001)
+    stats.record(0.002, ValueError())
+    output = escape_ansi(stats)
+    assert 'Requests:   2 (errors: 1, 50.00%)' in output
+    assert 'Throughput: 2.0 req/s' in output
+    assert ' - min:   1.00ms' in output
+    assert ' - max:   2.00ms' in output
+    assert ' - p99.9: ' in output
+    assert ' - ValueError: 1' in output
+
+
+def test_stats_format_no_requests():
+    stats = BenchmarkStats()
+    stats.started, stats.finished = 10.0, 10.0
+    assert escape_ansi(stats) == (
+        'Requests:   0 (errors: 0, 0.00%)\n'
+        'Duration:   0.000s\n'
+        'Throughput: 0.0 req/s\n'
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_phase_executes_count():
+    async def call():
+        call.counter += 1
+    call.counter = 0
+    stats = await run_phase(call, 10, 3, BenchmarkStats())
+    assert call.counter == 10
+    assert stats.requests == 10
+
+
+@pytest.mark.asyncio
+async def test_run_phase_is_concurrent():
+    async def call():
+        call.running += 1
+        call.peak = max(call.peak, call.running)
+        await asyncio.sleep(0.01)
+        call.running -= 1
+    call.running, call.peak = 0, 0
+    await run_phase(call, 10, 5, BenchmarkStats())
+    assert call.peak == 5
+
+
+@pytest.mark.asyncio
+async def test_run_phase_records_errors():
+    async def call():
+        raise RuntimeError('failed')
+    stats = await run_phase(call, 5, 2, BenchmarkStats())
+    assert stats.requests == 5
+    assert stats.errors == {'RuntimeError': 5}
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark(mocked_env, mocked_session):
+    async def func(env, session, arg):
+        assert env == mocked_env
+        assert session == mocked_session
+        assert arg == 'value'
+        assert reporting.SILENT
+        func.counter += 1
+    func.counter = 0
+
+    stats = await run_benchmark(
+        Request(func), mocked_env, mocked_session, 10, concurrency=2, warmup=3,
+        kwargs={'arg': 'value'}
+    )
+    assert func.counter == 13
+    assert stats.requests == 10
+    assert not reporting.SILENT
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_resolves_arguments_once(monkeypatch, mocked_env, mocked_session):
+    async def func(arg):
+        pass
+
+    req = Request(func)
+    original = req.resolve_arguments
+    def mocked_resolve(*args):
+        mocked_resolve.counter += 1
+        return original(*args)
+    mocked_resolve.counter = 0
+    monkeypatch.setattr(req, 'resolve_arguments', mocked_resolve)
+    await run_benchmark(req, mocked_env, mocked_session, 10, kwargs={'arg': 1})
+    assert mocked_resolve.counter == 1
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_bypasses_cache(mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+    func.counter = 0
+
+    await run_benchmark(Request(func, cache='session'), mocked_env, mocked_session, 5)
+    assert func.counter == 5
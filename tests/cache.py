@@ -0,0 +1,250 @@
+import os
+import json
+from datetime import datetime, date, time
+from configparser import ConfigParser
+import pytest
+from dbgr import cache
+from dbgr.cache import (
+    DiskCache, SessionCache, CacheError, digest, canonical, serialize, deserialize, get_data_dir,
+    sizeof, read_json, write_json
+)
+
+
+class MockedClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_digest_is_stable():
+    assert digest({'b': {2, 1}, 'a': [1, 2]}) == digest({'a': [1, 2], 'b': {1, 2}})
+
+
+@pytest.mark.parametrize('value_1, value_2', [
+    ([('arg', 1)], [('arg', 2)]),
+    ({'arg': 1}, {'arg': '1'}),
+    ({'arg': [1, 2]}, {'arg': [2, 1]}),
+    ({'arg': {'key': 'value'}}, {'arg': [['key', 'value']]}),
+    (b'value', 'value'),
+    (datetime(2019, 1, 1), '2019-01-01T00:00:00'),
+])
+def test_digest_differs_for_different_values(value_1, value_2):
+    assert digest(value_1) != digest(value_2)
+
+
+@pytest.mark.parametrize('value', [
+    None, True, 1, 1.5, 'value', b'value', [1, {'key': 'value'}], {'key': [1, 2]},
+    {1, 2}, datetime(2019, 1, 1), date(2019, 1, 1), time(12, 0), object
+])
+def test_canonical_is_serializable(value):
+    json.dumps(canonical(value))
+
+
+def test_canonical_config():
+    config_1 = ConfigParser()
+    config_1.read_dict({'section_1': {'key': 'value'}, 'section_2': {'key': '${key}'}})
+    config_2 = ConfigParser()
+    config_2.read_dict({'section_2': {'key': '${key}'}, 'section_1': {'key': 'value'}})
+    assert digest(config_1) == digest(config_2)
+    config_2.set('section_1', 'key', 'other')
+    assert digest(config_1) != digest(config_2)
+
+
+@pytest.mark.parametrize('value', [
+    None, 'value', 42, {'key': ['value']}, 'x' * 10 * cache.COMPRESS_THRESHOLD
+])
+def test_serialize_roundtrip(value):
+    assert deserialize(*serialize(value)) == value
+
+
+def test_serialize_compresses_large_values():
+    compressed, data = serialize('x' * 10 * cache.COMPRESS_THRESHOLD)
+    assert compressed
+    assert len(data) < cache.COMPRESS_THRESHOLD
+
+
+def test_serialize_small_values_not_compressed():
+    compressed, _ = serialize('value')
+    assert not compressed
+
+
+def test_serialize_unpicklable_value():
+    with pytest.raises(CacheError):
+        serialize(lambda: None)
+
+
+def test_disk_cache_store_and_load(tmp_path):
+    storage = DiskCache(str(tmp_path / 'cache.sqlite'))
+    key = 'key'
+    assert key not in storage
+    assert storage.get(key, 'default') == 'default'
+    storage[key] = {'token': 'abc'}
+    assert key in storage
+    assert storage[key] == {'token': 'abc'}
+    assert len(storage) == 1
+
+
+def test_disk_cache_missing_key(tmp_path):
+    storage = DiskCache(str(tmp_path / 'cache.sqlite'))
+    with pytest.raises(KeyError):
+        storage['request']
+
+
+def test_disk_cache_overwrites(tmp_path):
+    storage = DiskCache(str(tmp_path / 'cache.sqlite'))
+    key = 'request'
+    storage[key] = 'old'
+    storage[key] = 'new'
+    assert storage[key] == 'new'
+    assert len(storage) == 1
+
+
+def test_disk_cache_persists(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    key = 'request'
+    storage = DiskCache(path)
+    storage[key] = 'value'
+    storage.close()
+    assert DiskCache(path)[key] == 'value'
+
+
+def test_disk_cache_clear(tmp_path):
+    storage = DiskCache(str(tmp_path / 'cache.sqlite'))
+    storage['request'] = 'value'
+    storage.clear()
+    assert len(storage) == 0
+
+
+def test_get_disk_cache_caches(tmp_path):
+    storage = cache.get_disk_cache()
+    assert storage is cache.get_disk_cache()
+    assert storage.path == os.path.join(str(tmp_path), cache.DISK_CACHE_FILE)
+
+
+def test_get_data_dir_creates_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    path = get_data_dir()
+    assert path == os.path.join(str(tmp_path), cache.DATA_DIR)
+    assert os.path.isdir(path)
+
+
+def test_disk_cache_expires(tmp_path):
+    clock = MockedClock()
+    storage = DiskCache(str(tmp_path / 'cache.sqlite'), clock=clock)
+    key = 'request'
+    storage.set(key, 'value', ttl=10)
+    clock.now += 9
+    assert storage.get(key) == 'value'
+    clock.now += 1
+    assert key not in storage
+
+
+def test_disk_cache_purges_expired_on_open(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    clock = MockedClock()
+    storage = DiskCache(path, clock=clock)
+    storage.set('expired', 'value', ttl=10)
+    storage.set('valid', 'value')
+    storage.close()
+    clock.now += 10
+    assert len(DiskCache(path, clock=clock)) == 1
+
+
+@pytest.mark.parametrize('value, size', [
+    (b'12345', 5),
+    ('12345', 5),
+    ('ěšč', 6),
+])
+def test_sizeof(value, size):
+    assert sizeof(value) == size
+
+
+def test_sizeof_unpicklable():
+    assert sizeof(lambda: None) > 0
+
+
+def test_session_cache_store_and_load():
+    storage = SessionCache()
+    storage.set('key', 'value')
+    assert 'key' in storage
+    assert storage.get('key') == 'value'
+    assert storage.get('missing', 'default') == 'default'
+    assert len(storage) == 1
+
+
+def test_session_cache_expires():
+    clock = MockedClock()
+    storage = SessionCache(clock=clock)
+    storage.set('key', 'value', ttl=10)
+    clock.now += 9
+    assert storage.get('key') == 'value'
+    clock.now += 1
+    assert 'key' not in storage
+    assert len(storage) == 0
+
+
+def test_session_cache_evicts_least_recently_used():
+    storage = SessionCache(max_entries=2)
+    storage.set('key1', 'value1')
+    storage.set('key2', 'value2')
+    storage.get('key1')
+    storage.set('key3', 'value3')
+    assert 'key1' in storage
+    assert 'key2' not in storage
+    assert 'key3' in storage
+
+
+def test_session_cache_evicts_by_size():
+    storage = SessionCache(max_bytes=10)
+    storage.set('key1', '12345')
+    storage.set('key2', '12345')
+    assert storage.size == 10
+    storage.set('key3', '123')
+    assert 'key1' not in storage
+    assert storage.size == 8
+
+
+def test_session_cache_skips_values_over_limit():
+    storage = SessionCache(max_bytes=10)
+    storage.set('key1', '12345')
+    storage.set('key2', '12345678901')
+    assert 'key1' in storage
+    assert 'key2' not in storage
+    assert storage.size == 5
+
+
+def test_session_cache_overwrite_updates_size():
+    storage = SessionCache(max_bytes=10)
+    storage.set('key', '12345')
+    storage.set('key', '123')
+    assert storage.size == 3
+    assert storage.get('key') == '123'
+
+
+def test_session_cache_clear():
+    storage = SessionCache(max_bytes=10)
+    storage.set('key', '12345')
+    storage.clear()
+    assert len(storage) == 0
+    assert storage.size == 0
+
+
+def test_write_and_read_json(tmp_path):
+    path = str(tmp_path / 'data.json')
+    write_json(path, {'key': ['value']})
+    assert read_json(path) == {'key': ['value']}
+
+
+def test_read_missing_json(tmp_path):
+    assert read_json(str(tmp_path / 'missing.json')) is None
+
+
+def test_read_invalid_json(tmp_path):
+    (tmp_path / 'data.json').write_text('{')
+    assert read_json(str(tmp_path / 'data.json')) is None
+
+
+def test_write_json_to_unwritable_location(tmp_path):
+    write_json(str(tmp_path / 'missing' / 'data.json'), {})
@@ -0,0 +1,209 @@
+import json
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from multidict import CIMultiDict
+from dbgr import session, reporting, commands
+from dbgr.cassette import Cassette, CassetteError, RECORD, REPLAY
+from dbgr.http_cache import CachedResponse
+from tests.conftest import escape_ansi, attrdict
+
+
+@pytest_asyncio.fixture
+async def server():
+    calls = []
+    async def handler(request):
+        calls.append(request.path_qs)
+        body = await request.text()
+        return web.json_response(
+            {'call': len(calls), 'body': body}, headers={'X-Server': 'test'}
+        )
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    test_server.calls = calls
+    yield test_server
+    await test_server.close()
+
+
+async def record(path, server, *urls):
+    session.set_cassette(path, RECORD)
+    sess = session.get_session({})
+    for url in urls:
+        await (await sess.get(server.make_url(url))).read()
+    await session.close_session()
+    session._CASSETTE = None # pylint: disable=W0212
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(CassetteError):
+        Cassette(str(tmp_path / 'cassette.jsonl'), 'rewind')
+
+
+def test_replay_missing_cassette(tmp_path):
+    with pytest.raises(CassetteError):
+        Cassette(str(tmp_path / 'cassette.jsonl'), REPLAY)
+
+
+def test_request_key():
+    cassette = Cassette('cassette.jsonl', RECORD)
+    key = cassette.request_key('get', 'http://example.com', {'params': {'a': 1}})
+    assert key == cassette.request_key('GET', 'http://example.com', {'params': {'a': 1}})
+    assert key != cassette.request_key('GET', 'http://example.com', {'params': {'a': 2}})
+    assert key != cassette.request_key('POST', 'http://example.com', {'params': {'a': 1}})
+    assert cassette.request_key('POST', 'http://example.com', {'json': {'a': 1}}) != (
+        cassette.request_key('POST', 'http://example.com', {'json': {'a': 2}})
+    )
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    path = str(tmp_path / 'cassette.jsonl')
+    await record(path, server, '/a', '/b?x=1')
+    with open(path) as cassette_file:
+        records = [json.loads(line) for line in cassette_file]
+    assert [record['url'] for record in records] == [
+        str(server.make_url('/a')), str(server.make_url('/b?x=1'))
+    ]
+    assert records[0]['status'] == 200
+    assert records[0]['timing']['total'] is not None
+
+    session.set_cassette(path, REPLAY)
+    sess = session.get_session({})
+    response = await sess.get(server.make_url('/b?x=1'))
+    assert isinstance(response, CachedResponse)
+    assert response.cache_status == 'replayed'
+    assert response.headers['X-Server'] == 'test'
+    assert await response.json() == {'call': 2, 'body': ''}
+    assert len(server.calls) == 2
+    with pytest.raises(CassetteError):
+        await sess.get(server.make_url('/c'))
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_record_redacts_credentials(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    path = str(tmp_path / 'cassette.jsonl')
+    session.set_cassette(path, RECORD)
+    sess = session.get_session({})
+    await (await sess.get(server.make_url('/'), headers={
+        'Authorization': 'Bearer token', 'Cookie': 'session=secret', 'X-Request': 'kept'
+    })).read()
+    await session.close_session()
+    with open(path) as cassette_file:
+        content = cassette_file.read()
+    headers = dict(json.loads(content)['request_headers'])
+    assert headers['Authorization'] == 'REDACTED'
+    assert headers['Cookie'] == 'REDACTED'
+    assert headers['X-Request'] == 'kept'
+    assert 'token' not in content and 'secret' not in content
+
+
+@pytest.mark.asyncio
+async def test_replay_repeated_requests_in_order(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    path = str(tmp_path / 'cassette.jsonl')
+    await record(path, server, '/a', '/a')
+    session.set_cassette(path, REPLAY)
+    sess = session.get_session({})
+    calls = [(await (await sess.get(server.make_url('/a'))).json())['call'] for _ in range(3)]
+    assert calls == [1, 2, 2]
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_replay_matches_request_body(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    path = str(tmp_path / 'cassette.jsonl')
+    session.set_cassette(path, RECORD)
+    sess = session.get_session({})
+    for body in ('first', 'second'):
+        await (await sess.post(server.make_url('/'), data=body)).read()
+    await session.close_session()
+    session._CASSETTE = None # pylint: disable=W0212
+
+    session.set_cassette(path, REPLAY)
+    sess = session.get_session({})
+    response = await sess.post(server.make_url('/'), data='second')
+    assert await response.json() == {'call': 2, 'body': 'second'}
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_replay_prints_report(server, tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / 'cassette.jsonl')
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    await record(path, server, '/a')
+    monkeypatch.setattr(reporting, 'SILENT', False)
+    session.set_cassette(path, REPLAY)
+    await (await session.get_session({}).get(server.make_url('/a'))).read()
+    output = escape_ansi(capsys.readouterr().out)
+    assert f'> GET {server.make_url("/a")}' in output
+    assert '> 200 OK' in output
+    assert '< Response data (application/json):' in output
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_index_is_stored_and_rebuilt(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    path = str(tmp_path / 'cassette.jsonl')
+    await record(path, server, '/a')
+    cassette = Cassette(path, REPLAY)
+    with open(f'{path}.idx') as index_file:
+        stored = json.load(index_file)
+    assert stored['index'] == cassette.index
+    stored['index'] = {'stored': [0]}
+    with open(f'{path}.idx', 'w') as index_file:
+        json.dump(stored, index_file)
+    assert Cassette(path, REPLAY).index == {'stored': [0]}
+
+    await record(path, server, '/b')
+    assert len(Cassette(path, REPLAY).index) == 2
+
+
+def test_index_skips_incomplete_lines(tmp_path):
+    path = tmp_path / 'cassette.jsonl'
+    path.write_text('{"key": "a", "method": "GET"}\n{"key": "b", "meth')
+    assert Cassette(str(path), REPLAY).index == {'a': [0]}
+
+
+def test_read_entry_is_memoized(tmp_path):
+    path = tmp_path / 'cassette.jsonl'
+    key = Cassette(str(path), RECORD).request_key('GET', 'http://example.com', {})
+    record = {
+        'key': key, 'method': 'GET', 'response_url': 'http://example.com', 'status': 200,
+        'reason': 'OK', 'headers': [['Content-Type', 'text/plain']], 'body': 'Ym9keQ==',
+        'request_headers': []
+    }
+    path.write_text(json.dumps(record) + '\n')
+    cassette = Cassette(str(path), REPLAY)
+    entry = cassette.read_entry(0)
+    assert entry.body == b'body'
+    assert cassette.read_entry(0) is entry
+    response = cassette.replay('GET', 'http://example.com', CIMultiDict(), {})
+    assert response.status == 200
+
+
+def test_set_cassette(tmp_path):
+    path = str(tmp_path / 'cassette.jsonl')
+    cassette = session.set_cassette(path, RECORD)
+    assert session.set_cassette(path, RECORD) is cassette
+    assert session.set_cassette() is None
+
+
+def test_use_cassette(tmp_path):
+    path = str(tmp_path / 'cassette.jsonl')
+    commands.use_cassette(attrdict({'record': path, 'replay': None}))
+    assert session._CASSETTE.mode == RECORD # pylint: disable=W0212
+    commands.use_cassette(attrdict({'record': None, 'replay': None}))
+    assert session._CASSETTE is None # pylint: disable=W0212
+
+
+def test_record_and_replay_are_exclusive():
+    with pytest.raises(SystemExit):
+        commands.argument_parser().parse_args(['r', 'req', '--record', 'a', '--replay', 'b'])
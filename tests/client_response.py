@@ -0,0 +1,99 @@
+import json
+import pytest
+import pytest_asyncio
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from dbgr import client_response
+
+
+@pytest_asyncio.fixture
+async def res():
+    async def handler(request): # pylint: disable=W0613
+        return web.Response(text='{"key": "value"}', content_type='application/json')
+    app = web.Application()
+    app.router.add_get('/', handler)
+    server = TestServer(app)
+    await server.start_server()
+    async with aiohttp.ClientSession(response_class=client_response.Response) as session:
+        async with session.get(server.make_url('/')) as resp:
+            await resp.read()
+            yield resp
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_response_json_is_decoded_once(res, monkeypatch):
+    calls = []
+    def mocked_loads(data):
+        calls.append(data)
+        return json.loads(data)
+
+    monkeypatch.setattr(client_response, 'json_loads', mocked_loads)
+    first = await res.json()
+    assert first == {'key': 'value'}
+    assert await res.json() is first
+    assert calls == ['{"key": "value"}']
+
+
+@pytest.mark.asyncio
+async def test_response_json_custom_loads_not_cached(res):
+    assert await res.json(loads=lambda data: data) == '{"key": "value"}'
+    assert await res.json() == {'key': 'value'}
+
+
+@pytest.mark.asyncio
+async def test_response_json_content_type_error(res):
+    with pytest.raises(aiohttp.ContentTypeError):
+        await res.json(content_type='text/plain')
+
+
+@pytest.mark.asyncio
+async def test_response_text_is_decoded_once(res):
+    text = await res.text()
+    assert text == '{"key": "value"}'
+    assert await res.text() is text
+    assert await res.text(errors='replace') == text
+
+
+def test_json_loads_uses_json_without_orjson(monkeypatch):
+    monkeypatch.setattr(client_response, 'orjson', None)
+    assert client_response.json_loads('[1]') == [1]
+
+
+def test_json_loads_uses_orjson(monkeypatch):
+    class MockedOrjson:
+        @staticmethod
+        def loads(data):
+            return ('orjson', data)
+    monkeypatch.setattr(client_response, 'orjson', MockedOrjson)
+    assert client_response.json_loads('[1]') == ('orjson', '[1]')
+
+
+@pytest.mark.parametrize('data, value', [
+    ('123456789012345678901234567890', 123456789012345678901234567890),
+    (b'[-9223372036854775809]', [-9223372036854775809]),
+    ('NaN', float('nan')),
+    ('[1e400]', [float('inf')]),
+])
+def test_json_loads_falls_back_to_json(data, value):
+    result = json.dumps(client_response.json_loads(data))
+    assert result == json.dumps(value)
+
+
+def test_json_loads_uses_json_for_long_numbers(monkeypatch):
+    class MockedOrjson:
+        @staticmethod
+        def loads(data):
+            pytest.fail('orjson used for long number')
+    monkeypatch.setattr(client_response, 'orjson', MockedOrjson)
+    assert client_response.json_loads('{"id": 12345678901234567890}') == {
+        'id': 12345678901234567890
+    }
+
+
+def test_module_does_not_shadow_response_coroutine():
+    import dbgr
+    import dbgr.session # pylint: disable=W0611
+    from dbgr.requests import execute_request
+    assert dbgr.response is execute_request
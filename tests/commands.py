@@ -1,12 +1,16 @@
+import sys
+import subprocess
 import pytest
 from argparse import Namespace
-from dbgr import meta
+from dbgr import meta, reporting
 from tests.conftest import escape_ansi, attrdict, mock_request
 from dbgr import commands
+import dbgr.session
 from dbgr.commands import (
     argument_parser, interactive_command, request_command, list_command,
-    environments_command, version_command, prepare_and_execute_request
+    environments_command, version_command, prepare_and_execute_request, bench_command
 )
+from dbgr.benchmark import BenchmarkStats
 
 
 @pytest.mark.parametrize('args', [
@@ -121,6 +125,40 @@ def test_request_command(args, namespace):
         assert getattr(res, key) == value
 
 
+@pytest.mark.parametrize('args, namespace', [
+    (['bench', 'test'], {
+        'request': 'test', 'env': 'default', 'use_defaults': False, 'arguments': [],
+        'requests': 100, 'concurrency': 1, 'warmup': 0
+    }),
+    (['b', 'test', '-n', '1000', '-c', '10', '-w', '50'], {
+        'request': 'test', 'requests': 1000, 'concurrency': 10, 'warmup': 50
+    }),
+    (['bench', 'test', '--requests', '5', '--concurrency', '2', '--warmup', '1'], {
+        'requests': 5, 'concurrency': 2, 'warmup': 1
+    }),
+    (['bench', 'test', '-e', 'test2', '-d', '-a', 'x=1'], {
+        'env': 'test2', 'use_defaults': True, 'arguments': ['x=1']
+    }),
+])
+def test_bench_command(args, namespace):
+    res = argument_parser().parse_args(args)
+    assert isinstance(res, Namespace)
+    assert res.func == bench_command
+    for key, value in namespace.items():
+        assert getattr(res, key) == value
+
+
+@pytest.mark.parametrize('args', [
+    ['bench', 'test', '-n', '0'],
+    ['bench', 'test', '-c', '-1'],
+    ['bench', 'test', '-w', '-1'],
+    ['bench', 'test', '-n', 'many'],
+])
+def test_bench_command_invalid_numbers(args):
+    with pytest.raises(SystemExit):
+        argument_parser().parse_args(args)
+
+
 @pytest.mark.parametrize('args, namespace', [
     (['l'], {'module': None}),
     (['list'], {'module': None}),
@@ -273,7 +311,7 @@ async def test_list_command_filter_module(monkeypatch, capsys):
             'req3': mock_request(name='req3', module='module2')
         }
     }
-    monkeypatch.setattr(commands, 'get_requests', lambda: requests)
+    monkeypatch.setattr(commands, 'get_requests_in', lambda module: requests)
     await list_command(attrdict({'module': 'module1'}))
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == '''module1:
@@ -283,6 +321,28 @@ async def test_list_command_filter_module(monkeypatch, capsys):
 
 
 
+@pytest.mark.asyncio
+async def test_list_command_filter_package(monkeypatch, capsys):
+    requests = {
+        'billing': {'req1': mock_request(name='req1', module='billing')},
+        'billing.invoices': {'req2': mock_request(name='req2', module='billing.invoices')},
+        'billing_old': {'req3': mock_request(name='req3', module='billing_old')},
+    }
+    loaded = []
+    def mocked_get_requests_in(module):
+        loaded.append(module)
+        return requests
+    monkeypatch.setattr(commands, 'get_requests_in', mocked_get_requests_in)
+    await list_command(attrdict({'module': 'billing'}))
+    captured = capsys.readouterr()
+    assert escape_ansi(captured.out) == '''billing:
+ - req1
+billing.invoices:
+ - req2
+'''
+    assert loaded == ['billing']
+
+
 @pytest.mark.asyncio
 async def test_list_command_filter_module_request(monkeypatch, capsys):
     requests = {
@@ -295,7 +355,7 @@ async def test_list_command_filter_module_request(monkeypatch, capsys):
             'req3': mock_request(name='req3', module='module2')
         }
     }
-    monkeypatch.setattr(commands, 'get_requests', lambda: requests)
+    monkeypatch.setattr(commands, 'get_requests_in', lambda module: requests)
     await list_command(attrdict({'module': 'module1:req1'}))
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == '''module1:
@@ -316,7 +376,7 @@ async def test_list_command_module_not_found(monkeypatch, capsys):
     requests = {
         'module': {'req': mock_request(name='req', module='module')}
     }
-    monkeypatch.setattr(commands, 'get_requests', lambda: requests)
+    monkeypatch.setattr(commands, 'get_requests_in', lambda module: requests)
     await list_command(attrdict({'module': 'module_404'}))
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == 'Module "module_404" does not exist.\n'
@@ -339,7 +399,7 @@ async def test_list_command_module_and_request_not_found(monkeypatch, capsys):
         'module1': {'req1': mock_request(name='req1', module='module1')},
         'module2': {'req2': mock_request(name='req2', module='module2')}
     }
-    monkeypatch.setattr(commands, 'get_requests', lambda: requests)
+    monkeypatch.setattr(commands, 'get_requests_in', lambda module: requests)
     await list_command(attrdict({'module': 'module1:request2'}))
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == 'Request "request2" does not exist in module "module1".\n'
@@ -394,9 +454,14 @@ async def test_prepare_and_execute_request(monkeypatch):
         'module:request', attrdict({
             'arguments': ['arg1=value1', 'arg2=value2'],
             'use_defaults': True,
-            'env': 'default'
+            'env': 'default',
+            'body_limit': 100,
+            'output': None,
+            'record': None,
+            'replay': None
         })
     )
+    assert reporting.BODY_LIMIT == 100
 
 
 @pytest.mark.asyncio
@@ -407,7 +472,8 @@ async def test_prepare_and_execute_request_exception(capsys, monkeypatch):
     monkeypatch.setattr(commands, 'execute_request', mocked_execute_request)
     monkeypatch.setattr(commands, 'init_environment', lambda _: None)
     await prepare_and_execute_request('module:request', attrdict(
-            {'arguments': [], 'use_defaults': True, 'env': 'default' }
+            {'arguments': [], 'use_defaults': True, 'env': 'default', 'body_limit': 0, 'output': None,
+             'record': None, 'replay': None}
     ))
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == 'It is broken\n'
@@ -421,9 +487,70 @@ async def test_prepare_and_execute_request_assertion_error(capsys, monkeypatch):
     monkeypatch.setattr(commands, 'execute_request', mocked_execute_request)
     monkeypatch.setattr(commands, 'init_environment', lambda _: None)
     await prepare_and_execute_request('module:request', attrdict(
-            {'arguments': [], 'use_defaults': True, 'env': 'default' }
+            {'arguments': [], 'use_defaults': True, 'env': 'default', 'body_limit': 0, 'output': None,
+             'record': None, 'replay': None}
     ))
     lines = escape_ansi(capsys.readouterr().out).splitlines()
     assert len(lines) == 2
     assert lines[0].startswith('Assertion error in ')
     assert lines[1] == 'assert 1 == 2'
+
+
+
+@pytest.mark.asyncio
+async def test_bench_command_executes_benchmark(monkeypatch, capsys):
+    async def mocked_run_benchmark(request, env, session, count, **kwargs):
+        assert request.name == 'request'
+        assert count == 10
+        assert kwargs == {
+            'concurrency': 2, 'warmup': 1, 'use_defaults': True, 'kwargs': {'x': '1'}
+        }
+        stats = BenchmarkStats()
+        stats.started, stats.finished = 0.0, 1.0
+        return stats
+
+    async def mocked_close_session():
+        mocked_close_session.called = True
+
+    monkeypatch.setattr(commands, 'find_request', lambda _: mock_request())
+    monkeypatch.setattr(commands, 'init_environment', lambda _: None)
+    monkeypatch.setattr(commands, 'get_environment', lambda: {})
+    monkeypatch.setattr(dbgr.session, 'get_session', lambda env=None: None)
+    monkeypatch.setattr(dbgr.session, 'close_session', mocked_close_session)
+    monkeypatch.setattr(commands, 'run_benchmark', mocked_run_benchmark)
+    await bench_command(attrdict({
+        'request': 'request', 'env': 'default', 'use_defaults': True,
+        'arguments': ['x=1'], 'requests': 10, 'concurrency': 2, 'warmup': 1,
+        'record': None, 'replay': None
+    }))
+    output = escape_ansi(capsys.readouterr().out)
+    assert output.startswith('Benchmarking "module:request": 10 requests, 2 workers, 1 warm-up\n')
+    assert 'Throughput: 0.0 req/s' in output
+    assert mocked_close_session.called
+
+
+@pytest.mark.asyncio
+async def test_bench_command_exception(monkeypatch, capsys):
+    def mocked_find_request(_):
+        raise Exception('It is broken')
+
+    async def mocked_close_session():
+        pass
+
+    monkeypatch.setattr(commands, 'find_request', mocked_find_request)
+    monkeypatch.setattr(commands, 'init_environment', lambda _: None)
+    monkeypatch.setattr(dbgr.session, 'close_session', mocked_close_session)
+    await bench_command(attrdict({
+        'request': 'request', 'env': 'default', 'record': None, 'replay': None
+    }))
+    assert escape_ansi(capsys.readouterr().out) == 'It is broken\n'
+
+
+def test_import_does_not_load_heavy_dependencies():
+    heavy = ('aiohttp', 'pygments', 'dateparser', 'argcomplete', 'readline', 'sqlite3')
+    code = (
+        'import sys, app, dbgr.completion\n'
+        f'print(",".join(m for m in {heavy!r} if m in sys.modules))'
+    )
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True)
+    assert res.stdout.decode().strip() == ''
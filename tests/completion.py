@@ -1,4 +1,5 @@
 import pytest
+import dbgr.index
 from dbgr import completion
 
 def test_completer_is_abstract():
@@ -24,46 +25,129 @@ def test_completer_caches():
 
 
 def test_environments_completer(monkeypatch):
-    monkeypatch.setattr(completion, 'get_environments', lambda: ['env1', 'env2'])
+    monkeypatch.setattr(completion, 'get_completion_index', lambda: {'environments': ['env1', 'env2']})
     com = completion.EnvironmentsCompleter()
     assert com() == ('env1', 'env2')
 
 
-def test_requests_completer(monkeypatch, mocked_request):
+def test_requests_completer(monkeypatch):
+    monkeypatch.setattr(completion, 'get_completion_index', lambda: {'requests': ['m:r', 'r']})
+    com = completion.RequestsCompleter()
+    assert com() == ('m:r', 'r')
+
+
+def test_modules_completer(monkeypatch):
+    monkeypatch.setattr(completion, 'get_completion_index', lambda: {'modules': ['m1', 'm2']})
+    com = completion.ModulesCompleter()
+    assert com() == ('m1', 'm2')
+
+
+def test_request_choices():
     requests = {
-        'module1': {
-            'request1': mocked_request,
-            'request2': mocked_request
-        },
-        'module2': {
-            'request2': mocked_request,
-            'request3': mocked_request
-        },
-        'module3': {
-            'request2': mocked_request,
-        }
+        'module1': ['request1', 'request2'],
+        'module2': ['request2', 'request3'],
+        'module3': ['request2'],
     }
-    monkeypatch.setattr(completion, 'get_requests', lambda: requests)
-    com = completion.RequestsCompleter()
-    assert set(com()) == set([
+    assert set(completion.request_choices(requests)) == set([
         'module1:request1', 'module1:request2', 'request1',
         'module2:request2', 'module2:request3', 'request3',
         'module3:request2'
     ])
 
 
-def test_modules_completed(monkeypatch, mocked_request):
-    requests = {
-        'module1': {
-            'request1': mocked_request,
-        },
-        'module2': {
-            'request2': mocked_request,
-        },
-        'module3': {
-            'request3': mocked_request,
-        }
-    }
-    monkeypatch.setattr(completion, 'get_requests', lambda: requests)
-    com = completion.ModulesCompleter()
-    assert com() == ('module1', 'module2', 'module3')
+def write_files(path, files):
+    for name, content in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_text(content)
+
+
+REQUESTS_MODULE = '''
+from dbgr import request
+
+@request
+async def request1():
+    pass
+
+@request
+async def request2():
+    pass
+'''
+
+
+def test_build_completion_index(monkeypatch, tmp_path):
+    write_files(tmp_path, {
+        'module1.py': REQUESTS_MODULE,
+        'module2.py': 'from dbgr import request\n@request\nasync def request2():\n    pass\n',
+        'default.ini': '',
+        'prod.ini': '',
+    })
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    completion_index = completion.build_completion_index({})
+    assert completion_index['requests'] == [
+        'module1:request1', 'module1:request2', 'module2:request2', 'request1'
+    ]
+    assert sorted(completion_index['modules']) == ['module1', 'module2']
+    assert sorted(completion_index['environments']) == ['default', 'prod']
+
+
+def test_modules_completer_skips_modules_without_requests(monkeypatch, tmp_path):
+    write_files(tmp_path, {
+        'module.py': REQUESTS_MODULE,
+        'helpers.py': 'def helper():\n    pass\n',
+        'dynamic.py': 'from dbgr import request\nrequest(lambda: None)\n',
+        'billing/__init__.py': '',
+    })
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    assert sorted(completion.ModulesCompleter()()) == ['dynamic', 'module']
+
+
+def test_get_completion_index_doesnt_import_modules(monkeypatch, tmp_path):
+    write_files(tmp_path, {'module.py': REQUESTS_MODULE + 'raise Exception("Imported")\n'})
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    assert completion.get_completion_index()['modules'] == ['module']
+
+
+def test_get_completion_index_cached(monkeypatch, tmp_path):
+    write_files(tmp_path, {'module.py': REQUESTS_MODULE, 'default.ini': ''})
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    completion_index = completion.get_completion_index()
+    assert completion.get_completion_index() is completion_index
+    monkeypatch.setattr(completion, '_COMPLETION_INDEX', None)
+    monkeypatch.setattr(completion, 'build_completion_index', lambda _: pytest.fail('Index rebuilt'))
+    assert completion.get_completion_index() == completion_index
+
+
+@pytest.mark.parametrize('files', [
+    {'module.py': 'from dbgr import request\n'},
+    {'other.py': ''},
+    {'prod.ini': ''},
+])
+def test_get_completion_index_invalidated(monkeypatch, tmp_path, files):
+    write_files(tmp_path, {'module.py': REQUESTS_MODULE, 'default.ini': ''})
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    completion_index = completion.get_completion_index()
+    write_files(tmp_path, files)
+    monkeypatch.setattr(completion, '_COMPLETION_INDEX', None)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    assert completion.get_completion_index() != completion_index
+
+
+def test_get_completion_index_invalidated_by_nested_module(monkeypatch, tmp_path):
+    write_files(tmp_path, {
+        'billing/__init__.py': '',
+        'billing/invoices.py': 'from dbgr import request\n@request\nasync def first():\n    pass\n',
+    })
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    assert completion.get_completion_index()['requests'] == ['billing.invoices:first', 'first']
+    write_files(tmp_path, {'billing/invoices.py': REQUESTS_MODULE})
+    monkeypatch.setattr(completion, '_COMPLETION_INDEX', None)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    assert completion.get_completion_index()['requests'] == [
+        'billing.invoices:request1', 'billing.invoices:request2', 'request1', 'request2'
+    ]
@@ -1,9 +1,15 @@
+import cgi
 import types
 import builtins
 from io import StringIO
 import re
 import pytest
 import dbgr.requests
+import dbgr.cache
+import dbgr.index
+import dbgr.completion
+import dbgr.session
+import dbgr.reporting
 import http.client
 import aiohttp
 from multidict import CIMultiDict
@@ -61,8 +67,30 @@ def mocked_env():
 @pytest.fixture(autouse=True)
 def clear_cache():
     dbgr.requests._CACHE = {}
+    dbgr.requests._IN_FLIGHT = {}
     yield
     dbgr.requests._CACHE = {}
+    dbgr.requests._IN_FLIGHT = {}
+
+
+@pytest.fixture(autouse=True)
+def mock_data_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(dbgr.cache, 'get_data_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(dbgr.index, 'get_data_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(dbgr.completion, 'get_data_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(dbgr.completion, '_COMPLETION_INDEX', None)
+    dbgr.cache._DISK_CACHE = None
+    yield
+    if dbgr.cache._DISK_CACHE is not None:
+        dbgr.cache._DISK_CACHE.close()
+    dbgr.cache._DISK_CACHE = None
+
+
+@pytest.fixture(autouse=True)
+def restore_reporting(monkeypatch):
+    monkeypatch.setattr(dbgr.reporting, 'SILENT', dbgr.reporting.SILENT)
+    monkeypatch.setattr(dbgr.reporting, 'BODY_LIMIT', dbgr.reporting.BODY_LIMIT)
+    monkeypatch.setattr(dbgr.reporting, '_OUTPUT', None)
 
 
 @pytest.fixture(autouse=True)
@@ -73,14 +101,25 @@ def clear_environment():
 
 @pytest.fixture(autouse=True)
 def clear_session():
-    dbgr.session._SESSION = None
+    dbgr.session._SESSIONS.clear()
+    dbgr.session._TRACE_CONFIGS = None
+    dbgr.session._CASSETTE = None
     yield
-    dbgr.session._SESSION = None
+    dbgr.session._SESSIONS.clear()
+    dbgr.session._TRACE_CONFIGS = None
+    dbgr.session._CASSETTE = None
 
 
 @pytest.fixture(autouse=True)
 def mock_registered_requests(monkeypatch):
+    monkeypatch.setattr(dbgr.requests, '_REQUESTS', {})
+    monkeypatch.setattr(dbgr.requests, '_NAMES', {})
+    monkeypatch.setattr(dbgr.requests, '_LOADED_MODULES', set())
+    monkeypatch.setattr(dbgr.requests, '_ALL_LOADED', False)
     monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: {})
+    monkeypatch.setattr(dbgr.requests, 'get_index', lambda: dbgr.index.RequestIndex(''))
+    yield
+    dbgr.requests.unload_packages()
 
 
 class MockedResponse:
@@ -100,8 +139,14 @@ class MockedResponse:
     def reason(self):
         return http.client.responses[self.status]
 
+    async def read(self):
+        if self.data is None:
+            return b''
+        return self.data if isinstance(self.data, bytes) else self.data.encode()
+
     async def text(self):
-        return '' if self.data is None else self.data
+        _, params = cgi.parse_header(self.headers.get('Content-Type', ''))
+        return (await self.read()).decode(params.get('charset', 'utf-8'))
 
     async def json(self):
         content_type = self.headers.get('Content-Type', '')
@@ -0,0 +1,67 @@
+import pytest
+import dbgr
+from dbgr import response
+from dbgr.requests import execute_request
+from dbgr.dependencies import (
+    discover_dependencies, topological_order, DependencyCycleError
+)
+
+
+async def calls_response(session):
+    token = await response('login')
+    flags = await dbgr.response('module:flags')
+    again = await response('login')
+    return token, flags, again
+
+
+async def calls_response_with_arguments(session):
+    await response('login', username='admin')
+    await response('login', cache=False)
+    name = 'login'
+    await response(name)
+
+
+async def calls_other_function(session):
+    await print('login')
+
+
+def test_discover_dependencies():
+    assert discover_dependencies(calls_response, execute_request) == [
+        'login', 'module:flags'
+    ]
+
+
+def test_discover_only_literal_calls_without_arguments():
+    assert discover_dependencies(calls_response_with_arguments, execute_request) == []
+    assert discover_dependencies(calls_other_function, execute_request) == []
+
+
+def test_discover_without_source():
+    assert discover_dependencies(len, execute_request) == []
+
+
+class Node:
+    def __init__(self, name, *dependencies):
+        self.module = 'module'
+        self.name = name
+        self.dependencies = list(dependencies)
+
+
+def test_topological_order():
+    login, flags = Node('login'), Node('flags')
+    profile = Node('profile', login)
+    root = Node('root', profile, flags, login)
+    order = topological_order(root, lambda node: node.dependencies)
+    assert order == [login, profile, flags, root]
+
+
+def test_topological_order_detects_cycle():
+    first, second = Node('first'), Node('second')
+    first.dependencies.append(second)
+    second.dependencies.append(first)
+    root = Node('root', first)
+    with pytest.raises(DependencyCycleError) as ex:
+        topological_order(root, lambda node: node.dependencies)
+    assert str(ex.value) == (
+        'Requests depend on each other: module:first -> module:second -> module:first'
+    )
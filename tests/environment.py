@@ -90,3 +90,36 @@ def test_get_environment_cached(mock_file):
     env1 = environment.get_environment()
     env2 = environment.get_environment()
     assert env1 == env2
+
+
+def test_fingerprint_differs_between_environments(mock_file):
+    mock_file('staging.ini', '[section]\nurl: staging.example.com\n')
+    staging = environment.Environment('staging')
+    mock_file('prod.ini', '[section]\nurl: example.com\n')
+    prod = environment.Environment('prod')
+    assert staging.fingerprint != prod.fingerprint
+
+
+def test_fingerprint_includes_environment_name(mock_file):
+    mock_file('env1.ini', '[section]\nkey: value\n')
+    env1 = environment.Environment('env1')
+    mock_file('env2.ini', '[section]\nkey: value\n')
+    env2 = environment.Environment('env2')
+    assert env1.fingerprint != env2.fingerprint
+
+
+def test_fingerprint_is_stable(mock_file):
+    mock_file('default.ini', '[section]\nkey: value\n')
+    assert environment.Environment('default').fingerprint == environment.Environment('default').fingerprint
+
+
+def test_fingerprint_changes_with_value(mock_file):
+    mock_file('default.ini', '[section]\nkey: value\n')
+    env = environment.Environment('default')
+    fingerprint = env.fingerprint
+    env.set('section', 'key', 'other')
+    assert env.fingerprint != fingerprint
+
+
+def test_environment_fingerprint_of_mapping():
+    assert environment.environment_fingerprint({'key': 'value'}) != environment.environment_fingerprint({})
@@ -0,0 +1,296 @@
+import asyncio
+from configparser import ConfigParser
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from multidict import CIMultiDict
+from dbgr import http_cache, session, reporting
+from dbgr.http_cache import (
+    CacheEntry, CachedResponse, HttpCache, parse_cache_control, is_storable,
+    InvalidHttpCacheOptionError
+)
+from tests.conftest import escape_ansi
+
+
+def make_entry(headers, stored=1000.0, request_headers=None):
+    return CacheEntry(
+        'GET', 'http://example.com', 200, 'OK', list(headers.items()), b'body',
+        CIMultiDict(request_headers or {}), stored
+    )
+
+
+def make_env(ini):
+    env = ConfigParser()
+    env.read_string(ini)
+    return env
+
+
+@pytest_asyncio.fixture
+async def server():
+    calls = []
+    async def handler(request):
+        calls.append(dict(request.headers))
+        mode = request.query.get('mode')
+        if mode == 'slow':
+            await asyncio.sleep(0.1)
+        if mode == 'etag':
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304, headers={'ETag': '"v1"'})
+            return web.Response(
+                text='{"key": "value"}', content_type='application/json',
+                headers={'ETag': '"v1"', 'Cache-Control': 'no-cache'}
+            )
+        if mode == 'private':
+            await asyncio.sleep(0.1)
+            return web.Response(text=request.headers.get('Authorization', ''), headers={
+                'Cache-Control': 'no-store', 'Vary': 'Authorization'
+            })
+        if mode == 'slow-no-store':
+            await asyncio.sleep(0.1)
+            return web.Response(text='secret', headers={'Cache-Control': 'no-store'})
+        if mode == 'no-store':
+            return web.Response(text='secret', headers={'Cache-Control': 'no-store'})
+        return web.Response(
+            text='{"key": "value"}', content_type='application/json',
+            headers={'Cache-Control': 'max-age=60'}
+        )
+    app = web.Application()
+    app.router.add_get('/', handler)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    test_server.calls = calls
+    yield test_server
+    await test_server.close()
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, {}),
+    ('no-cache', {'no-cache': None}),
+    ('max-age=60, Private', {'max-age': '60', 'private': None}),
+    ('no-cache="Set-Cookie", max-age = 5', {'no-cache': 'Set-Cookie', 'max-age': '5'}),
+])
+def test_parse_cache_control(value, expected):
+    assert parse_cache_control(value) == expected
+
+
+def test_entry_fresh_with_max_age():
+    entry = make_entry({'Cache-Control': 'max-age=60'})
+    assert entry.is_fresh(1059.0)
+    assert not entry.is_fresh(1060.0)
+
+
+def test_entry_fresh_with_age_header():
+    entry = make_entry({'Cache-Control': 'max-age=60', 'Age': '50'})
+    assert entry.is_fresh(1009.0)
+    assert not entry.is_fresh(1010.0)
+
+
+def test_entry_fresh_with_expires():
+    entry = make_entry({
+        'Date': 'Mon, 01 Jan 2024 00:00:00 GMT',
+        'Expires': 'Mon, 01 Jan 2024 00:01:00 GMT',
+    })
+    assert entry.freshness_lifetime == 60
+    assert make_entry({'Expires': 'invalid'}).freshness_lifetime == 0
+
+
+def test_entry_no_cache_is_never_fresh():
+    entry = make_entry({'Cache-Control': 'no-cache, max-age=60'})
+    assert not entry.is_fresh(1000.0)
+
+
+def test_entry_vary():
+    entry = make_entry({'Vary': 'Accept'}, request_headers={'Accept': 'text/html'})
+    assert entry.matches(CIMultiDict({'accept': 'text/html'}))
+    assert not entry.matches(CIMultiDict({'Accept': 'application/json'}))
+
+
+def test_entry_validators_and_update():
+    entry = make_entry({'ETag': '"v1"', 'Last-Modified': 'yesterday', 'Age': '10'})
+    assert entry.validators() == {'If-None-Match': '"v1"', 'If-Modified-Since': 'yesterday'}
+    entry.update(CIMultiDict({'ETag': '"v2"', 'Server': 'ignored'}), 2000.0)
+    assert dict(entry.headers) == {'ETag': '"v2"', 'Last-Modified': 'yesterday'}
+    assert entry.stored == 2000.0
+
+
+@pytest.mark.parametrize('status, headers, request_headers, expected', [
+    (200, {'Cache-Control': 'max-age=60'}, {}, True),
+    (200, {'ETag': '"v1"'}, {}, True),
+    (200, {}, {}, False),
+    (500, {'Cache-Control': 'max-age=60'}, {}, False),
+    (200, {'Cache-Control': 'no-store, max-age=60'}, {}, False),
+    (200, {'Cache-Control': 'max-age=60'}, {'Cache-Control': 'no-store'}, False),
+    (200, {'Cache-Control': 'max-age=60', 'Vary': '*'}, {}, False),
+])
+def test_is_storable(status, headers, request_headers, expected):
+    assert is_storable(status, CIMultiDict(headers), CIMultiDict(request_headers)) == expected
+
+
+@pytest.mark.asyncio
+async def test_cached_response():
+    entry = make_entry({'Content-Type': 'application/json; charset=utf-8'})
+    entry.body = b'{"key": "value"}'
+    res = CachedResponse(entry, {'Accept': '*/*'}, 'hit')
+    assert res.ok and res.charset == 'utf-8' and res.content_type == 'application/json'
+    assert await res.read() == entry.body
+    assert await res.text() == '{"key": "value"}'
+    assert await res.json() == {'key': 'value'}
+    assert res.request_info.headers['accept'] == '*/*'
+    res.raise_for_status()
+    async with res as context:
+        assert context is res
+
+
+@pytest.mark.asyncio
+async def test_cached_response_errors():
+    entry = make_entry({'Content-Type': 'text/plain'})
+    entry.status = 410
+    res = CachedResponse(entry, {}, 'hit')
+    with pytest.raises(http_cache.aiohttp.ContentTypeError):
+        await res.json()
+    with pytest.raises(http_cache.aiohttp.ClientResponseError):
+        res.raise_for_status()
+
+
+def test_is_cacheable():
+    cache = HttpCache()
+    assert cache.is_cacheable('get', {})
+    assert not cache.is_cacheable('POST', {})
+    assert not cache.is_cacheable('GET', {'data': 'x'})
+    assert not cache.is_cacheable('GET', {'headers': {'if-none-match': '"v1"'}})
+
+
+def test_invalid_storage():
+    with pytest.raises(InvalidHttpCacheOptionError):
+        HttpCache(storage='redis')
+
+
+def test_create_http_cache():
+    assert http_cache.create_http_cache({}) is None
+    assert http_cache.create_http_cache(make_env('[service]\nurl: x')) is None
+    cache = http_cache.create_http_cache(
+        make_env('[dbgr.http_cache]\nstorage: memory\nmax_entries: 5')
+    )
+    assert cache.memory.max_entries == 5
+    with pytest.raises(InvalidHttpCacheOptionError):
+        http_cache.create_http_cache(make_env('[dbgr.http_cache]\nmax_entries: many'))
+
+
+@pytest.mark.asyncio
+async def test_session_serves_fresh_response_from_cache(server, capsys):
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    first = await sess.get(server.make_url('/'))
+    assert await first.json() == {'key': 'value'}
+    second = await sess.get(server.make_url('/'))
+    assert isinstance(second, CachedResponse)
+    assert await second.json() == {'key': 'value'}
+    assert len(server.calls) == 1
+    assert sess.http_cache.stats.counts == {'hit': 1, 'revalidated': 0, 'miss': 1}
+    output = escape_ansi(capsys.readouterr().out)
+    assert '< HTTP cache (miss):\n<  Hits: 0, revalidated: 0, misses: 1\n' in output
+    assert '< HTTP cache (hit):\n<  Hits: 1, revalidated: 0, misses: 1\n' in output
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_revalidates_stale_response(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    await (await sess.get(server.make_url('/?mode=etag'))).read()
+    second = await sess.get(server.make_url('/?mode=etag'))
+    assert second.status == 200
+    assert second.cache_status == 'revalidated'
+    assert await second.json() == {'key': 'value'}
+    assert server.calls[1]['If-None-Match'] == '"v1"'
+    assert sess.http_cache.stats.counts == {'hit': 0, 'revalidated': 1, 'miss': 1}
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_reports_revalidated_response(server, capsys):
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    await (await sess.get(server.make_url('/?mode=etag'))).read()
+    capsys.readouterr()
+    await sess.get(server.make_url('/?mode=etag'))
+    output = escape_ansi(capsys.readouterr().out)
+    assert '> 200 OK' in output
+    assert '304' not in output
+    assert '"key": "value"' in output
+    assert '< HTTP cache (revalidated):\n<  Hits: 0, revalidated: 1, misses: 1\n' in output
+    assert output.count('HTTP cache') == 1
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_coalesces_concurrent_requests(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    responses = await asyncio.gather(*[
+        sess.get(server.make_url('/?mode=slow')) for _ in range(3)
+    ])
+    assert len(server.calls) == 1
+    assert [await res.text() for res in responses] == ['{"key": "value"}'] * 3
+    assert sess.http_cache.stats.counts == {'hit': 2, 'revalidated': 0, 'miss': 1}
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_coalesces_only_identical_headers(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    responses = await asyncio.gather(*[
+        sess.get(server.make_url('/?mode=private'), headers={'Authorization': user})
+        for user in ('alice', 'bob')
+    ])
+    assert [await res.text() for res in responses] == ['alice', 'bob']
+    assert len(server.calls) == 2
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_does_not_share_responses_it_cannot_store(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    responses = await asyncio.gather(*[
+        sess.get(server.make_url('/?mode=slow-no-store')) for _ in range(2)
+    ])
+    assert [await res.text() for res in responses] == ['secret'] * 2
+    assert len(server.calls) == 2
+    assert sess.http_cache.stats.counts == {'hit': 0, 'revalidated': 0, 'miss': 2}
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_does_not_store_no_store(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    sess = session.get_session(make_env('[dbgr.http_cache]'))
+    await (await sess.get(server.make_url('/?mode=no-store'))).read()
+    await (await sess.get(server.make_url('/?mode=no-store'))).read()
+    assert len(server.calls) == 2
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_disk_storage(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    env = make_env('[dbgr.http_cache]\nstorage: disk')
+    sess = session.get_session(env)
+    await (await sess.get(server.make_url('/'))).read()
+    await session.close_session()
+    sess = session.get_session(env)
+    res = await sess.get(server.make_url('/'))
+    assert res.cache_status == 'hit'
+    assert len(server.calls) == 1
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_session_without_http_cache(server, monkeypatch):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    sess = session.get_session({})
+    assert sess.http_cache is None
+    await (await sess.get(server.make_url('/'))).read()
+    await (await sess.get(server.make_url('/'))).read()
+    assert len(server.calls) == 2
+    await session.close_session()
@@ -0,0 +1,289 @@
+import os
+import json
+from textwrap import dedent
+import pytest
+from dbgr import index
+from dbgr.index import (
+    RequestIndex, parse_module, extract_module_name, find_modules, in_package
+)
+
+
+def write_module(path, name, content):
+    module_path = os.path.join(str(path), f'{name}.py')
+    with open(module_path, 'w') as module_file:
+        module_file.write(dedent(content))
+    return module_path
+
+
+@pytest.mark.parametrize('path, name', [
+    ('some/path/module.py', 'module'),
+    ('simple.py', 'simple'),
+])
+def test_extract_module_name(path, name):
+    assert extract_module_name(path) == name
+
+
+@pytest.mark.parametrize('path, name', [
+    ('/root/module.py', 'module'),
+    ('/root/billing/invoices.py', 'billing.invoices'),
+    ('/root/billing/__init__.py', 'billing'),
+    ('/root/billing/invoices/items.py', 'billing.invoices.items'),
+])
+def test_extract_nested_module_name(path, name):
+    assert extract_module_name(path, '/root') == name
+
+
+@pytest.mark.parametrize('module, package, result', [
+    ('billing', 'billing', True),
+    ('billing.invoices', 'billing', True),
+    ('billing_old', 'billing', False),
+    ('orders', 'billing', False),
+])
+def test_in_package(module, package, result):
+    assert in_package(module, package) == result
+
+
+def package_tree(path):
+    for directory in ('billing/invoices', 'scripts', '.venv/lib'):
+        os.makedirs(os.path.join(str(path), directory))
+    for module in (
+            'module', 'billing/__init__', 'billing/invoices/__init__', 'billing/invoices/items',
+            'billing/payments', 'scripts/script', '.venv/lib/__init__'):
+        write_module(path, module, '')
+
+
+def test_find_modules_in_packages(tmp_path):
+    package_tree(tmp_path)
+    assert [os.path.relpath(path, str(tmp_path)) for path in find_modules(str(tmp_path))] == [
+        'module.py',
+        os.path.join('billing', '__init__.py'),
+        os.path.join('billing', 'payments.py'),
+        os.path.join('billing', 'invoices', '__init__.py'),
+        os.path.join('billing', 'invoices', 'items.py'),
+    ]
+
+
+def test_parse_module_decorators(tmp_path):
+    module_path = write_module(tmp_path, 'module', '''
+        import dbgr
+        import dbgr.requests as dbgr_requests
+        from dbgr import request, response
+        from dbgr import request as req
+
+        @request
+        async def bare(env, session, arg_1, arg_2=2):
+            await session.request('GET', 'url')
+
+        @request(name='alternative', cache='session')
+        async def named():
+            pass
+
+        @req('positional', 'disk')
+        async def aliased():
+            pass
+
+        @dbgr.request
+        async def attribute():
+            pass
+
+        @dbgr_requests.request_decorator(cache=None)
+        async def module_alias():
+            pass
+
+        async def not_request():
+            pass
+    ''')
+    assert parse_module(module_path) == {
+        'dynamic': False,
+        'requests': [
+            {'name': 'bare', 'cache': None, 'arguments': ['env', 'session', 'arg_1', 'arg_2']},
+            {'name': 'alternative', 'cache': 'session', 'arguments': []},
+            {'name': 'positional', 'cache': 'disk', 'arguments': []},
+            {'name': 'attribute', 'cache': None, 'arguments': []},
+            {'name': 'module_alias', 'cache': None, 'arguments': []},
+        ]
+    }
+
+
+@pytest.mark.parametrize('content', [
+    '''
+        from dbgr import request
+        NAME = 'name'
+
+        @request(name=NAME)
+        async def func():
+            pass
+    ''',
+    '''
+        from dbgr import request
+
+        async def func():
+            pass
+
+        request(func)
+    ''',
+    '''
+        from dbgr import request as req
+        decorators = [req]
+    ''',
+    'invalid syntax (',
+])
+def test_parse_module_dynamic(tmp_path, content):
+    module_path = write_module(tmp_path, 'module', content)
+    assert parse_module(module_path)['dynamic'] == True
+
+
+def test_refresh_indexes_modules(tmp_path):
+    module_path = write_module(tmp_path, 'module', '''
+        from dbgr import request
+
+        @request
+        async def func():
+            pass
+    ''')
+    idx = RequestIndex(str(tmp_path)).refresh()
+    assert list(idx.modules) == [module_path]
+    assert idx.modules[module_path]['module'] == 'module'
+    assert idx.modules[module_path]['requests'][0]['name'] == 'func'
+
+
+def test_refresh_names_nested_modules(tmp_path):
+    package_tree(tmp_path)
+    idx = RequestIndex(str(tmp_path)).refresh()
+    assert sorted(entry['module'] for entry in idx.modules.values()) == [
+        'billing', 'billing.invoices', 'billing.invoices.items', 'billing.payments', 'module'
+    ]
+
+
+def test_refresh_skips_unchanged_modules(monkeypatch, tmp_path):
+    write_module(tmp_path, 'module', 'from dbgr import request\n')
+    idx = RequestIndex(str(tmp_path)).refresh()
+    monkeypatch.setattr(index, 'parse_module', lambda _: pytest.fail('Module parsed again'))
+    idx.refresh()
+
+
+def test_refresh_reparses_changed_modules(tmp_path):
+    module_path = write_module(tmp_path, 'module', 'from dbgr import request\n')
+    idx = RequestIndex(str(tmp_path)).refresh()
+    write_module(tmp_path, 'module', '''
+        from dbgr import request
+
+        @request
+        async def func():
+            pass
+    ''')
+    idx.refresh()
+    assert idx.modules[module_path]['requests'][0]['name'] == 'func'
+
+
+def test_refresh_removes_deleted_modules(tmp_path):
+    module_path = write_module(tmp_path, 'module', '')
+    idx = RequestIndex(str(tmp_path)).refresh()
+    os.remove(module_path)
+    idx.refresh()
+    assert idx.modules == {}
+
+
+def test_index_saved_and_loaded(monkeypatch, tmp_path):
+    index_path = str(tmp_path / 'index.json')
+    directory = tmp_path / 'requests'
+    directory.mkdir()
+    module_path = write_module(directory, 'module', '''
+        from dbgr import request
+
+        @request
+        async def func():
+            pass
+    ''')
+    RequestIndex(str(directory), index_path).refresh()
+    with open(index_path) as index_file:
+        assert json.load(index_file)['version'] == index.INDEX_VERSION
+    monkeypatch.setattr(index, 'parse_module', lambda _: pytest.fail('Module parsed again'))
+    idx = RequestIndex(str(directory), index_path).refresh()
+    assert idx.modules[module_path]['requests'][0]['name'] == 'func'
+
+
+def test_index_from_different_directory_ignored(tmp_path):
+    index_path = str(tmp_path / 'index.json')
+    with open(index_path, 'w') as index_file:
+        json.dump({'version': index.INDEX_VERSION, 'directory': '/other', 'modules': {
+            '/other/module.py': {}
+        }}, index_file)
+    idx = RequestIndex(str(tmp_path / 'empty'), index_path)
+    idx.load()
+    assert idx.modules == {}
+
+
+def test_corrupted_index_ignored(tmp_path):
+    index_path = str(tmp_path / 'index.json')
+    with open(index_path, 'w') as index_file:
+        index_file.write('{')
+    idx = RequestIndex(str(tmp_path), index_path)
+    idx.load()
+    assert idx.modules == {}
+
+
+def test_save_to_unwritable_location_ignored(tmp_path):
+    idx = RequestIndex(str(tmp_path), str(tmp_path / 'missing' / 'index.json'))
+    idx.save()
+
+
+def indexed(modules):
+    idx = RequestIndex('')
+    idx.modules = {
+        f'/{module}.py': {
+            'module': module,
+            'dynamic': dynamic,
+            'requests': [{'name': name} for name in names]
+        } for module, names, dynamic in modules
+    }
+    return idx
+
+
+def test_find_by_module():
+    idx = indexed([('module1', ['request'], False), ('module2', ['request'], False)])
+    assert idx.find('module1', 'request') == ['/module1.py']
+
+
+def test_find_missing_module():
+    assert indexed([]).find('module', 'request') is None
+
+
+def test_find_by_name():
+    idx = indexed([
+        ('module1', ['request'], False),
+        ('module2', ['other'], False),
+        ('module3', ['request'], False),
+    ])
+    assert idx.find(None, 'request') == ['/module1.py', '/module3.py']
+
+
+def test_find_by_name_includes_dynamic_modules():
+    idx = indexed([('module1', ['request'], False), ('module2', [], True)])
+    assert idx.find(None, 'request') == ['/module1.py', '/module2.py']
+
+
+def test_find_package():
+    idx = indexed([
+        ('billing', [], False),
+        ('billing.invoices', ['request'], False),
+        ('billing_old', ['request'], False),
+    ])
+    assert idx.find_package('billing') == ['/billing.py', '/billing.invoices.py']
+    assert idx.find_package('billing.invoices') == ['/billing.invoices.py']
+    assert idx.find_package('orders') is None
+
+
+def test_find_missing_name():
+    idx = indexed([('module1', ['request'], False), ('module2', [], True)])
+    assert idx.find(None, 'other') is None
+
+
+def test_get_index(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(index, '_INDEX', None)
+    write_module(tmp_path, 'module', '')
+    idx = index.get_index()
+    assert idx is index.get_index()
+    assert idx.directory == str(tmp_path)
+    assert os.path.isfile(os.path.join(str(tmp_path), index.INDEX_FILE))
@@ -5,9 +5,18 @@ import pytest
 from dbgr.results import Result
 from tests.conftest import MockedResponse, AiohttpParams, escape_ansi, MockedTraceContext
 import asyncio
+import types
 import re
 import aiohttp
 import os
+import json
+from colorama import Fore, Style
+
+
+async def print_response(res):
+    reporter = Reporter()
+    await reporter.print_response(res)
+    await reporter.flush()
 
 
 @pytest.mark.asyncio
@@ -146,10 +155,73 @@ async def test_reporter_print_response_binary(capsys, mocked_session):
 <  Content-Type: binary
 <
 < Response data (binary):
-b'binary'
+binary
 '''
 
 
+@pytest.mark.asyncio
+async def test_reporter_print_response_binary_hex_preview(capsys):
+    res = MockedResponse(
+        headers={'Content-Type': 'application/octet-stream'},
+        data=bytes(range(20))
+    )
+    await print_response(res)
+    assert escape_ansi(capsys.readouterr().out) == '''<
+< Response data (application/octet-stream):
+<binary data, 20B>
+00000000  00 01 02 03 04 05 06 07 08 09 0a 0b 0c 0d 0e 0f  ................
+00000010  10 11 12 13                                      ....
+'''
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_response_sniffs_binary(capsys, monkeypatch):
+    monkeypatch.setattr(reporting, 'HEX_PREVIEW', 16)
+    res = MockedResponse(headers={'Content-Type': 'text/plain'}, data=b'GIF89a\x00' + b'x' * 100)
+    await print_response(res)
+    lines = escape_ansi(capsys.readouterr().out).splitlines()
+    assert lines[2] == '<binary data, 107B>'
+    assert lines[3].startswith('00000000  47 49 46 38 39 61 00 78')
+    assert lines[4] == '[... 91B omitted ...]'
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_response_head_and_tail(capsys, monkeypatch):
+    monkeypatch.setattr(reporting, 'BODY_LIMIT', 10)
+    res = MockedResponse(headers={'Content-Type': 'text/plain'}, data='abcde' + 'x' * 100 + 'vwxyz')
+    await print_response(res)
+    assert escape_ansi(capsys.readouterr().out) == '''<
+< Response data (text/plain):
+abcde
+[... 100B omitted ...]
+vwxyz
+'''
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_response_without_limit(capsys, monkeypatch):
+    monkeypatch.setattr(reporting, 'BODY_LIMIT', 0)
+    res = MockedResponse(headers={'Content-Type': 'text/plain'}, data='x' * 100)
+    await print_response(res)
+    assert escape_ansi(capsys.readouterr().out).splitlines()[2] == 'x' * 100
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_response_invalid_json(capsys):
+    res = MockedResponse(headers={'Content-Type': 'application/json'}, data='{"key":')
+    await print_response(res)
+    assert escape_ansi(capsys.readouterr().out).splitlines()[2] == '{"key":'
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_response_charset(capsys):
+    res = MockedResponse(
+        headers={'Content-Type': 'text/plain; charset=latin-1'}, data='čau'.encode('utf-8')
+    )
+    await print_response(res)
+    assert escape_ansi(capsys.readouterr().out).splitlines()[2] == 'Ä\x8dau'
+
+
 @pytest.mark.asyncio
 async def test_progress_bar(capsys, mocked_session):
     par = AiohttpParams(MockedResponse())
@@ -177,11 +249,12 @@ async def test_progress_bar_stop(mocked_session):
 async def test_progress_bar_redirect(capsys, mocked_session):
     par = AiohttpParams(MockedResponse(), url='example.com')
     rep = ProgressBar()
-    await rep.on_request_start(mocked_session, {}, par)
-    await rep.on_request_redirect(mocked_session, {}, par)
+    ctx = MockedTraceContext()
+    await rep.on_request_start(mocked_session, ctx, par)
+    await rep.on_request_redirect(mocked_session, ctx, par)
     await asyncio.sleep(0.2)
     output = escape_ansi(capsys.readouterr().out).strip()
-    await rep.on_request_end(mocked_session, {}, par)
+    await rep.on_request_end(mocked_session, ctx, par)
     for line in output.splitlines():
         assert re.match(r'^(request send|redirecting) . \[0:00:00\.\d{6}\]$', line)
 
@@ -394,7 +467,7 @@ async def test_reporter_silent_mode(capsys, mocked_session, monkeypatch):
 async def test_report_result_silent(capsys, monkeypatch):
     monkeypatch.setattr(reporting, 'SILENT', True)
     r = Result('3.14', PrimitiveType(float))
-    report_result(r)
+    await report_result(r)
     captured = capsys.readouterr()
     assert captured.out == ''
 
@@ -402,7 +475,7 @@ async def test_report_result_silent(capsys, monkeypatch):
 @pytest.mark.asyncio
 async def test_report_result(capsys):
     r = Result('3.14', PrimitiveType(float))
-    report_result(r)
+    await report_result(r)
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == 'Result (float):\n3.14\n'
 
@@ -410,7 +483,7 @@ async def test_report_result(capsys):
 @pytest.mark.asyncio
 async def test_report_result_none(capsys):
     r = Result(None)
-    report_result(r)
+    await report_result(r)
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == 'Result (NoneType)\n'
 
@@ -418,6 +491,172 @@ async def test_report_result_none(capsys):
 @pytest.mark.asyncio
 async def test_report_cached_result(capsys):
     r = Result('3.14', PrimitiveType(float), True)
-    report_result(r)
+    await report_result(r)
     captured = capsys.readouterr()
     assert escape_ansi(captured.out) == 'Result (float, from cache):\n3.14\n'
+
+
+@pytest.mark.asyncio
+async def test_progress_bar_silent(capsys, monkeypatch, mocked_session):
+    monkeypatch.setattr(reporting, 'SILENT', True)
+    par = AiohttpParams(MockedResponse())
+    rep = ProgressBar()
+    ctx = MockedTraceContext()
+    await rep.on_request_start(mocked_session, ctx, par)
+    await asyncio.sleep(0.2)
+    await rep.on_request_end(mocked_session, ctx, par)
+    assert not rep.running
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_timing(capsys, mocked_session):
+    from dbgr.timing import RequestTiming, ServerTimingMetric
+    timing = RequestTiming(0.0)
+    timing.connection_reused = True
+    timing.request_sent = 0.001
+    timing.response_started = 0.101
+    timing.response_finished = 0.111
+    timing.server_timing = [
+        ServerTimingMetric('db', 0.06, 'Database'),
+        ServerTimingMetric('miss', None, None),
+    ]
+    res = MockedResponse(headers={'Content-Type': 'text/plain'}, data='OK', url='http://example.com')
+    ctx = MockedTraceContext(timing=timing)
+    await Reporter().on_request_end(mocked_session, ctx, AiohttpParams(res))
+    captured = escape_ansi(capsys.readouterr().out)
+    assert captured.endswith('''< Response data (text/plain):
+OK
+<
+< Timing (connection reused):
+<  Send: 1.00ms
+<  Wait: 100.00ms (server: 60.00ms, network: 40.00ms)
+<  Download: 10.00ms
+<  Total: 111.00ms
+<
+< Server timing:
+<  db: 60.00ms (Database)
+<  miss
+''')
+
+
+@pytest.mark.parametrize('value', [
+    {'b': [1, 2.5, {'x': None}], 'a': 'text "quoted" č', 'c': {}, 'd': [], 'e': True},
+    [], {}, 5, 'text', [[False]]
+])
+def test_colorize_json(value):
+    assert escape_ansi(reporting.colorize_json(value)) == json.dumps(value, sort_keys=True, indent=2)
+
+
+def test_get_lexer_is_cached():
+    lexer = reporting.get_lexer('text/html')
+    assert lexer is reporting.get_lexer('text/html')
+    assert reporting.get_lexer('unknown/mime') is None
+    assert 'unknown/mime' in reporting._LEXERS
+
+
+def test_get_formatter_is_cached():
+    assert reporting.get_formatter() is reporting.get_formatter()
+
+
+def test_highlight_limited_to_prefix(monkeypatch):
+    monkeypatch.setattr(reporting, 'HIGHLIGHT_LIMIT', 20)
+    data = '<b>first</b>\n<b>second</b>\n<b>third</b>'
+    highlighted = Reporter().highlight('text/html', data)
+    assert escape_ansi(highlighted) == data
+    assert highlighted.endswith('\n<b>second</b>\n<b>third</b>')
+    assert highlighted != data
+
+
+@pytest.mark.asyncio
+async def test_reporter_print_response_json_uses_response_json(capsys, monkeypatch):
+    res = MockedResponse(headers={'Content-Type': 'application/json'}, data='{"key": 1}')
+    async def mocked_json():
+        return {'parsed': True}
+    monkeypatch.setattr(res, 'json', mocked_json)
+    await print_response(res)
+    assert escape_ansi(capsys.readouterr().out).splitlines()[2:] == ['{', '  "parsed": true', '}']
+
+
+@pytest.mark.asyncio
+async def test_reporter_writes_report_at_once(monkeypatch, mocked_session):
+    writes = []
+    class MockedOutput:
+        async def write(self, text):
+            writes.append(text)
+    res = MockedResponse(
+        headers={'Content-Type': 'text/plain', 'X-One': '1', 'X-Two': '2'}, data='OK'
+    )
+    await Reporter(MockedOutput()).on_request_end(
+        mocked_session, MockedTraceContext(), AiohttpParams(res)
+    )
+    assert len(writes) == 1
+    assert escape_ansi(writes[0]).endswith('< Response data (text/plain):\nOK\n')
+
+
+@pytest.mark.asyncio
+async def test_output_to_file(tmp_path, capsys):
+    path = str(tmp_path / 'output.txt')
+    output = reporting.set_output(path)
+    await output.write(f'{Fore.RED}first{Style.RESET_ALL}\n')
+    await reporting.report_result(Result('3.14', PrimitiveType(float)))
+    with open(path) as output_file:
+        assert output_file.read() == 'first\nResult (float):\n3.14\n'
+    assert capsys.readouterr().out == ''
+    assert output.executor is not None
+
+
+def test_set_output_reuses_output(tmp_path):
+    output = reporting.set_output(str(tmp_path / 'output.txt'))
+    assert reporting.set_output(str(tmp_path / 'output.txt')) is output
+    assert reporting.set_output(None) is reporting.get_output()
+    assert reporting.get_output().path is None
+
+
+@pytest.mark.asyncio
+async def test_output_ignores_empty_text(capsys):
+    await reporting.get_output().write('')
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.asyncio
+async def test_progress_bar_aggregates_requests(capsys, mocked_session):
+    now = [10.0]
+    rep = ProgressBar(interval=0.01, clock=lambda: now[0])
+    ctx1, ctx2 = MockedTraceContext(), MockedTraceContext()
+    await rep.on_request_start(mocked_session, ctx1, None)
+    task = rep.task
+    now[0] = 11.5
+    await rep.on_request_start(mocked_session, ctx2, None)
+    assert rep.task is task
+    await rep.on_response_chunk_received(
+        mocked_session, ctx1, types.SimpleNamespace(chunk=b'x' * 10)
+    )
+    now[0] = 12.0
+    assert escape_ansi(rep.message('-')) == '\r2 requests - [0:00:02] 10B received'
+    await rep.on_request_end(mocked_session, ctx1, None)
+    assert rep.running
+    assert escape_ansi(rep.message('-')) == '\rrequest send - [0:00:00.500000] 10B received'
+    await rep.on_request_end(mocked_session, ctx2, None)
+    assert not rep.running
+    await asyncio.sleep(0.02)
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_progress_bar_restarts_counters(mocked_session):
+    rep = ProgressBar()
+    ctx = MockedTraceContext()
+    await rep.on_request_start(mocked_session, ctx, None)
+    await rep.on_response_chunk_received(mocked_session, ctx, types.SimpleNamespace(chunk=b'xx'))
+    await rep.on_request_end(mocked_session, ctx, None)
+    await rep.on_response_chunk_received(mocked_session, ctx, types.SimpleNamespace(chunk=b'xx'))
+    assert rep.received == 2
+    await rep.on_request_start(mocked_session, ctx, None)
+    assert rep.received == 0
+    await rep.on_request_end(mocked_session, ctx, None)
+
+
+def test_progress_bar_stops_on_exception():
+    tracer = ProgressBar().get_tracer()
+    assert len(tracer.on_request_exception) == 1
@@ -1,13 +1,17 @@
+import sys
 import random
+import asyncio
 import pytest
 import dbgr.requests
+import dbgr.session
 from tests.conftest import escape_ansi
 from dbgr.requests import (
-    parse_cmd_arguments, get_requests, extract_module_name, Request, find_request,
+    parse_cmd_arguments, get_requests, get_requests_in, extract_module_name, Request, find_request,
     RequestNotImplementsError, AmbiguousRequestNameError, register_request,
     parse_module_name, parse_request_name, load_module, load_requests,
-    execute_request, request_decorator
+    execute_request, request_decorator, InvalidDependencyError
 )
+from dbgr.dependencies import DependencyCycleError
 from dbgr.types import Type, PrimitiveType
 from dbgr.results import Result
 from dbgr.arguments import DefaultValueArgument, NoDefaultValueArgument
@@ -31,6 +35,7 @@ def test_get_requests_loads_requests_once(monkeypatch):
     def mocked_load_requests():
         mocked_load_requests.counter += 1
         monkeypatch.setattr(dbgr.requests, '_REQUESTS', {'module': {}})
+        monkeypatch.setattr(dbgr.requests, '_ALL_LOADED', True)
     mocked_load_requests.counter = 0
     monkeypatch.setattr(dbgr.requests, 'load_requests', mocked_load_requests)
     assert get_requests() == {'module': {}}
@@ -47,26 +52,26 @@ def test_get_requests_loads_requests_once(monkeypatch):
 def test_extract_module_name(path, name):
     assert extract_module_name(path) == name
 
+def register_all(monkeypatch, *requests):
+    for request in requests:
+        register_request(request)
+    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: dbgr.requests._REQUESTS)
+
+
 def test_find_request_by_name(monkeypatch, mocked_request):
-    requests = {mocked_request.module: {mocked_request.name: mocked_request}}
-    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: requests)
+    register_all(monkeypatch, mocked_request)
     assert find_request(mocked_request.name) == mocked_request
 
 
 def test_find_request_by_module_and_name(monkeypatch, mocked_request):
-    requests = {mocked_request.module: {mocked_request.name: mocked_request}}
-    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: requests)
+    register_all(monkeypatch, mocked_request)
     assert find_request(f'{mocked_request.module}:{mocked_request.name}') == mocked_request
 
 
 def test_find_request_by_module_and_duplicit_name(monkeypatch):
     req1 = mock_request(module='module1')
     req2 = mock_request(module='module2')
-    requests = {
-        req1.module: {req1.name: req1},
-        req2.module: {req2.name: req2}
-    }
-    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: requests)
+    register_all(monkeypatch, req1, req2)
     assert find_request(f'{req1.module}:{req2.name}') == req1
 
 
@@ -91,11 +96,7 @@ def test_find_request_doesnt_exist_in_module(monkeypatch):
 def test_find_request_duplicit_request_name(monkeypatch):
     req1 = mock_request(module='module1', name='request')
     req2 = mock_request(module='module2', name='request')
-    requests = {
-        req1.module: {req1.name: req1},
-        req2.module: {req2.name: req2}
-    }
-    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: requests)
+    register_all(monkeypatch, req1, req2)
     with pytest.raises(AmbiguousRequestNameError):
         find_request('request')
 
@@ -103,13 +104,7 @@ def test_find_request_duplicit_request_name(monkeypatch):
 def test_find_request_multiple_in_same_module(monkeypatch):
     req1 = mock_request(name='request1')
     req2 = mock_request(name='request2')
-    requests = {
-        req1.module: {
-            req1.name: req1,
-            req2.name: req2,
-        },
-    }
-    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: requests)
+    register_all(monkeypatch, req1, req2)
     assert find_request(req1.name) == req1
     assert find_request(req2.name) == req2
 
@@ -143,6 +138,31 @@ def test_register_multiple_requests_different_module(monkeypatch):
         req2.module: {req2.name: req2}
     }
 
+
+def test_register_request_indexes_names(monkeypatch):
+    names = {}
+    monkeypatch.setattr(dbgr.requests, '_NAMES', names)
+    req1 = mock_request(name='request', module='module1')
+    req2 = mock_request(name='request', module='module2')
+    req3 = mock_request(name='other', module='module1')
+    for request in (req1, req2, req3):
+        register_request(request)
+    assert names == {
+        'request': {'module1': req1, 'module2': req2},
+        'other': {'module1': req3},
+    }
+
+
+def test_find_request_does_not_scan_modules(monkeypatch):
+    req1 = mock_request(name='request', module='module1')
+    req2 = mock_request(name='other', module='module2')
+    register_all(monkeypatch, req1, req2)
+    monkeypatch.setattr(
+        dbgr.requests, 'get_requests', lambda: {'module1': None, 'module2': None}
+    )
+    assert find_request('request') == req1
+    assert find_request('module2:other') == req2
+
 @pytest.mark.parametrize('name, result', [
     ('module:request', ('module', 'request')),
     ('module', ('module', None)),
@@ -187,6 +207,7 @@ def test_load_module(monkeypatch):
 
     monkeypatch.setattr(dbgr.requests.importlib.util, 'spec_from_file_location', mocked_spec_from_file)
     monkeypatch.setattr(dbgr.requests.importlib.util, 'module_from_spec', mocked_module_from_spec)
+    monkeypatch.setattr(dbgr.requests.os, 'getcwd', lambda: '/path')
     load_module('/path/module.py')
     assert loaded_spec.loaded == ['loaded_module']
 
@@ -195,7 +216,9 @@ def test_load_modules(monkeypatch):
     loaded = []
     def mocked_load(module):
         loaded.append(module)
-    monkeypatch.setattr(dbgr.requests.glob, 'glob', lambda _: ['/path1/module1.py', '/path2/module2.py'])
+    monkeypatch.setattr(
+        dbgr.requests, 'find_modules', lambda _: ['/path1/module1.py', '/path2/module2.py']
+    )
     monkeypatch.setattr(dbgr.requests, 'load_module', mocked_load)
     load_requests()
     assert loaded == ['/path1/module1.py', '/path2/module2.py']
@@ -203,14 +226,16 @@ def test_load_modules(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_execute_request(monkeypatch, capsys, mocked_session, mocked_env):
-    async def mocked_Request(environment, session, use_defaults, cache, kwargs):
+    async def mocked_Request(environment, session, use_defaults, cache, kwargs, dependencies):
         assert environment == mocked_env
         assert session == mocked_session
         assert use_defaults == True
         assert cache == 'session'
         assert kwargs == {'arg1': 'val1', 'arg2': 'val2'}
+        assert dependencies == {}
         return Result('result', PrimitiveType(str))
 
+    mocked_Request.dependencies = []
     monkeypatch.setattr(dbgr.requests, 'find_request', lambda _: mocked_Request)
     assert 'result' == await execute_request(
         'request', mocked_env, mocked_session, True, 'session', arg1='val1', arg2='val2'
@@ -221,14 +246,16 @@ async def test_execute_request(monkeypatch, capsys, mocked_session, mocked_env):
 
 @pytest.mark.asyncio
 async def test_execute_silent_request(monkeypatch, capsys, mocked_session, mocked_env):
-    async def mocked_Request(environment, session, use_defaults, cache, kwargs):
+    async def mocked_Request(environment, session, use_defaults, cache, kwargs, dependencies):
         assert environment == mocked_env
         assert session == mocked_session
         assert use_defaults == True
         assert cache == 'session'
         assert kwargs == {'arg1': 'val1'}
+        assert dependencies == {}
         return Result('result', PrimitiveType(str))
 
+    mocked_Request.dependencies = []
     monkeypatch.setattr(dbgr.requests, 'find_request', lambda _: mocked_Request)
     assert 'result' == await execute_request(
         'request', mocked_env, mocked_session, True, 'session', arg1='val1', silent=True
@@ -265,7 +292,7 @@ def test_invalid_name():
 
 def test_duplicit_name(monkeypatch):
     monkeypatch.setattr(
-        dbgr.requests, 'get_requests', lambda: {__name__: {'func': lambda: None}}
+        dbgr.requests, '_REQUESTS', {__name__: {'func': lambda: None}}
     )
     async def func(env, session):
         pass
@@ -436,6 +463,17 @@ def test_format_cached():
     )
 
 
+def test_format_cached_with_ttl():
+    async def func(env, session):
+        pass
+
+    req = Request(func, cache='session', ttl=60)
+    assert escape_ansi(req) == (
+        '- func\n'
+        '  [cache: session, ttl: 60s]\n'
+    )
+
+
 def test_format_typed():
     async def func(env, session) -> int:
         ''' Pydoc '''
@@ -605,3 +643,547 @@ def test_request_decorator_with_name_and_cache():
     assert req.request == req_function
     assert req.cache == 'session'
     assert req.name == 'alternative_name'
+
+
+def test_request_decorator_with_cache_limits():
+    async def req_function():
+        pass
+
+    req = request_decorator(cache='session', ttl=60, max_entries=10, max_bytes=1024)(req_function)
+    assert req.cache == 'session'
+    assert req.ttl == 60
+    assert req.max_entries == 10
+    assert req.max_bytes == 1024
+
+
+def test_invalid_cache_type():
+    async def func():
+        pass
+
+    with pytest.raises(dbgr.requests.InvalidCacheTypeError):
+        Request(func, cache='invalid')
+
+
+@pytest.mark.asyncio
+async def test_disk_cached_request_second_call_cached(mocked_env, mocked_session):
+    async def func(arg):
+        func.counter += 1
+        return {'arg': arg}
+    func.counter = 0
+
+    req = Request(func, cache='disk')
+    res_1 = await req(mocked_env, mocked_session, kwargs={'arg': 'value'})
+    res_2 = await req(mocked_env, mocked_session, kwargs={'arg': 'value'})
+    assert res_1.cached == False
+    assert res_2.cached == True
+    assert res_2.value == {'arg': 'value'}
+    assert func.counter == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_cached_request_survives_restart(mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+        return 'value'
+    func.counter = 0
+
+    req = Request(func, cache='disk')
+    await req(mocked_env, mocked_session)
+    dbgr.cache._DISK_CACHE.close()
+    dbgr.cache._DISK_CACHE = None
+    res = await req(mocked_env, mocked_session)
+    assert res.cached == True
+    assert res.value == 'value'
+    assert func.counter == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_cached_request_refreshed_without_cache(mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+        return func.counter
+    func.counter = 0
+
+    req = Request(func, cache='disk')
+    await req(mocked_env, mocked_session)
+    res = await req(mocked_env, mocked_session, cache=False)
+    assert res.cached == False
+    assert res.value == 2
+    res = await req(mocked_env, mocked_session)
+    assert res.cached == True
+    assert res.value == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_cached_request_executed(monkeypatch, mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+        return func.counter
+    func.counter = 0
+
+    now = [1000.0]
+    req = Request(func, cache='session', ttl=10)
+    monkeypatch.setattr(req.get_cache(), 'clock', lambda: now[0])
+    await req(mocked_env, mocked_session)
+    res = await req(mocked_env, mocked_session)
+    assert res.cached == True
+    now[0] += 10
+    res = await req(mocked_env, mocked_session)
+    assert res.cached == False
+    assert res.value == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_request_evicts_old_entries(mocked_env, mocked_session):
+    async def func(arg):
+        return arg
+
+    req = Request(func, cache='session', max_entries=1)
+    await req(mocked_env, mocked_session, kwargs={'arg': 1})
+    await req(mocked_env, mocked_session, kwargs={'arg': 2})
+    res = await req(mocked_env, mocked_session, kwargs={'arg': 1})
+    assert res.cached == False
+    assert len(req.get_cache()) == 1
+
+
+def test_cached_requests_have_separate_storage():
+    async def func():
+        pass
+
+    req_1 = Request(func, name='request_1', cache='session')
+    req_2 = Request(func, name='request_2', cache='session')
+    assert req_1.get_cache() is not req_2.get_cache()
+    assert req_1.get_cache() is req_1.get_cache()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cached_calls_executed_once(mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+        await asyncio.sleep(0.01)
+        return 'value'
+    func.counter = 0
+
+    req = Request(func, cache='session')
+    res_1, res_2 = await asyncio.gather(
+        req(mocked_env, mocked_session),
+        req(mocked_env, mocked_session)
+    )
+    assert func.counter == 1
+    assert res_1.value == res_2.value == 'value'
+    assert res_1.cached == False
+    assert res_2.cached == True
+    assert dbgr.requests._IN_FLIGHT == {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_call_without_cache_is_executed(mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+        call = func.counter
+        await asyncio.sleep(0.005 * call)
+        return call
+    func.counter = 0
+
+    req = Request(func, cache='session')
+    res_1, res_2 = await asyncio.gather(
+        req(mocked_env, mocked_session),
+        req(mocked_env, mocked_session, cache=False)
+    )
+    assert (res_1.value, res_2.value) == (1, 2)
+    assert (res_1.cached, res_2.cached) == (False, False)
+    assert (await req(mocked_env, mocked_session)).value == res_2.value
+    assert dbgr.requests._IN_FLIGHT == {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cached_calls_with_different_arguments(mocked_env, mocked_session):
+    async def func(arg):
+        func.counter += 1
+        await asyncio.sleep(0.01)
+        return arg
+    func.counter = 0
+
+    req = Request(func, cache='session')
+    res_1, res_2 = await asyncio.gather(
+        req(mocked_env, mocked_session, kwargs={'arg': 1}),
+        req(mocked_env, mocked_session, kwargs={'arg': 2})
+    )
+    assert func.counter == 2
+    assert (res_1.value, res_2.value) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cached_calls_share_exception(mocked_env, mocked_session):
+    async def func():
+        func.counter += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError('failed')
+    func.counter = 0
+
+    req = Request(func, cache='session')
+    results = await asyncio.gather(
+        req(mocked_env, mocked_session),
+        req(mocked_env, mocked_session),
+        return_exceptions=True
+    )
+    assert func.counter == 1
+    assert all(isinstance(res, RuntimeError) for res in results)
+    assert dbgr.requests._IN_FLIGHT == {}
+    assert len(req.get_cache()) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_cached_call_without_concurrent_callers(mocked_env, mocked_session):
+    async def func():
+        raise RuntimeError('failed')
+
+    req = Request(func, cache='session')
+    with pytest.raises(RuntimeError):
+        await req(mocked_env, mocked_session)
+    assert dbgr.requests._IN_FLIGHT == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_cached_call_cancels_concurrent_callers(mocked_env, mocked_session):
+    async def func():
+        await asyncio.sleep(10)
+
+    req = Request(func, cache='session')
+    leader = asyncio.ensure_future(req(mocked_env, mocked_session))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(req(mocked_env, mocked_session))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+    assert dbgr.requests._IN_FLIGHT == {}
+
+
+@pytest.mark.asyncio
+async def test_environment_is_part_of_cache_key(mocked_session):
+    async def func():
+        func.counter += 1
+        return func.counter
+    func.counter = 0
+
+    req = Request(func, cache='session')
+    res_1 = await req({'url': 'staging.example.com'}, mocked_session)
+    res_2 = await req({'url': 'example.com'}, mocked_session)
+    res_3 = await req({'url': 'staging.example.com'}, mocked_session)
+    assert (res_1.value, res_1.cached) == (1, False)
+    assert (res_2.value, res_2.cached) == (2, False)
+    assert (res_3.value, res_3.cached) == (1, True)
+
+
+@pytest.mark.asyncio
+async def test_unhashable_arguments_cached(mocked_env, mocked_session):
+    async def func(arg):
+        func.counter += 1
+        return arg
+    func.counter = 0
+
+    req = Request(func, cache='session')
+    await req(mocked_env, mocked_session, kwargs={'arg': {'key': ['value']}})
+    res = await req(mocked_env, mocked_session, kwargs={'arg': {'key': ['value']}})
+    assert res.cached == True
+    assert res.value == {'key': ['value']}
+    assert func.counter == 1
+
+
+def test_cache_key_ignores_session(mocked_env):
+    async def func(env, session, arg):
+        pass
+
+    req = Request(func, cache='session')
+    key_1 = req.cache_key(mocked_env, {'session': object(), 'arg': 1})
+    key_2 = req.cache_key(mocked_env, {'session': object(), 'arg': 1})
+    assert key_1 == key_2
+
+
+def test_cache_key_differs_between_requests(mocked_env):
+    async def func():
+        pass
+
+    req_1 = Request(func, name='request_1', cache='session')
+    req_2 = Request(func, name='request_2', cache='session')
+    assert req_1.cache_key(mocked_env, {}) != req_2.cache_key(mocked_env, {})
+
+
+def test_find_request_loads_only_owning_module(monkeypatch, tmp_path):
+    for module in ('module1', 'module2'):
+        (tmp_path / f'{module}.py').write_text(
+            'from dbgr import request\n'
+            '@request\n'
+            f'async def {module}_request():\n'
+            '    pass\n'
+        )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    monkeypatch.setattr(dbgr.requests, 'get_index', dbgr.index.get_index)
+    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: pytest.fail('All modules loaded'))
+    req = find_request('module2_request')
+    assert req.module == 'module2'
+    assert list(dbgr.requests._REQUESTS) == ['module2']
+    assert find_request('module2:module2_request') == req
+    assert list(dbgr.requests._REQUESTS) == ['module2']
+
+
+def test_find_request_falls_back_to_all_modules(monkeypatch, tmp_path):
+    (tmp_path / 'module.py').write_text(
+        'from dbgr import request\n'
+        'NAME = "dynamic_name"\n'
+        '@request(name=NAME)\n'
+        'async def func():\n'
+        '    pass\n'
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    monkeypatch.setattr(dbgr.requests, 'get_index', dbgr.index.get_index)
+    monkeypatch.setattr(dbgr.requests, 'get_requests', get_requests)
+    assert find_request('dynamic_name').name == 'dynamic_name'
+
+
+def write_package_tree(path):
+    for package in ('billing', 'billing/invoices'):
+        (path / package).mkdir()
+        (path / package / '__init__.py').write_text('')
+    for module in ('billing/invoices/items', 'billing/payments', 'orders'):
+        (path / f'{module}.py').write_text(
+            'from dbgr import request\n'
+            '@request\n'
+            'async def items():\n'
+            '    pass\n'
+        )
+
+
+def test_find_request_in_nested_package(monkeypatch, tmp_path):
+    write_package_tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    monkeypatch.setattr(dbgr.requests, 'get_index', dbgr.index.get_index)
+    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: pytest.fail('All modules loaded'))
+    req = find_request('billing.invoices.items:items')
+    assert req.module == 'billing.invoices.items'
+    assert list(dbgr.requests._REQUESTS) == ['billing.invoices.items']
+    with pytest.raises(AmbiguousRequestNameError):
+        find_request('items')
+
+
+@pytest.mark.asyncio
+async def test_package_modules_import_siblings(monkeypatch, tmp_path):
+    (tmp_path / 'billing').mkdir()
+    (tmp_path / 'billing' / '__init__.py').write_text('CURRENCY = "EUR"\n')
+    (tmp_path / 'billing' / 'helpers.py').write_text('def total():\n    return 42\n')
+    (tmp_path / 'billing' / 'invoices.py').write_text(
+        'from dbgr import request\n'
+        'from . import CURRENCY\n'
+        'from .helpers import total\n'
+        '@request\n'
+        'async def invoices():\n'
+        '    return total(), CURRENCY\n'
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    monkeypatch.setattr(dbgr.requests, 'get_index', dbgr.index.get_index)
+    req = find_request('billing.invoices:invoices')
+    assert req.module == 'billing.invoices'
+    assert await req.request() == (42, 'EUR')
+    assert 'billing' not in sys.modules
+    assert sys.modules['__dbgr__.billing.helpers'].total() == 42
+
+
+def test_get_requests_in_package(monkeypatch, tmp_path):
+    write_package_tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dbgr.index, '_INDEX', None)
+    monkeypatch.setattr(dbgr.requests, 'get_index', dbgr.index.get_index)
+    monkeypatch.setattr(dbgr.requests, 'get_requests', lambda: pytest.fail('All modules loaded'))
+    requests = get_requests_in('billing')
+    assert sorted(requests) == ['billing.invoices.items', 'billing.payments']
+
+
+def test_load_module_only_once(monkeypatch):
+    loaded = []
+    class mocked_spec:
+        class loader:
+            @staticmethod
+            def exec_module(module):
+                loaded.append(module)
+    monkeypatch.setattr(dbgr.requests.importlib.util, 'spec_from_file_location', lambda *_: mocked_spec)
+    monkeypatch.setattr(dbgr.requests.importlib.util, 'module_from_spec', lambda _: 'module')
+    monkeypatch.setattr(dbgr.requests.os, 'getcwd', lambda: '/path')
+    load_module('/path/module.py')
+    load_module('/path/module.py')
+    assert loaded == ['module']
+
+
+@pytest.fixture
+def dependency_requests(monkeypatch):
+    requests = {}
+    monkeypatch.setattr(dbgr.requests, 'find_request', lambda name: requests[name])
+    monkeypatch.setattr(dbgr.reporting, 'SILENT', True)
+    return requests
+
+
+@pytest.mark.asyncio
+async def test_independent_dependencies_run_concurrently(
+        dependency_requests, mocked_env, mocked_session):
+    events = []
+    async def slow(name):
+        events.append(f'{name} started')
+        await asyncio.sleep(0.01)
+        events.append(f'{name} finished')
+        return name
+    async def login():
+        return await slow('login')
+    async def flags():
+        return await slow('flags')
+    async def profile():
+        events.append('profile')
+    dependency_requests['login'] = Request(login)
+    dependency_requests['flags'] = Request(flags)
+    dependency_requests['profile'] = Request(profile, depends=['login', 'flags'])
+    await execute_request('profile', mocked_env, mocked_session)
+    assert events[:2] == ['login started', 'flags started']
+    assert events[-1] == 'profile'
+
+
+@pytest.mark.asyncio
+async def test_dependency_results_are_passed_as_arguments(
+        dependency_requests, mocked_env, mocked_session):
+    async def login():
+        return 'jwt'
+    async def profile(session, token, user_id: int = 1):
+        return token, user_id
+    dependency_requests['login'] = Request(login)
+    dependency_requests['profile'] = Request(profile, depends={'token': 'login'})
+    assert [arg.name for arg in dependency_requests['profile'].extra_arguments] == ['user_id']
+    assert await execute_request(
+        'profile', mocked_env, mocked_session, user_id='2'
+    ) == ('jwt', 2)
+
+
+@pytest.mark.asyncio
+async def test_discovered_dependencies_execute_once_before_request(
+        dependency_requests, mocked_env, mocked_session):
+    events = []
+    async def login():
+        events.append('login')
+        return 'jwt'
+    async def profile():
+        events.append('profile')
+        return await execute_request('login'), await execute_request('login')
+    dependency_requests['login'] = Request(login)
+    dependency_requests['profile'] = Request(profile, depends=True)
+    assert dependency_requests['profile'].dependencies == [(None, 'login')]
+    assert await execute_request('profile', mocked_env, mocked_session) == ('jwt', 'jwt')
+    assert events == ['login', 'profile']
+    assert dbgr.requests._SCHEDULED.get() is None
+
+
+@pytest.mark.asyncio
+async def test_responses_without_depends_execute_on_every_call(
+        dependency_requests, mocked_env, mocked_session):
+    events = []
+    async def status():
+        events.append('status')
+        return len(events)
+    async def poll():
+        if False: # pylint: disable=W0125
+            await execute_request('status')
+        events.append('poll')
+        while (await execute_request('status')) < 3:
+            pass
+    dependency_requests['status'] = Request(status)
+    dependency_requests['poll'] = Request(poll)
+    assert dependency_requests['poll'].dependencies == []
+    await execute_request('poll', mocked_env, mocked_session)
+    assert events == ['poll', 'status', 'status']
+
+
+@pytest.mark.asyncio
+async def test_only_declared_dependencies_return_scheduled_result(
+        dependency_requests, mocked_env, mocked_session):
+    events = []
+    async def login():
+        events.append('login')
+        return len(events)
+    async def flags():
+        return await execute_request('login')
+    async def profile():
+        return await execute_request('flags'), await execute_request('login')
+    dependency_requests['login'] = Request(login)
+    dependency_requests['flags'] = Request(flags, depends=['login'])
+    dependency_requests['profile'] = Request(profile, depends=['flags'])
+    assert await execute_request('profile', mocked_env, mocked_session) == (1, 2)
+    assert events == ['login', 'login']
+
+
+@pytest.mark.asyncio
+async def test_nested_requests_use_active_environment(
+        dependency_requests, monkeypatch, mocked_env, mocked_session):
+    async def inner(env, session):
+        return env, session
+    async def outer():
+        return await execute_request('inner'), await execute_request('inner', env='other')
+    dependency_requests['inner'] = Request(inner)
+    dependency_requests['outer'] = Request(outer)
+    monkeypatch.setattr(dbgr.session, 'get_session', lambda env=None: f'session:{env}')
+    assert await execute_request('outer', mocked_env, mocked_session) == (
+        (mocked_env, mocked_session), ('other', 'session:other')
+    )
+    assert dbgr.requests._ACTIVE.get() == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_dependency_cycle_detected_before_execution(
+        dependency_requests, mocked_env, mocked_session):
+    executed = []
+    async def first():
+        executed.append('first')
+    async def second():
+        executed.append('second')
+    dependency_requests['first'] = Request(first, depends=['second'])
+    dependency_requests['second'] = Request(second, depends=['first'])
+    with pytest.raises(DependencyCycleError):
+        await execute_request('first', mocked_env, mocked_session)
+    assert executed == []
+
+
+@pytest.mark.asyncio
+async def test_failed_dependency_cancels_other_dependencies(
+        dependency_requests, mocked_env, mocked_session):
+    finished = []
+    async def broken():
+        raise RuntimeError('It is broken')
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append('slow')
+    async def root():
+        finished.append('root')
+    dependency_requests['broken'] = Request(broken)
+    dependency_requests['slow'] = Request(slow)
+    dependency_requests['root'] = Request(root, depends=['slow', 'broken'])
+    with pytest.raises(RuntimeError):
+        await execute_request('root', mocked_env, mocked_session)
+    await asyncio.sleep(0.06)
+    assert finished == []
+
+
+@pytest.mark.parametrize('depends', ['login', [1], {'token': None}])
+def test_invalid_dependencies(depends):
+    async def func():
+        pass
+    with pytest.raises(InvalidDependencyError):
+        Request(func, depends=depends)
+
+
+def test_request_decorator_with_dependencies(monkeypatch):
+    monkeypatch.setattr(dbgr.requests, 'register_request', lambda _: None)
+    async def func(token):
+        pass
+    req = request_decorator(depends={'token': 'login'})(func)
+    assert req.depends == {'token': 'login'}
+    assert req.dependencies == [('token', 'login')]
+    assert req.extra_arguments == []
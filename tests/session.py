@@ -1,7 +1,11 @@
 import types
+import socket
+from configparser import ConfigParser, ExtendedInterpolation
 import pytest
 import aiohttp
+from yarl import URL
 from dbgr import session
+from dbgr.client_response import Response
 
 
 @pytest.mark.asyncio
@@ -29,7 +33,7 @@ async def test_close_session():
 
 @pytest.mark.asyncio
 async def test_close_session_no_session():
-    assert session._SESSION == None
+    assert session._SESSIONS == {}
     await session.close_session()
 
 @pytest.mark.asyncio
@@ -47,3 +51,145 @@ async def test_passes_request_params_to_request_context(monkeypatch):
         timeout=42,
         url='url'
     )
+
+
+@pytest.mark.asyncio
+async def test_request_timing_attached_to_response(monkeypatch):
+    async def mocked__request(self, method, url, **kwargs):
+        kwargs['trace_request_ctx'].timing = 'timing'
+        return types.SimpleNamespace()
+
+    monkeypatch.setattr(aiohttp.ClientSession, '_request', mocked__request)
+    sess = session.get_session()
+    res = await sess.get('url')
+    assert res.timing == 'timing'
+    await sess.close()
+
+
+@pytest.mark.asyncio
+async def test_session_uses_caching_response_class():
+    sess = session.get_session()
+    assert sess._response_class is Response
+    await sess.close()
+
+
+def make_env(ini):
+    env = ConfigParser(interpolation=ExtendedInterpolation())
+    env.read_string(ini)
+    return env
+
+
+def test_connector_options_without_section():
+    assert session.connector_options({}) == {}
+    assert session.connector_options(make_env('[service]\nurl: http://example.com')) == {}
+
+
+def test_connector_options():
+    env = make_env('''
+[DEFAULT]
+url: http://example.com
+
+[dbgr.connector]
+limit: 500
+limit_per_host: 50
+keepalive_timeout: 30.5
+ttl_dns_cache: none
+force_close: no
+''')
+    assert session.connector_options(env) == {
+        'limit': 500,
+        'limit_per_host': 50,
+        'keepalive_timeout': 30.5,
+        'ttl_dns_cache': None,
+        'force_close': False,
+    }
+
+
+def test_connector_options_unknown_option():
+    env = make_env('[dbgr.connector]\nlimits: 10')
+    with pytest.raises(session.InvalidConnectorOptionError, match='Unknown option "limits"'):
+        session.connector_options(env)
+
+
+def test_connector_options_invalid_value():
+    env = make_env('[dbgr.connector]\nlimit: many')
+    with pytest.raises(session.InvalidConnectorOptionError, match='Invalid value "many"'):
+        session.connector_options(env)
+
+
+def test_connector_options_socket_options():
+    env = make_env('[dbgr.connector]\nso_keepalive: yes\nso_rcvbuf: 65536')
+    factory = session.connector_options(env)['socket_factory']
+    sock = factory((socket.AF_INET, socket.SOCK_STREAM, 0, '', ('127.0.0.1', 80)))
+    try:
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE) == 1
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) >= 65536
+    finally:
+        sock.close()
+
+
+def test_connector_options_socket_options_unsupported(monkeypatch):
+    class OldConnector:
+        def __init__(self, limit=100):
+            pass
+    monkeypatch.setattr(aiohttp, 'TCPConnector', OldConnector)
+    env = make_env('[dbgr.connector]\ntcp_nodelay: yes')
+    with pytest.raises(session.InvalidConnectorOptionError, match='aiohttp 3.12'):
+        session.connector_options(env)
+
+
+@pytest.mark.asyncio
+async def test_get_session_configures_connector():
+    env = make_env('[dbgr.connector]\nlimit: 7\nlimit_per_host: 3')
+    sess = session.get_session(env)
+    assert sess.connector.limit == 7
+    assert sess.connector.limit_per_host == 3
+    await sess.close()
+
+
+@pytest.mark.asyncio
+async def test_get_session_per_environment():
+    env1 = make_env('[service]\nurl: http://one.example.com')
+    env2 = make_env('[service]\nurl: http://two.example.com')
+    sess1 = session.get_session(env1)
+    sess2 = session.get_session(env2)
+    assert sess1 is not sess2
+    assert sess1.cookie_jar is not sess2.cookie_jar
+    assert sess1.connector is not sess2.connector
+    assert session.get_session(make_env('[service]\nurl: http://one.example.com')) is sess1
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_get_session_per_base_url():
+    sess1 = session.get_session({}, base_url='http://one.example.com')
+    sess2 = session.get_session({}, base_url='http://two.example.com')
+    assert sess1 is not sess2
+    assert sess1._base_url == URL('http://one.example.com')
+    assert session.get_session({}, base_url='http://one.example.com') is sess1
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_get_session_shares_trace_configs():
+    sess1 = session.get_session({'env': 1})
+    sess2 = session.get_session({'env': 2})
+    assert sess1.trace_configs == sess2.trace_configs
+    await session.close_session()
+
+
+@pytest.mark.asyncio
+async def test_close_session_closes_all_sessions():
+    sessions = [session.get_session({'env': 1}), session.get_session({'env': 2})]
+    await session.close_session()
+    assert all(sess.closed for sess in sessions)
+    assert session._SESSIONS == {}
+
+
+@pytest.mark.asyncio
+async def test_get_session_replaces_closed_session():
+    sess = session.get_session()
+    await sess.close()
+    new_sess = session.get_session()
+    assert new_sess is not sess
+    await session.close_session()
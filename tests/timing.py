@@ -0,0 +1,178 @@
+import types
+import pytest
+import aiohttp
+from aiohttp import web
+from multidict import CIMultiDict
+from dbgr.timing import (
+    TimingTracer, RequestTiming, ServerTimingMetric, parse_server_timing
+)
+from tests.conftest import MockedResponse, AiohttpParams
+
+
+class MockedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+def trace_context():
+    return types.SimpleNamespace(trace_request_ctx=types.SimpleNamespace())
+
+
+@pytest.mark.parametrize('headers, metrics', [
+    ([], []),
+    (['db;dur=53'], [ServerTimingMetric('db', 0.053, None)]),
+    (['miss, db;dur=53'], [
+        ServerTimingMetric('miss', None, None),
+        ServerTimingMetric('db', 0.053, None),
+    ]),
+    (['cache;desc="Cache Read";dur=23.2'], [
+        ServerTimingMetric('cache', 0.0232, 'Cache Read')
+    ]),
+    (['app;desc="Parse, render";dur=10', 'total;dur=20'], [
+        ServerTimingMetric('app', 0.01, 'Parse, render'),
+        ServerTimingMetric('total', 0.02, None),
+    ]),
+    (['app;dur=invalid;desc=App'], [ServerTimingMetric('app', None, 'App')]),
+])
+def test_parse_server_timing(headers, metrics):
+    assert parse_server_timing(headers) == metrics
+
+
+def test_timing_new_connection():
+    timing = RequestTiming(0.0)
+    timing.connection_started = 1.0
+    timing.dns_started = 1.5
+    timing.dns_finished = 2.0
+    timing.connection_finished = 3.0
+    timing.request_sent = 3.5
+    timing.response_started = 5.0
+    timing.response_finished = 5.5
+    assert timing.phases == {
+        'queue': None,
+        'dns': 0.5,
+        'connect': 1.5,
+        'send': 0.5,
+        'wait': 1.5,
+        'download': 0.5,
+        'total': 5.5,
+    }
+
+
+def test_timing_without_body():
+    timing = RequestTiming(0.0)
+    timing.response_started = 2.0
+    assert timing.wait == 2.0
+    assert timing.download is None
+    assert timing.total == 2.0
+
+
+def test_timing_server():
+    timing = RequestTiming(0.0)
+    timing.request_sent = 1.0
+    timing.response_started = 2.0
+    assert timing.server is None
+    assert timing.network is None
+    timing.server_timing = [
+        ServerTimingMetric('db', 0.2, None),
+        ServerTimingMetric('app', 0.3, None),
+        ServerTimingMetric('miss', None, None),
+    ]
+    assert timing.server == pytest.approx(0.5)
+    assert timing.network == pytest.approx(0.5)
+    timing.server_timing.append(ServerTimingMetric('total', 0.8, None))
+    assert timing.server == pytest.approx(0.8)
+    assert timing.network == pytest.approx(0.2)
+
+
+@pytest.mark.asyncio
+async def test_tracer_records_phases():
+    tracer = TimingTracer(clock=MockedClock())
+    ctx = trace_context()
+    params = AiohttpParams(MockedResponse(headers={'Server-Timing': 'db;dur=100'}))
+    await tracer.on_request_start(None, ctx, params)
+    await tracer.on_connection_queued_start(None, ctx, params)
+    await tracer.on_connection_queued_end(None, ctx, params)
+    await tracer.on_connection_create_start(None, ctx, params)
+    await tracer.on_dns_resolvehost_start(None, ctx, params)
+    await tracer.on_dns_resolvehost_end(None, ctx, params)
+    await tracer.on_connection_create_end(None, ctx, params)
+    await tracer.on_request_sent(None, ctx, params)
+    await tracer.on_request_end(None, ctx, params)
+    await tracer.on_response_chunk_received(None, ctx, params)
+    timing = ctx.trace_request_ctx.timing
+    assert timing is ctx.timing
+    assert timing.phases == {
+        'queue': 1.0,
+        'dns': 1.0,
+        'connect': 2.0,
+        'send': 1.0,
+        'wait': 1.0,
+        'download': 1.0,
+        'total': 9.0,
+    }
+    assert timing.connection_reused == False
+    assert timing.server_timing == [ServerTimingMetric('db', 0.1, None)]
+
+
+@pytest.mark.asyncio
+async def test_tracer_reused_connection():
+    tracer = TimingTracer(clock=MockedClock())
+    ctx = trace_context()
+    params = AiohttpParams(MockedResponse())
+    await tracer.on_request_start(None, ctx, params)
+    await tracer.on_connection_reuseconn(None, ctx, params)
+    assert ctx.timing.connection_reused == True
+    assert ctx.timing.connect == 0.0
+
+
+@pytest.mark.asyncio
+async def test_tracer_redirect_resets_phases():
+    tracer = TimingTracer(clock=MockedClock())
+    ctx = trace_context()
+    params = AiohttpParams(MockedResponse())
+    await tracer.on_request_start(None, ctx, params)
+    await tracer.on_connection_reuseconn(None, ctx, params)
+    await tracer.on_request_sent(None, ctx, params)
+    await tracer.on_request_redirect(None, ctx, params)
+    assert ctx.timing.redirects == 1
+    assert ctx.timing.connection_reused == False
+    assert ctx.timing.request_sent is None
+
+
+@pytest.mark.asyncio
+async def test_tracer_without_request_context():
+    tracer = TimingTracer()
+    ctx = types.SimpleNamespace(trace_request_ctx=None)
+    await tracer.on_request_start(None, ctx, None)
+    assert isinstance(ctx.timing, RequestTiming)
+
+
+@pytest.mark.asyncio
+async def test_tracer_with_server():
+    async def handler(request):
+        return web.Response(text='OK', headers={'Server-Timing': 'app;dur=1'})
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    ctx = types.SimpleNamespace()
+    try:
+        async with aiohttp.ClientSession(trace_configs=[TimingTracer().get_tracer()]) as session:
+            for _ in range(2):
+                async with session.get(f'http://127.0.0.1:{port}/', trace_request_ctx=ctx) as res:
+                    await res.read()
+    finally:
+        await runner.cleanup()
+    timing = ctx.timing
+    assert timing.connection_reused == True
+    assert timing.wait > 0
+    assert timing.total >= timing.wait
+    assert timing.server_timing == [ServerTimingMetric('app', 0.001, None)]
@@ -1,10 +1,13 @@
+import sys
+from configparser import ConfigParser
 import pytest
 from dbgr.types import (
     Type, SecretType, PrimitiveType, BooleanType, DatetimeType, TimeType,
     DateType
 )
-from datetime import datetime, time, date
+from datetime import datetime, time, date, timezone
 from dbgr import types
+from dbgr.cache import SessionCache
 import dateparser
 
 
@@ -270,3 +273,72 @@ def test_time_repr_datetime():
     t = TimeType()
     assert t.repr_value(datetime(2019, 3, 21, 12, 13, 14, 132120)) == '12:13:14.132120'
 
+
+
+@pytest.mark.parametrize('date_string', [
+    '2018-05-24',
+    '2019-09-21T10:20:30',
+    '2019-09-21 10:20',
+    '2019-03-21 12:13:14.132120',
+    '2019-03-21T12:13:14.5',
+    '2019-09-21T10:20:30Z',
+    '2019-09-21T10:20:30+02:00',
+    '2019-09-21T10:20:30+0530',
+    '1568974800',
+    '1568974800123',
+])
+def test_datetime_fast_path_matches_dateparser(date_string):
+    assert types.parse_iso_datetime(date_string) == dateparser.parse(date_string)
+
+
+@pytest.mark.parametrize('date_string', [
+    'yesterday', '2019-13-01', '2019-09-21T25:00', '20190921', '2019', '1568974800.5'
+])
+def test_datetime_fast_path_rejects_other_formats(date_string):
+    assert types.parse_iso_datetime(date_string) is None
+
+
+def test_datetime_fast_path_negative_offset():
+    assert types.parse_iso_datetime('2019-09-21T10:20:30-05:30') == datetime(
+        2019, 9, 21, 15, 50, 30, tzinfo=timezone.utc
+    )
+
+
+def test_datetime_fast_path_skips_dateparser(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'dateparser', None)
+    assert DatetimeType().cast(' 2019-09-21T10:20:30Z ') == datetime(
+        2019, 9, 21, 10, 20, 30, tzinfo=timezone.utc
+    )
+
+
+def test_natural_dates_are_memoized(monkeypatch):
+    calls = []
+    def mocked_parse(value, languages=None):
+        calls.append((value, languages))
+        return datetime(2019, 9, 21)
+    now = [0]
+    monkeypatch.setattr(dateparser, 'parse', mocked_parse)
+    monkeypatch.setattr(
+        types, '_PARSED_DATES', SessionCache(max_entries=10, clock=lambda: now[0])
+    )
+    t = DatetimeType()
+    assert t.cast('yesterday') == datetime(2019, 9, 21)
+    assert t.repr_value('yesterday') == 'yesterday (2019-09-21 00:00:00)'
+    assert calls == [('yesterday', None)]
+    now[0] = types.NATURAL_DATE_TTL
+    t.cast('yesterday')
+    assert len(calls) == 2
+
+
+def test_natural_dates_use_configured_languages(monkeypatch):
+    calls = []
+    def mocked_parse(value, languages=None):
+        calls.append(languages)
+        return datetime(2019, 9, 21)
+    env = ConfigParser()
+    env.read_string('[dbgr.dates]\nlanguages: en, cs\n')
+    monkeypatch.setattr(dateparser, 'parse', mocked_parse)
+    monkeypatch.setattr(types, '_PARSED_DATES', SessionCache())
+    monkeypatch.setattr(types, 'get_environment', lambda: env)
+    DatetimeType().cast('včera')
+    assert calls == [['en', 'cs']]